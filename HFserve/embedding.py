@@ -1,4 +1,5 @@
 import os
+import numpy as np
 from sentence_transformers import SentenceTransformer
 from typing import List, Union
 
@@ -19,6 +20,10 @@ class EmbeddingModel:
             raise e
 
     def embed(self, texts: Union[str, List[str]]) -> List[List[float]]:
+        return self.embed_array(texts).tolist()
+
+    def embed_array(self, texts: Union[str, List[str]]) -> np.ndarray:
+        """Embeddings as one (n, dim) float32 array, for binary encodings."""
         if not self.model:
             raise RuntimeError("Embedding model not loaded")
         
@@ -27,4 +32,4 @@ class EmbeddingModel:
             
         # sentence-transformers encode returns numpy array by default
         embeddings = self.model.encode(texts)
-        return embeddings.tolist()
+        return np.asarray(embeddings, dtype=np.float32)
@@ -90,11 +90,14 @@ class ChatCompletionResponse(BaseModel):
 class EmbeddingRequest(BaseModel):
     input: Union[str, List[str]]
     model: Optional[str] = None
-    encoding_format: Optional[str] = "float" # float or base64
+    encoding_format: Optional[Literal["float", "base64"]] = "float"
+    # Extension: element type of base64 embeddings. float32 is the OpenAI format;
+    # float16 halves the payload again. Echoed back in the response.
+    dtype: Optional[Literal["float32", "float16"]] = "float32"
 
 class EmbeddingData(BaseModel):
     object: str = "embedding"
-    embedding: List[float]
+    embedding: Union[List[float], str] # base64 of little-endian floats when encoding_format="base64"
     index: int
 
 class EmbeddingResponse(BaseModel):
@@ -102,6 +105,7 @@ class EmbeddingResponse(BaseModel):
     data: List[EmbeddingData]
     model: str
     usage: UsageInfo
+    dtype: Optional[str] = None # Set for base64 responses
 
 # --- Helper Functions ---
 
@@ -199,17 +203,26 @@ async def create_embedding(request: EmbeddingRequest):
         # embedding_model.embed is synchronous
         embeddings = await loop.run_in_executor(
             None, 
-            lambda: embedding_model.embed(request.input)
+            lambda: embedding_model.embed_array(request.input)
         )
         
         data = []
-        for i, emb in enumerate(embeddings):
-            data.append(EmbeddingData(embedding=emb, index=i))
+        dtype = None
+        if request.encoding_format == "base64":
+            dtype = request.dtype or "float32"
+            # Little-endian, one base64 string per row
+            rows = embeddings.astype("<f2" if dtype == "float16" else "<f4", copy=False)
+            for i, row in enumerate(rows):
+                data.append(EmbeddingData(embedding=base64.b64encode(row.tobytes()).decode("ascii"), index=i))
+        else:
+            for i, emb in enumerate(embeddings.tolist()):
+                data.append(EmbeddingData(embedding=emb, index=i))
             
         return EmbeddingResponse(
             data=data,
             model=embedding_model.model_name,
-            usage=UsageInfo(prompt_tokens=0, total_tokens=0)
+            usage=UsageInfo(prompt_tokens=0, total_tokens=0),
+            dtype=dtype
         )
     except Exception as e:
         import traceback
@@ -0,0 +1,273 @@
+import asyncio
+import sqlite3
+import threading
+import time
+import httpx
+from concurrent.futures import Future
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+from urllib.parse import urlsplit
+from backend.app.config.schema import AppConfig, WebFetchConfig
+from backend.app.domain.errors import ExtractionError
+
+# After an over-budget write, evict down to this fraction of the budget
+EVICT_TO_RATIO = 0.9
+
+@dataclass
+class FetchResult:
+    url: str
+    # HTTP status: 304 when the validators still match, 0 when the request failed
+    status: int
+    content: bytes = b""
+    content_type: Optional[str] = None
+    encoding: Optional[str] = None
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    error: Optional[str] = None
+
+    @property
+    def not_modified(self) -> bool:
+        return self.status == 304
+
+    @property
+    def text(self) -> str:
+        return self.content.decode(self.encoding or "utf-8", errors="replace")
+
+    def raise_for_status(self):
+        if self.error is not None:
+            raise ExtractionError(f"Failed to fetch {self.url}: {self.error}")
+
+class ResponseCache:
+    """
+    Successful responses in a single SQLite file, keyed by URL, with their
+    validators, so extraction can be retried without refetching and stale
+    entries are revalidated with a conditional GET. The total size is tracked
+    by triggers in a one-row meta table, and writes that push it over
+    `max_bytes` evict the least recently fetched responses.
+    """
+    def __init__(self, path: Path, max_bytes: int):
+        self.max_bytes = max_bytes
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(path), timeout=30.0, check_same_thread=False, isolation_level=None)
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript("""
+                CREATE TABLE IF NOT EXISTS responses (
+                    url TEXT PRIMARY KEY,
+                    content_type TEXT,
+                    encoding TEXT,
+                    etag TEXT,
+                    last_modified TEXT,
+                    body BLOB NOT NULL,
+                    nbytes INTEGER NOT NULL,
+                    fetched REAL NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_responses_fetched ON responses(fetched);
+
+                CREATE TABLE IF NOT EXISTS responses_meta (
+                    id INTEGER PRIMARY KEY CHECK (id = 1),
+                    total_bytes INTEGER NOT NULL
+                );
+                INSERT OR IGNORE INTO responses_meta (id, total_bytes) SELECT 1, COALESCE(SUM(nbytes), 0) FROM responses;
+
+                CREATE TRIGGER IF NOT EXISTS responses_ai AFTER INSERT ON responses BEGIN
+                    UPDATE responses_meta SET total_bytes = total_bytes + new.nbytes WHERE id = 1;
+                END;
+                CREATE TRIGGER IF NOT EXISTS responses_ad AFTER DELETE ON responses BEGIN
+                    UPDATE responses_meta SET total_bytes = total_bytes - old.nbytes WHERE id = 1;
+                END;
+                CREATE TRIGGER IF NOT EXISTS responses_au AFTER UPDATE OF nbytes ON responses BEGIN
+                    UPDATE responses_meta SET total_bytes = total_bytes + new.nbytes - old.nbytes WHERE id = 1;
+                END;
+            """)
+
+    def get(self, url: str) -> Optional[Tuple[FetchResult, float]]:
+        """The cached response and when it was last fetched or revalidated."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT content_type, encoding, etag, last_modified, body, fetched FROM responses WHERE url = ?", (url,)
+            ).fetchone()
+        if row is None:
+            return None
+        content_type, encoding, etag, last_modified, body, fetched = row
+        return FetchResult(
+            url=url, status=200, content=body, content_type=content_type,
+            encoding=encoding, etag=etag, last_modified=last_modified
+        ), fetched
+
+    def put(self, result: FetchResult):
+        with self._lock:
+            conn = self._conn
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute(
+                    """
+                    INSERT INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                    ON CONFLICT(url) DO UPDATE SET
+                        content_type = excluded.content_type, encoding = excluded.encoding,
+                        etag = excluded.etag, last_modified = excluded.last_modified,
+                        body = excluded.body, nbytes = excluded.nbytes, fetched = excluded.fetched
+                    """,
+                    (result.url, result.content_type, result.encoding, result.etag, result.last_modified,
+                     result.content, len(result.content), time.time())
+                )
+                self._evict(conn)
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+    def touch(self, url: str):
+        """Marks the cached response as just revalidated (304)."""
+        with self._lock:
+            self._conn.execute("UPDATE responses SET fetched = ? WHERE url = ?", (time.time(), url))
+
+    def _evict(self, conn: sqlite3.Connection):
+        # Oldest responses first. Sizes vary, so each pass is sized by the
+        # average response and repeated while still over budget.
+        while True:
+            total = conn.execute("SELECT total_bytes FROM responses_meta WHERE id = 1").fetchone()[0]
+            if total <= self.max_bytes:
+                return
+
+            count = conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+            if count == 0:
+                return
+            excess = total - int(self.max_bytes * EVICT_TO_RATIO)
+            n_evict = min(count, -(-excess * count // total))
+            conn.execute(
+                "DELETE FROM responses WHERE url IN (SELECT url FROM responses ORDER BY fetched LIMIT ?)",
+                (n_evict,)
+            )
+
+class WebFetcher:
+    """
+    Shared fetcher for web documents (bookmarks and URLs given to the
+    extractors). One httpx.AsyncClient, on an event loop thread of its own,
+    keeps connections alive across documents and fetches many URLs at once:
+    max_connections in total, at most per_host_connections per host, HTTP/2
+    when the h2 package is installed, gzip/deflate (and br/zstd with their
+    packages) content encoding.
+
+    Requests carry the caller's validators (If-None-Match / If-Modified-Since)
+    so unchanged pages come back as 304 without a body. Responses go to the
+    on-disk cache; get() serves entries younger than cache_fresh_sec from it.
+    """
+    def __init__(
+        self,
+        config: WebFetchConfig,
+        cache: Optional[ResponseCache] = None,
+        transport: Optional[httpx.AsyncBaseTransport] = None
+    ):
+        self.config = config
+        self.cache = cache
+        self._transport = transport
+        self._client: Optional[httpx.AsyncClient] = None
+        self._host_limits: Dict[str, asyncio.Semaphore] = {}
+        self._loop = asyncio.new_event_loop()
+        threading.Thread(target=self._loop.run_forever, name="web-fetch", daemon=True).start()
+
+    def submit(self, requests: Sequence[Tuple[str, Optional[str], Optional[str]]]) -> "Future[List[FetchResult]]":
+        """
+        Starts fetching (url, etag, last_modified) requests concurrently; the
+        future's results are in request order. 304 results have no content.
+        """
+        return asyncio.run_coroutine_threadsafe(self._fetch_all(list(requests)), self._loop)
+
+    def fetch_many(self, requests: Sequence[Tuple[str, Optional[str], Optional[str]]]) -> List[FetchResult]:
+        return self.submit(requests).result()
+
+    def get(self, url: str) -> FetchResult:
+        """The response for url, from the cache when fresh; raises ExtractionError if it cannot be fetched."""
+        cached = self.cache.get(url) if self.cache is not None else None
+        if cached is not None and time.time() - cached[1] < self.config.cache_fresh_sec:
+            return cached[0]
+        etag, last_modified = (cached[0].etag, cached[0].last_modified) if cached is not None else (None, None)
+        result = self.fetch_many([(url, etag, last_modified)])[0]
+        if result.not_modified:
+            if cached is not None:
+                return cached[0]
+            result.error = "304 to an unconditional request"
+        result.raise_for_status()
+        return result
+
+    def _get_client(self) -> httpx.AsyncClient:
+        # Created on the loop thread, on first use
+        if self._client is None:
+            http2 = self.config.http2
+            if http2:
+                try:
+                    import h2  # noqa: F401
+                except ImportError:
+                    http2 = False
+            self._client = httpx.AsyncClient(
+                http2=http2,
+                timeout=self.config.timeout_sec,
+                follow_redirects=True,
+                headers={"User-Agent": self.config.user_agent},
+                limits=httpx.Limits(
+                    max_connections=self.config.max_connections,
+                    max_keepalive_connections=self.config.max_connections
+                ),
+                transport=self._transport
+            )
+        return self._client
+
+    async def _fetch_all(self, requests: List[Tuple[str, Optional[str], Optional[str]]]) -> List[FetchResult]:
+        return list(await asyncio.gather(*(self._fetch(*request) for request in requests)))
+
+    async def _fetch(self, url: str, etag: Optional[str], last_modified: Optional[str]) -> FetchResult:
+        headers = {}
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+        # A malformed URL fails its own result, not the whole batch
+        try:
+            host = urlsplit(url).netloc
+            limit = self._host_limits.get(host)
+            if limit is None:
+                limit = self._host_limits[host] = asyncio.Semaphore(self.config.per_host_connections)
+
+            async with limit:
+                response = await self._get_client().get(url, headers=headers)
+        except (httpx.HTTPError, httpx.InvalidURL, ValueError) as e:
+            return FetchResult(url=url, status=0, error=str(e) or type(e).__name__)
+
+        if response.status_code == 304:
+            if self.cache is not None:
+                await asyncio.to_thread(self.cache.touch, url)
+            return FetchResult(url=url, status=304, etag=etag, last_modified=last_modified)
+        if response.status_code >= 400:
+            return FetchResult(url=url, status=response.status_code, error=f"HTTP {response.status_code}")
+
+        result = FetchResult(
+            url=url,
+            status=response.status_code,
+            content=response.content,
+            content_type=response.headers.get("Content-Type"),
+            encoding=response.encoding,
+            etag=response.headers.get("ETag"),
+            last_modified=response.headers.get("Last-Modified")
+        )
+        if self.cache is not None:
+            await asyncio.to_thread(self.cache.put, result)
+        return result
+
+# One fetcher (client, loop thread, cache connection) per cache file
+_fetchers: Dict[str, WebFetcher] = {}
+_fetchers_lock = threading.Lock()
+
+def get_web_fetcher(config: Optional[AppConfig] = None) -> WebFetcher:
+    """The shared fetcher; without a config, one with default settings and no cache."""
+    web_fetch = config.web_fetch if config is not None else WebFetchConfig()
+    path = config.storage.data_dir / "web_cache.db" if config is not None and web_fetch.cache_mb > 0 else None
+    with _fetchers_lock:
+        fetcher = _fetchers.get(str(path))
+        if fetcher is None:
+            cache = ResponseCache(path, int(web_fetch.cache_mb * 1024 * 1024)) if path is not None else None
+            fetcher = _fetchers[str(path)] = WebFetcher(web_fetch, cache)
+        return fetcher
@@ -1,15 +1,14 @@
 from bs4 import BeautifulSoup
-import requests
 from backend.app.domain.ports import ContentExtractor
 from backend.app.domain.models import ExtractedContent
 from backend.app.domain.errors import ExtractionError
 from backend.app.config.schema import AppConfig
+from backend.app.adapters.content.fetch import get_web_fetcher
 
 class HTMLExtractor(ContentExtractor):
     def __init__(self, config: AppConfig):
+        self.config = config
         self.enabled = config.web_fetch.enabled
-        self.timeout = config.web_fetch.timeout_sec
-        self.user_agent = config.web_fetch.user_agent
 
     def extract(self, document_uri: str) -> ExtractedContent:
         if not self.enabled and (document_uri.startswith("http://") or document_uri.startswith("https://")):
@@ -17,11 +16,10 @@ class HTMLExtractor(ContentExtractor):
 
         try:
             if document_uri.startswith("http://") or document_uri.startswith("https://"):
-                headers = {"User-Agent": self.user_agent}
-                response = requests.get(document_uri, headers=headers, timeout=self.timeout)
-                response.raise_for_status()
+                # Shared pooled client; a page fetched by the bookmark scan comes from its cache
+                response = get_web_fetcher(self.config).get(document_uri)
                 html_content = response.text
-                content_type = response.headers.get("Content-Type", "text/html")
+                content_type = response.content_type or "text/html"
             else:
                 # Local file
                 path = document_uri.replace("file://", "")
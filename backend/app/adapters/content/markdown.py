@@ -1,20 +1,23 @@
 import re
+from typing import Optional
 from urllib.parse import urlparse
 from backend.app.domain.ports import ContentExtractor
 from backend.app.domain.models import ExtractedContent
 from backend.app.domain.errors import ExtractionError
-import requests
+from backend.app.config.schema import AppConfig
+from backend.app.adapters.content.fetch import get_web_fetcher
 
 class MarkdownExtractor(ContentExtractor):
+    def __init__(self, config: Optional[AppConfig] = None):
+        self.config = config
+
     def extract(self, document_uri: str) -> ExtractedContent:
         try:
             parsed = urlparse(document_uri)
             content = ""
             
             if parsed.scheme in ('http', 'https'):
-                response = requests.get(document_uri, timeout=10)
-                response.raise_for_status()
-                content = response.text
+                content = get_web_fetcher(self.config).get(document_uri).text
             else:
                 path = document_uri
                 if parsed.scheme == 'file':
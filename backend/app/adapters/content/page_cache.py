@@ -0,0 +1,118 @@
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Sequence
+
+# Keys per IN (...) clause, well below SQLITE_MAX_VARIABLE_NUMBER
+LOOKUP_BATCH = 500
+# After an over-budget write, evict down to this fraction of the budget
+EVICT_TO_RATIO = 0.9
+
+class PageTextCache:
+    """
+    Extracted text of PDF pages in a single SQLite file, keyed by a hash of
+    the page's content (see PDFExtractor), so the pages of a PDF that was
+    re-saved or grew by a page are not extracted again.
+
+    The total size is tracked by triggers in a one-row meta table, and writes
+    that push it over `max_bytes` evict the least recently written pages. WAL
+    mode plus a busy timeout lets several worker processes share the file.
+    """
+    def __init__(self, path: Path, max_bytes: int):
+        self.path = path
+        self.max_bytes = max_bytes
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(path), timeout=30.0, check_same_thread=False, isolation_level=None)
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript("""
+                CREATE TABLE IF NOT EXISTS pages (
+                    key TEXT PRIMARY KEY,
+                    text TEXT NOT NULL,
+                    nbytes INTEGER NOT NULL,
+                    written REAL NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_pages_written ON pages(written);
+
+                CREATE TABLE IF NOT EXISTS pages_meta (
+                    id INTEGER PRIMARY KEY CHECK (id = 1),
+                    total_bytes INTEGER NOT NULL
+                );
+                INSERT OR IGNORE INTO pages_meta (id, total_bytes) SELECT 1, COALESCE(SUM(nbytes), 0) FROM pages;
+
+                CREATE TRIGGER IF NOT EXISTS pages_ai AFTER INSERT ON pages BEGIN
+                    UPDATE pages_meta SET total_bytes = total_bytes + new.nbytes WHERE id = 1;
+                END;
+                CREATE TRIGGER IF NOT EXISTS pages_ad AFTER DELETE ON pages BEGIN
+                    UPDATE pages_meta SET total_bytes = total_bytes - old.nbytes WHERE id = 1;
+                END;
+                CREATE TRIGGER IF NOT EXISTS pages_au AFTER UPDATE OF nbytes ON pages BEGIN
+                    UPDATE pages_meta SET total_bytes = total_bytes + new.nbytes - old.nbytes WHERE id = 1;
+                END;
+            """)
+
+    def get_many(self, keys: Sequence[str]) -> Dict[str, str]:
+        found: Dict[str, str] = {}
+        with self._lock:
+            for start in range(0, len(keys), LOOKUP_BATCH):
+                batch = list(keys[start:start + LOOKUP_BATCH])
+                placeholders = ",".join("?" * len(batch))
+                found.update(self._conn.execute(
+                    f"SELECT key, text FROM pages WHERE key IN ({placeholders})", batch
+                ).fetchall())
+        return found
+
+    def put_many(self, items: Dict[str, str]) -> None:
+        if not items:
+            return
+        now = time.time()
+        rows = [(key, text, len(text.encode("utf-8")), now) for key, text in items.items()]
+        with self._lock:
+            conn = self._conn
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.executemany(
+                    """
+                    INSERT INTO pages (key, text, nbytes, written) VALUES (?, ?, ?, ?)
+                    ON CONFLICT(key) DO UPDATE SET
+                        text = excluded.text, nbytes = excluded.nbytes, written = excluded.written
+                    """,
+                    rows
+                )
+                self._evict(conn)
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+    def _evict(self, conn: sqlite3.Connection):
+        # Oldest pages first. Pages vary in size, so each pass is sized by the
+        # average page and repeated while still over budget.
+        while True:
+            total = conn.execute("SELECT total_bytes FROM pages_meta WHERE id = 1").fetchone()[0]
+            if total <= self.max_bytes:
+                return
+
+            count = conn.execute("SELECT COUNT(*) FROM pages").fetchone()[0]
+            if count == 0:
+                return
+            excess = total - int(self.max_bytes * EVICT_TO_RATIO)
+            n_evict = min(count, -(-excess * count // total))
+            conn.execute(
+                "DELETE FROM pages WHERE key IN (SELECT key FROM pages ORDER BY written LIMIT ?)",
+                (n_evict,)
+            )
+
+# One instance (and connection) per file, shared by the extractors
+_caches: Dict[str, PageTextCache] = {}
+_caches_lock = threading.Lock()
+
+def get_page_cache(path: Path, max_bytes: int) -> PageTextCache:
+    with _caches_lock:
+        cache = _caches.get(str(path))
+        if cache is None:
+            cache = _caches[str(path)] = PageTextCache(path, max_bytes)
+        return cache
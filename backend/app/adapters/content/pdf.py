@@ -1,51 +1,212 @@
-from pypdf import PdfReader
+from pypdf import PageObject, PdfReader
+from pypdf.generic import ArrayObject, DictionaryObject, IndirectObject, StreamObject
 from backend.app.domain.ports import ContentExtractor
 from backend.app.domain.models import ExtractedContent
 from backend.app.domain.errors import ExtractionError
+from backend.app.config.schema import AppConfig
+from backend.app.adapters.content.page_cache import PageTextCache, get_page_cache
+from backend.app.adapters.content.fetch import get_web_fetcher
+import hashlib
 import io
-import requests
+import multiprocessing
+import os
+import threading
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Any, BinaryIO, Deque, Dict, Iterator, List, Optional, Tuple, Union
 from urllib.parse import urlparse
 
+# Extracted pages are written to the page cache in batches of this many
+CACHE_WRITE_PAGES = 32
+
 class PDFExtractor(ContentExtractor):
+    """
+    PDF text, one segment per page (empty for pages without text).
+
+    With a config, pages already extracted are read from the page cache, and
+    PDFs of at least ingestion.pdf_parallel_min_pages pages have the others
+    extracted in a process pool, pdf_pages_per_task pages per task, the
+    results still streamed in page order. Without one, pages are extracted
+    serially and not cached.
+    """
+    def __init__(self, config: Optional[AppConfig] = None):
+        self.config = config
+        self.cache: Optional[PageTextCache] = None
+        self.workers = 1
+        self.parallel_min_pages = 0
+        self.pages_per_task = 1
+        if config is not None:
+            ingestion = config.ingestion
+            self.workers = ingestion.pdf_workers or os.cpu_count() or 1
+            self.parallel_min_pages = ingestion.pdf_parallel_min_pages
+            self.pages_per_task = ingestion.pdf_pages_per_task
+            if ingestion.pdf_page_cache_mb > 0:
+                self.cache = get_page_cache(
+                    config.storage.data_dir / "pdf_pages.db", int(ingestion.pdf_page_cache_mb * 1024 * 1024)
+                )
+
     def extract(self, document_uri: str) -> ExtractedContent:
+        content, pages = self.extract_segments(document_uri)
+        content.text = "".join(pages).strip()
+        return content
+
+    def extract_segments(self, document_uri: str) -> Tuple[ExtractedContent, Iterator[str]]:
+        # Pages are extracted as the iterator is consumed
+        f = None
+        try:
+            f = self._open(document_uri)
+            reader = PdfReader(f)
+
+            # Extract metadata
+            info = reader.metadata
+            title = info.title if info and info.title else None
+
+            content = ExtractedContent(
+                text="",
+                title=title,
+                mime_type="application/pdf",
+                # Segment i is page i + 1 (IndexingService records chunk pages)
+                extra={"page_count": len(reader.pages), "page_segments": True}
+            )
+        except Exception as e:
+            if f is not None:
+                f.close()
+            raise ExtractionError(f"Failed to extract PDF content from {document_uri}: {str(e)}")
+        return content, self._pages(document_uri, reader, f)
+
+    def _open(self, document_uri: str) -> BinaryIO:
+        # Handle local file or URL
+        parsed = urlparse(document_uri)
+        if parsed.scheme in ('http', 'https'):
+            return io.BytesIO(get_web_fetcher(self.config).get(document_uri).content)
+        # Assume local path if no scheme or file scheme
+        path = document_uri
+        if parsed.scheme == 'file':
+            path = parsed.path
+        return open(path, 'rb')
+
+    def _pages(self, document_uri: str, reader: PdfReader, f: BinaryIO) -> Iterator[str]:
         try:
-            # Handle local file or URL
-            parsed = urlparse(document_uri)
-            if parsed.scheme in ('http', 'https'):
-                response = requests.get(document_uri, timeout=10)
-                response.raise_for_status()
-                f = io.BytesIO(response.content)
+            page_count = len(reader.pages)
+            keys: List[Optional[str]] = [None] * page_count
+            cached: Dict[str, str] = {}
+            if self.cache is not None:
+                digests: Dict[Tuple[int, int], bytes] = {}
+                keys = [_page_fingerprint(page, digests) for page in reader.pages]
+                cached = self.cache.get_many(keys)
+
+            missing = [i for i, key in enumerate(keys) if key not in cached]
+            if self.workers > 1 and len(missing) > 1 and page_count >= self.parallel_min_pages:
+                extracted = self._extract_parallel(f, missing)
             else:
-                # Assume local path if no scheme or file scheme
-                path = document_uri
-                if parsed.scheme == 'file':
-                    path = parsed.path
-                f = open(path, 'rb')
-
-            try:
-                reader = PdfReader(f)
-                text = ""
-                page_count = len(reader.pages)
-                
-                # Extract text from all pages
-                for page in reader.pages:
-                    page_text = page.extract_text()
-                    if page_text:
-                        text += page_text + "\n\n"
-                
-                # Extract metadata
-                info = reader.metadata
-                title = info.title if info and info.title else None
-                
-                return ExtractedContent(
-                    text=text.strip(),
-                    title=title,
-                    mime_type="application/pdf",
-                    extra={"page_count": page_count}
-                )
-            finally:
-                if not isinstance(f, io.BytesIO):
-                    f.close()
-                    
+                extracted = ((i, reader.pages[i].extract_text()) for i in missing)
+
+            pending: Dict[str, str] = {}
+            for i, key in enumerate(keys):
+                if key in cached:
+                    page_text = cached[key]
+                else:
+                    _, page_text = next(extracted)
+                    page_text = page_text or ""
+                    if self.cache is not None:
+                        pending[key] = page_text
+                        if len(pending) >= max(CACHE_WRITE_PAGES, self.pages_per_task):
+                            self.cache.put_many(pending)
+                            pending = {}
+                yield page_text + "\n\n" if page_text else ""
+            if pending:
+                self.cache.put_many(pending)
         except Exception as e:
             raise ExtractionError(f"Failed to extract PDF content from {document_uri}: {str(e)}")
+        finally:
+            f.close()
+
+    def _extract_parallel(self, f: BinaryIO, pages: List[int]) -> Iterator[Tuple[int, str]]:
+        """(page index, text) of pages, in order, extracted in the process pool."""
+        # Workers reopen local files by path; downloaded PDFs are sent as bytes
+        source: Union[str, bytes] = f.name if isinstance(getattr(f, "name", None), str) else f.getvalue()
+        tasks = [pages[i:i + self.pages_per_task] for i in range(0, len(pages), self.pages_per_task)]
+        pool = _get_pool(self.workers)
+        # A few tasks ahead of the consumer keep every worker busy without
+        # piling up the text of the whole document
+        in_flight: Deque[Future] = deque()
+        try:
+            for task in tasks:
+                in_flight.append(pool.submit(_extract_pages, source, task))
+                if len(in_flight) >= 2 * self.workers:
+                    yield from in_flight.popleft().result()
+            while in_flight:
+                yield from in_flight.popleft().result()
+        finally:
+            for future in in_flight:
+                future.cancel()
+
+def _extract_pages(source: Union[str, bytes], pages: List[int]) -> List[Tuple[int, str]]:
+    """Runs in a pool worker: text of the given pages (0-based) of a PDF file or its bytes."""
+    reader = PdfReader(io.BytesIO(source) if isinstance(source, bytes) else source)
+    return [(i, reader.pages[i].extract_text()) for i in pages]
+
+# Shared by all extractors; spawned, not forked, since the server runs threads
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_workers = 0
+_pool_lock = threading.Lock()
+
+def _get_pool(workers: int) -> ProcessPoolExecutor:
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is None or _pool_workers != workers:
+            if _pool is not None:
+                _pool.shutdown(wait=False)
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+            _pool_workers = workers
+        return _pool
+
+# Page entries that affect the extracted text
+_PAGE_KEYS = ("/Contents", "/Resources", "/Rotate")
+# Back-references that would pull in the page tree or other pages
+_SKIPPED_KEYS = {"/Parent", "/P"}
+
+def _page_fingerprint(page: PageObject, digests: Dict[Tuple[int, int], bytes]) -> str:
+    """
+    Hash of what a page's text is extracted from: its content streams and the
+    resources (fonts, forms) they use, by value rather than by object number,
+    so the same page in a re-saved or extended file hashes the same. digests
+    memoizes indirect objects shared between the pages of one file.
+    """
+    h = hashlib.sha256()
+    for key in _PAGE_KEYS:
+        h.update(key.encode())
+        _hash_object(page.get(key), h, digests, set())
+    return h.hexdigest()
+
+def _hash_object(obj: Any, h: "hashlib._Hash", digests: Dict[Tuple[int, int], bytes], visiting: set):
+    if isinstance(obj, IndirectObject):
+        ref = (obj.idnum, obj.generation)
+        if ref not in digests:
+            if ref in visiting:
+                h.update(b"<cycle>")
+                return
+            visiting.add(ref)
+            inner = hashlib.sha256()
+            _hash_object(obj.get_object(), inner, digests, visiting)
+            visiting.discard(ref)
+            digests[ref] = inner.digest()
+        h.update(b"R" + digests[ref])
+    elif isinstance(obj, DictionaryObject):
+        h.update(b"<<")
+        for key in sorted(obj):
+            if key not in _SKIPPED_KEYS:
+                h.update(key.encode())
+                _hash_object(dict.__getitem__(obj, key), h, digests, visiting)
+        h.update(b">>")
+        if isinstance(obj, StreamObject):
+            # Raw (still encoded) bytes: no need to decompress to compare
+            h.update(b"stream")
+            h.update(getattr(obj, "_data", None) or b"")
+    elif isinstance(obj, ArrayObject):
+        h.update(b"[")
+        for item in list.__iter__(obj):
+            _hash_object(item, h, digests, visiting)
+        h.update(b"]")
+    else:
+        h.update(repr(obj).encode())
@@ -0,0 +1,36 @@
+from typing import Iterator, Tuple
+from urllib.parse import urlparse
+from backend.app.domain.ports import ContentExtractor
+from backend.app.domain.models import ExtractedContent
+from backend.app.domain.errors import ExtractionError
+
+# Characters per read when streaming a file
+READ_CHARS = 1 << 20
+
+class PlainTextExtractor(ContentExtractor):
+    """Local .txt files, read in blocks so large exports never sit in memory whole."""
+    def extract(self, document_uri: str) -> ExtractedContent:
+        content, blocks = self.extract_segments(document_uri)
+        content.text = "".join(blocks)
+        return content
+
+    def extract_segments(self, document_uri: str) -> Tuple[ExtractedContent, Iterator[str]]:
+        parsed = urlparse(document_uri)
+        path = parsed.path if parsed.scheme == 'file' else document_uri
+        try:
+            f = open(path, 'r', encoding='utf-8')
+        except Exception as e:
+            raise ExtractionError(f"Failed to extract text content from {document_uri}: {str(e)}")
+        return ExtractedContent(text="", mime_type="text/plain"), self._blocks(document_uri, f)
+
+    def _blocks(self, document_uri: str, f) -> Iterator[str]:
+        try:
+            while True:
+                block = f.read(READ_CHARS)
+                if not block:
+                    break
+                yield block
+        except Exception as e:
+            raise ExtractionError(f"Failed to extract text content from {document_uri}: {str(e)}")
+        finally:
+            f.close()
@@ -0,0 +1,122 @@
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
+import httpx
+from backend.app.util.metrics import REGISTRY
+
+ENDPOINT_REQUEST_SECONDS = REGISTRY.histogram(
+    "embedding_request_seconds", "Embedding server request latency per endpoint", labels=("endpoint",)
+)
+ENDPOINT_OUTSTANDING = REGISTRY.gauge(
+    "embedding_endpoint_outstanding", "In-flight embedding requests per endpoint", labels=("endpoint",)
+)
+ENDPOINT_HEALTHY = REGISTRY.gauge(
+    "embedding_endpoint_healthy", "1 if the endpoint is in rotation, 0 if ejected", labels=("endpoint",)
+)
+
+# Weight of the newest sample in the latency moving average
+LATENCY_EWMA_ALPHA = 0.2
+
+class Endpoint:
+    def __init__(self, base_url: str):
+        self.base_url = base_url.rstrip("/")
+        # /readyz lives at the server root, next to the /v1 API
+        root = self.base_url[:-3] if self.base_url.endswith("/v1") else self.base_url
+        self.ready_url = f"{root}/readyz"
+        self.outstanding = 0
+        self.healthy = True
+        self.requests = 0
+        self.failures = 0
+        self.latency_ewma: Optional[float] = None
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "outstanding": self.outstanding,
+            "healthy": int(self.healthy),
+            "requests": self.requests,
+            "failures": self.failures,
+            "latency_ewma_ms": round((self.latency_ewma or 0.0) * 1000.0, 3),
+        }
+
+class EndpointPool:
+    """
+    Least-outstanding-requests balancing over embedding server replicas.
+
+    An endpoint is ejected when a request to it fails at the transport level
+    (or it answers 503), and while its /readyz probe fails; a background
+    thread re-probes every `probe_interval_sec` and puts it back once ready.
+    If every endpoint is ejected, all of them are tried anyway.
+    """
+    def __init__(self, base_urls: List[str], client: httpx.Client, probe_interval_sec: float):
+        self.endpoints = [Endpoint(url) for url in base_urls]
+        self.client = client
+        self.probe_interval_sec = probe_interval_sec
+        self._lock = threading.Lock()
+        self._prober: Optional[threading.Thread] = None
+        for endpoint in self.endpoints:
+            ENDPOINT_HEALTHY.set(1, endpoint=endpoint.base_url)
+
+    @contextmanager
+    def lease(self) -> Iterator[Endpoint]:
+        self._ensure_prober()
+        with self._lock:
+            candidates = [e for e in self.endpoints if e.healthy] or self.endpoints
+            # Ties go to the endpoint that has been answering fastest
+            endpoint = min(candidates, key=lambda e: (e.outstanding, e.latency_ewma or 0.0))
+            endpoint.outstanding += 1
+            ENDPOINT_OUTSTANDING.set(endpoint.outstanding, endpoint=endpoint.base_url)
+
+        start = time.perf_counter()
+        try:
+            yield endpoint
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                endpoint.outstanding -= 1
+                endpoint.requests += 1
+                if endpoint.latency_ewma is None:
+                    endpoint.latency_ewma = elapsed
+                else:
+                    endpoint.latency_ewma += LATENCY_EWMA_ALPHA * (elapsed - endpoint.latency_ewma)
+                ENDPOINT_OUTSTANDING.set(endpoint.outstanding, endpoint=endpoint.base_url)
+            ENDPOINT_REQUEST_SECONDS.observe(elapsed, endpoint=endpoint.base_url)
+
+    def eject(self, endpoint: Endpoint):
+        with self._lock:
+            endpoint.failures += 1
+            if endpoint.healthy and len(self.endpoints) > 1:
+                print(f"Embedding endpoint {endpoint.base_url} ejected")
+                endpoint.healthy = False
+                ENDPOINT_HEALTHY.set(0, endpoint=endpoint.base_url)
+
+    def probe(self):
+        """Checks /readyz of every endpoint once and updates the rotation."""
+        for endpoint in self.endpoints:
+            try:
+                ready = self.client.get(endpoint.ready_url, timeout=2.0).status_code == 200
+            except httpx.HTTPError:
+                ready = False
+            with self._lock:
+                if ready != endpoint.healthy:
+                    print(f"Embedding endpoint {endpoint.base_url} {'back in rotation' if ready else 'ejected (not ready)'}")
+                endpoint.healthy = ready
+                ENDPOINT_HEALTHY.set(int(ready), endpoint=endpoint.base_url)
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            return {e.base_url: e.stats() for e in self.endpoints}
+
+    def _ensure_prober(self):
+        # A single endpoint has nowhere to fail over to, so it is never probed
+        if self._prober is not None or len(self.endpoints) < 2:
+            return
+        with self._lock:
+            if self._prober is None:
+                self._prober = threading.Thread(target=self._probe_loop, name="embed-probe", daemon=True)
+                self._prober.start()
+
+    def _probe_loop(self):
+        while True:
+            time.sleep(self.probe_interval_sec)
+            self.probe()
@@ -0,0 +1,163 @@
+import sqlite3
+import threading
+import time
+import numpy as np
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence
+
+# Keys per IN (...) clause, well below SQLITE_MAX_VARIABLE_NUMBER
+LOOKUP_BATCH = 500
+# last_used is only rewritten when older than this, so hits are (almost) read-only
+TOUCH_INTERVAL_SEC = 60.0
+# After an over-budget write, evict down to this fraction of the budget
+EVICT_TO_RATIO = 0.9
+
+class EmbeddingCache:
+    """
+    Document embedding cache in a single SQLite file.
+
+    Vectors are stored as float16 BLOBs keyed by hash(text + model). The total
+    size is tracked by triggers in a one-row meta table, and writes that push
+    it over `max_bytes` evict the least recently used entries. WAL mode plus a
+    busy timeout lets several worker processes share the file.
+    """
+    def __init__(self, path: Path, max_bytes: int):
+        self.path = path
+        self.max_bytes = max_bytes
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(path), timeout=30.0, check_same_thread=False, isolation_level=None)
+        self._init_db()
+
+    def _init_db(self):
+        with self._lock:
+            conn = self._conn
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS embeddings (
+                    key TEXT PRIMARY KEY,
+                    vector BLOB NOT NULL,
+                    nbytes INTEGER NOT NULL,
+                    last_used REAL NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_embeddings_last_used ON embeddings(last_used);
+
+                CREATE TABLE IF NOT EXISTS embeddings_meta (
+                    id INTEGER PRIMARY KEY CHECK (id = 1),
+                    total_bytes INTEGER NOT NULL
+                );
+                INSERT OR IGNORE INTO embeddings_meta (id, total_bytes) VALUES (1, 0);
+
+                CREATE TRIGGER IF NOT EXISTS embeddings_ai AFTER INSERT ON embeddings BEGIN
+                    UPDATE embeddings_meta SET total_bytes = total_bytes + new.nbytes WHERE id = 1;
+                END;
+                CREATE TRIGGER IF NOT EXISTS embeddings_ad AFTER DELETE ON embeddings BEGIN
+                    UPDATE embeddings_meta SET total_bytes = total_bytes - old.nbytes WHERE id = 1;
+                END;
+                CREATE TRIGGER IF NOT EXISTS embeddings_au AFTER UPDATE OF nbytes ON embeddings BEGIN
+                    UPDATE embeddings_meta SET total_bytes = total_bytes + new.nbytes - old.nbytes WHERE id = 1;
+                END;
+            """)
+
+    def get_many(self, keys: Sequence[str]) -> Dict[str, np.ndarray]:
+        """One query per LOOKUP_BATCH keys; returns float32 vectors for the keys found."""
+        found: Dict[str, np.ndarray] = {}
+        now = time.time()
+        with self._lock:
+            for start in range(0, len(keys), LOOKUP_BATCH):
+                batch = list(keys[start:start + LOOKUP_BATCH])
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT key, vector, last_used FROM embeddings WHERE key IN ({placeholders})", batch
+                ).fetchall()
+
+                stale = []
+                for key, blob, last_used in rows:
+                    found[key] = np.frombuffer(blob, dtype=np.float16).astype(np.float32)
+                    if now - last_used > TOUCH_INTERVAL_SEC:
+                        stale.append(key)
+                if stale:
+                    self._conn.execute(
+                        f"UPDATE embeddings SET last_used = ? WHERE key IN ({','.join('?' * len(stale))})",
+                        [now] + stale
+                    )
+        return found
+
+    def put_many(self, items: Dict[str, Sequence[float]]) -> None:
+        if not items:
+            return
+        now = time.time()
+        rows = []
+        for key, vector in items.items():
+            blob = np.asarray(vector, dtype=np.float16).tobytes()
+            rows.append((key, blob, len(blob), now))
+
+        with self._lock:
+            conn = self._conn
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.executemany(
+                    """
+                    INSERT INTO embeddings (key, vector, nbytes, last_used) VALUES (?, ?, ?, ?)
+                    ON CONFLICT(key) DO UPDATE SET
+                        vector = excluded.vector, nbytes = excluded.nbytes, last_used = excluded.last_used
+                    """,
+                    rows
+                )
+                self._evict(conn)
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+    def _evict(self, conn: sqlite3.Connection):
+        total = conn.execute("SELECT total_bytes FROM embeddings_meta WHERE id = 1").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        count = conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        if count == 0:
+            return
+        # Entries of one model all have the same size, so the average is exact enough
+        excess = total - int(self.max_bytes * EVICT_TO_RATIO)
+        n_evict = min(count, -(-excess * count // total))
+        conn.execute(
+            "DELETE FROM embeddings WHERE key IN (SELECT key FROM embeddings ORDER BY last_used LIMIT ?)",
+            (n_evict,)
+        )
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            total = self._conn.execute("SELECT total_bytes FROM embeddings_meta WHERE id = 1").fetchone()[0]
+            count = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        return {"size": count, "bytes": total}
+
+# One instance (and connection) per file, shared by the per-request providers
+_caches: Dict[str, EmbeddingCache] = {}
+_caches_lock = threading.Lock()
+
+def get_embedding_cache(path: Path, max_bytes: int) -> EmbeddingCache:
+    with _caches_lock:
+        cache = _caches.get(str(path))
+        if cache is None:
+            cache = _caches[str(path)] = EmbeddingCache(path, max_bytes)
+        return cache
+
+def embed_cached(
+    cache: Optional[EmbeddingCache],
+    keys: List[str],
+    texts: List[str],
+    compute: Callable[[List[str]], Sequence[Sequence[float]]]
+) -> list:
+    """Vectors for `texts`, computing (and storing) only the cache misses."""
+    cached = cache.get_many(keys) if cache is not None else {}
+    vectors = [cached.get(key) for key in keys]
+    missing = [i for i, vec in enumerate(vectors) if vec is None]
+    if missing:
+        computed = compute([texts[i] for i in missing])
+        for i, vec in zip(missing, computed):
+            vectors[i] = vec
+        if cache is not None:
+            cache.put_many({keys[i]: vec for i, vec in zip(missing, computed)})
+    return vectors
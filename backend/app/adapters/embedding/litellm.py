@@ -1,89 +1,221 @@
-from typing import List
-from uuid import UUID
+import base64
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Sequence, Tuple
 import httpx
-import json
-import os
+import numpy as np
 from backend.app.domain.ports import EmbeddingProvider
-from backend.app.config.schema import AppConfig
+from backend.app.config.schema import AppConfig, EmbeddingConfig
 from backend.app.util.hashing import compute_hash
+from backend.app.adapters.embedding.embedding_cache import get_embedding_cache, embed_cached
+from backend.app.adapters.embedding.balancer import EndpointPool
+
+# Responses that mean "send less at once": HFserve's concurrency semaphore (429)
+# and request-size limits (413). Batches shrink and the request is retried.
+THROTTLE_STATUSES = (429, 413)
+RETRY_STATUSES = (500, 502, 503, 504)
+BACKOFF_BASE_SEC = 0.25
+BACKOFF_MAX_SEC = 10.0
+
+class AdaptiveBatchSize:
+    """
+    Process-wide batch size limit: halved on throttling responses, grown back
+    by one after every few successful requests (AIMD).
+    """
+    GROW_AFTER = 8
+
+    def __init__(self, maximum: int):
+        self.maximum = maximum
+        self.current = maximum
+        self._successes = 0
+        self._lock = threading.Lock()
+
+    def shrink(self) -> int:
+        with self._lock:
+            self.current = max(1, self.current // 2)
+            self._successes = 0
+            return self.current
+
+    def success(self):
+        with self._lock:
+            self._successes += 1
+            if self._successes >= self.GROW_AFTER and self.current < self.maximum:
+                self.current += 1
+                self._successes = 0
+
+# Shared by the per-request provider instances: one connection pool, one
+# pool of batch workers, one batch size limit per process, and one endpoint
+# pool per endpoint list (a model migration embeds with two models at once).
+_http_client: Optional[httpx.Client] = None
+_batch_executor: Optional[ThreadPoolExecutor] = None
+_batch_size: Optional[AdaptiveBatchSize] = None
+_endpoint_pools: Dict[Tuple[str, ...], EndpointPool] = {}
+_shared_lock = threading.Lock()
+
+def _get_shared(config: EmbeddingConfig):
+    global _http_client, _batch_executor, _batch_size
+    with _shared_lock:
+        if _http_client is None:
+            # max_concurrency is per replica, so throughput grows with the endpoint list
+            concurrency = config.max_concurrency * len(config.endpoints)
+            _http_client = httpx.Client(
+                timeout=config.request_timeout_sec,
+                # Headroom for query embeddings next to a full set of indexing batches
+                limits=httpx.Limits(
+                    max_connections=concurrency * 2,
+                    max_keepalive_connections=concurrency * 2
+                )
+            )
+            _batch_executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="embed-batch")
+            _batch_size = AdaptiveBatchSize(config.batch_size)
+        key = tuple(config.endpoints)
+        if key not in _endpoint_pools:
+            _endpoint_pools[key] = EndpointPool(config.endpoints, _http_client, config.health_check_interval_sec)
+        return _http_client, _batch_executor, _batch_size, _endpoint_pools[key]
+
+def estimate_tokens(text: str) -> int:
+    # ~4 characters per token; only used to bound request size
+    return len(text) // 4 + 1
 
 class LiteLLMEmbeddingProvider(EmbeddingProvider):
     def __init__(self, config: AppConfig):
-        self.api_base = "http://localhost:8005/v1" # Default, could be config
-        # Ideally config.embedding.provider could specify the URL or we derive it
-        # For now hardcode to our local service or use a specific env var
-        self.api_url = f"{self.api_base}/embeddings"
         self.model_name = config.embedding.model_name
         self.dim = config.embedding.dim
-        self.cache_dir = config.storage.data_dir / "cache" / "embeddings"
-        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_tokens_per_request = config.embedding.max_tokens_per_request
+        self.max_retries = config.embedding.max_retries
+        self.encoding_format = config.embedding.encoding_format
+        self.transport_dtype = config.embedding.transport_dtype
+        self.client, self.executor, self.batch_size, self.endpoints = _get_shared(config.embedding)
+        self.cache = None
+        if config.embedding.cache_mb > 0:
+            self.cache = get_embedding_cache(
+                config.storage.data_dir / "cache" / "embeddings.db",
+                max_bytes=int(config.embedding.cache_mb * 1024 * 1024)
+            )
 
     def embed_texts(self, texts: List[str]) -> List[List[float]]:
         if not texts:
             return []
 
-        # Check cache first
-        vectors = [None] * len(texts)
-        texts_to_fetch = []
-        indices_to_fetch = []
-
-        for i, text in enumerate(texts):
-            cached = self._get_from_cache(text)
-            if cached:
-                vectors[i] = cached
-            else:
-                texts_to_fetch.append(text)
-                indices_to_fetch.append(i)
-
-        if texts_to_fetch:
-            # Batch fetch from API
-            try:
-                fetched_vectors = self._fetch_embeddings(texts_to_fetch)
-                for idx, vec in zip(indices_to_fetch, fetched_vectors):
-                    vectors[idx] = vec
-                    self._save_to_cache(texts[idx], vec)
-            except Exception as e:
-                # If API fails, we might want to retry or raise
-                raise RuntimeError(f"Embedding API call failed: {e}")
-
-        return vectors # type: ignore
+        # Cache first (one lookup for the whole batch), then fetch the misses
+        keys = [self._get_cache_key(text) for text in texts]
+        return embed_cached(self.cache, keys, texts, self._fetch_or_raise)
+
+    def _fetch_or_raise(self, texts: List[str]) -> List[Sequence[float]]:
+        try:
+            return self._fetch_embeddings(texts)
+        except Exception as e:
+            # If API fails, we might want to retry or raise
+            raise RuntimeError(f"Embedding API call failed: {e}")
+
+    def embed_query(self, text: str) -> List[float]:
+        # Query vectors are cached in-process by the search layer (QueryEmbeddingCache);
+        # keeping every distinct query in the document cache would only churn it.
+        try:
+            return self._fetch_embeddings([text])[0]
+        except Exception as e:
+            raise RuntimeError(f"Embedding API call failed: {e}")
 
     def _get_cache_key(self, text: str) -> str:
         # Cache key: hash(text + model_name)
         return compute_hash(text + self.model_name)
 
-    def _get_from_cache(self, text: str) -> List[float] | None:
-        key = self._get_cache_key(text)
-        path = self.cache_dir / f"{key}.json"
-        if path.exists():
-            try:
-                with open(path, "r") as f:
-                    return json.load(f)
-            except:
-                return None
-        return None
-
-    def _save_to_cache(self, text: str, vector: List[float]):
-        key = self._get_cache_key(text)
-        path = self.cache_dir / f"{key}.json"
-        with open(path, "w") as f:
-            json.dump(vector, f)
-
-    def _fetch_embeddings(self, texts: List[str]) -> List[List[float]]:
-        # Call the OpenAI compatible embedding endpoint
-        payload = {
-            "model": self.model_name,
-            "input": texts
-        }
-        
-        # We use a context manager for the client to ensure cleanup
-        # Note: synchronous for now as per interface, could be async in future
-        with httpx.Client(timeout=60.0) as client:
-            response = client.post(self.api_url, json=payload)
-            response.raise_for_status()
-            data = response.json()
-            
-            # Sort by index to ensure order matches input
-            # OpenAI format: data: [{object: embedding, embedding: [...], index: 0}, ...]
-            results = sorted(data['data'], key=lambda x: x['index'])
+    def _fetch_embeddings(self, texts: List[str]) -> List[Sequence[float]]:
+        # Bounded batches (count and estimated tokens), several in flight at once
+        batches = self._make_batches(texts, self.batch_size.current)
+        if len(batches) == 1:
+            return self._post_batch(batches[0])
+
+        vectors: List[Sequence[float]] = []
+        for batch_vectors in self.executor.map(self._post_batch, batches):
+            vectors.extend(batch_vectors)
+        return vectors
+
+    def _make_batches(self, texts: List[str], max_items: int) -> List[List[str]]:
+        batches: List[List[str]] = []
+        current: List[str] = []
+        tokens = 0
+        for text in texts:
+            text_tokens = estimate_tokens(text)
+            if current and (len(current) >= max_items or tokens + text_tokens > self.max_tokens_per_request):
+                batches.append(current)
+                current, tokens = [], 0
+            current.append(text)
+            tokens += text_tokens
+        if current:
+            batches.append(current)
+        return batches
+
+    def _post_batch(self, texts: List[str]) -> List[Sequence[float]]:
+        attempt = 0
+        while True:
+            # Each attempt goes to the least loaded replica, so retries fail over
+            with self.endpoints.lease() as endpoint:
+                try:
+                    response = self.client.post(f"{endpoint.base_url}/embeddings", json=self._payload(texts))
+                except httpx.TransportError:
+                    self.endpoints.eject(endpoint)
+                    if attempt >= self.max_retries:
+                        raise
+                    response = None
+                else:
+                    if response.status_code == 503:
+                        # Model not loaded (yet); the /readyz probe re-admits it
+                        self.endpoints.eject(endpoint)
+
+            if response is not None and response.status_code in THROTTLE_STATUSES:
+                if attempt >= self.max_retries:
+                    response.raise_for_status()
+                limit = self.batch_size.shrink()
+                if len(texts) > limit:
+                    # Resend as smaller batches, one after another
+                    self._backoff(attempt, response)
+                    vectors: List[Sequence[float]] = []
+                    for batch in self._make_batches(texts, limit):
+                        vectors.extend(self._post_batch(batch))
+                    return vectors
+            elif response is not None and response.status_code in RETRY_STATUSES:
+                if attempt >= self.max_retries:
+                    response.raise_for_status()
+            elif response is not None:
+                response.raise_for_status()
+                self.batch_size.success()
+                return self._decode(response.json())
+
+            self._backoff(attempt, response)
+            attempt += 1
+
+    def _payload(self, texts: List[str]) -> dict:
+        payload = {"model": self.model_name, "input": texts}
+        if self.encoding_format == "base64":
+            payload["encoding_format"] = "base64"
+            if self.transport_dtype == "float16":
+                payload["dtype"] = "float16" # HFserve extension
+        return payload
+
+    def _decode(self, data: dict) -> List[Sequence[float]]:
+        # Sort by index to ensure order matches input
+        # OpenAI format: data: [{object: embedding, embedding: [...], index: 0}, ...]
+        results = sorted(data['data'], key=lambda x: x['index'])
+        if not results or not isinstance(results[0]['embedding'], str):
+            # Plain float lists (also what servers ignoring encoding_format send)
             return [item['embedding'] for item in results]
+
+        # base64 of little-endian float32 (OpenAI) or float16 (HFserve's `dtype`
+        # extension, echoed in the response). One buffer for the whole batch;
+        # float32 rows are views into it, not copies.
+        dtype = "<f2" if data.get("dtype") == "float16" else "<f4"
+        raw = b"".join(base64.b64decode(item['embedding']) for item in results)
+        matrix = np.frombuffer(raw, dtype=dtype).reshape(len(results), -1)
+        if matrix.dtype != np.float32:
+            matrix = matrix.astype(np.float32)
+        return list(matrix)
+
+    def _backoff(self, attempt: int, response: Optional[httpx.Response]):
+        delay = min(BACKOFF_MAX_SEC, BACKOFF_BASE_SEC * (2 ** attempt))
+        retry_after = response.headers.get("Retry-After") if response is not None else None
+        if retry_after and retry_after.isdigit():
+            delay = max(delay, float(retry_after))
+        time.sleep(delay * random.uniform(0.5, 1.0))
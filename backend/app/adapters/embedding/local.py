@@ -0,0 +1,206 @@
+import queue
+import threading
+import time
+import numpy as np
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+from backend.app.domain.ports import EmbeddingProvider
+from backend.app.domain.errors import BackendUnavailable
+from backend.app.config.schema import AppConfig, EmbeddingConfig
+from backend.app.util.hashing import compute_hash
+from backend.app.adapters.embedding.embedding_cache import get_embedding_cache, embed_cached
+
+# texts -> (n, dim) float32 matrix of L2-normalized embeddings
+Encoder = Callable[[List[str]], np.ndarray]
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms > 0, norms, 1.0)
+
+class OnnxEncoder:
+    """Sentence embeddings with an exported ONNX model on onnxruntime (CPU), mean-pooled."""
+    def __init__(self, model_name: str, onnx_path: Path, max_length: int, quantize_int8: bool = True, num_threads: Optional[int] = None):
+        try:
+            import onnxruntime as ort
+            from transformers import AutoTokenizer
+        except ImportError as e:
+            raise BackendUnavailable(f"Local ONNX embeddings require onnxruntime and transformers: {e}")
+
+        if quantize_int8:
+            onnx_path = self._quantized(onnx_path)
+        options = ort.SessionOptions()
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+        self.session = ort.InferenceSession(str(onnx_path), options, providers=["CPUExecutionProvider"])
+        self.input_names = {i.name for i in self.session.get_inputs()}
+        self.tokenizer = AutoTokenizer.from_pretrained(model_name)
+        self.max_length = max_length
+
+    @staticmethod
+    def _quantized(onnx_path: Path) -> Path:
+        # Dynamic int8 quantization of the weights, done once next to the fp32 model
+        target = onnx_path.with_name(onnx_path.stem + ".int8.onnx")
+        if not target.exists():
+            from onnxruntime.quantization import quantize_dynamic, QuantType
+            quantize_dynamic(str(onnx_path), str(target), weight_type=QuantType.QInt8)
+        return target
+
+    def __call__(self, texts: List[str]) -> np.ndarray:
+        features = self.tokenizer(texts, padding=True, truncation=True, max_length=self.max_length, return_tensors="np")
+        feed = {k: v.astype(np.int64) for k, v in features.items() if k in self.input_names}
+        output = self.session.run(None, feed)[0]
+        if output.ndim == 3:
+            # Token embeddings: mean over the non-padding positions
+            mask = features["attention_mask"][..., None].astype(np.float32)
+            output = (output * mask).sum(axis=1) / np.maximum(mask.sum(axis=1), 1e-9)
+        return _normalize(output.astype(np.float32))
+
+class TorchEncoder:
+    """Sentence embeddings with sentence-transformers on PyTorch (CPU)."""
+    def __init__(self, model_name: str, max_length: int, num_threads: Optional[int] = None):
+        try:
+            import torch
+            from sentence_transformers import SentenceTransformer
+        except ImportError as e:
+            raise BackendUnavailable(f"Local embeddings require torch and sentence-transformers: {e}")
+
+        if num_threads:
+            torch.set_num_threads(num_threads)
+        self.model = SentenceTransformer(model_name, device="cpu")
+        self.model.max_seq_length = max_length
+
+    def __call__(self, texts: List[str]) -> np.ndarray:
+        return self.model.encode(
+            texts, batch_size=len(texts), convert_to_numpy=True, normalize_embeddings=True
+        ).astype(np.float32)
+
+class _Request:
+    def __init__(self, texts: List[str]):
+        self.texts = texts
+        self.vectors: List[Optional[np.ndarray]] = [None] * len(texts)
+        self.remaining = len(texts)
+        self.error: Optional[BaseException] = None
+        self.done = threading.Event()
+
+class DynamicBatcher:
+    """
+    Coalesces embedding calls from concurrent callers (indexing jobs, search
+    queries) into model batches. Requests arriving within `max_wait_ms` of
+    each other are pooled, sorted by length and cut into batches of at most
+    `max_batch_size`, so texts of similar length are padded together.
+    One worker thread runs the model; the encoder's own threads do the math.
+    """
+    def __init__(self, encoder_factory: Callable[[], Encoder], max_batch_size: int, max_wait_ms: float):
+        self._encoder_factory = encoder_factory
+        self._encoder: Optional[Encoder] = None
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue: "queue.Queue[_Request]" = queue.Queue()
+        self._worker = threading.Thread(target=self._run, name="embed-batcher", daemon=True)
+        self._worker.start()
+
+    def embed(self, texts: List[str]) -> List[np.ndarray]:
+        request = _Request(texts)
+        self._queue.put(request)
+        request.done.wait()
+        if request.error is not None:
+            raise request.error
+        return request.vectors # type: ignore
+
+    def _run(self):
+        while True:
+            pending = [self._queue.get()]
+            count = len(pending[0].texts)
+            deadline = time.monotonic() + self.max_wait
+            # Collect a few batches' worth, or whatever arrives within the wait window
+            while count < self.max_batch_size * 4:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    request = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                pending.append(request)
+                count += len(request.texts)
+            self._process(pending)
+
+    def _process(self, pending: List[_Request]):
+        items: List[Tuple[int, _Request, int]] = [
+            (len(text), request, i) for request in pending for i, text in enumerate(request.texts)
+        ]
+        items.sort(key=lambda item: item[0])
+
+        for start in range(0, len(items), self.max_batch_size):
+            batch = items[start:start + self.max_batch_size]
+            try:
+                if self._encoder is None:
+                    self._encoder = self._encoder_factory()
+                vectors = self._encoder([request.texts[i] for _, request, i in batch])
+            except BaseException as e:
+                for _, request, _ in batch:
+                    request.error = e
+                vectors = [None] * len(batch)
+            for (_, request, i), vec in zip(batch, vectors):
+                request.vectors[i] = vec
+                request.remaining -= 1
+                if request.remaining == 0:
+                    request.done.set()
+
+        for request in pending:
+            if not request.texts:
+                request.done.set()
+
+# One model and batcher per process, shared by the per-request provider instances
+_batchers: Dict[Tuple, DynamicBatcher] = {}
+_batchers_lock = threading.Lock()
+
+def _encoder_factory(config: EmbeddingConfig) -> Callable[[], Encoder]:
+    def factory() -> Encoder:
+        if config.local_backend == "onnx":
+            if not config.onnx_path:
+                raise BackendUnavailable("embedding.onnx_path is required for the onnx local backend")
+            return OnnxEncoder(
+                config.model_name, Path(config.onnx_path), config.max_seq_length,
+                quantize_int8=config.quantize_int8, num_threads=config.num_threads
+            )
+        return TorchEncoder(config.model_name, config.max_seq_length, config.num_threads)
+    return factory
+
+def _get_batcher(config: EmbeddingConfig) -> DynamicBatcher:
+    key = (config.local_backend, config.model_name, str(config.onnx_path), config.quantize_int8)
+    with _batchers_lock:
+        batcher = _batchers.get(key)
+        if batcher is None:
+            batcher = _batchers[key] = DynamicBatcher(
+                _encoder_factory(config), config.batch_size, config.batch_wait_ms
+            )
+        return batcher
+
+class LocalEmbeddingProvider(EmbeddingProvider):
+    """
+    Embeds in-process (embedding.provider: local) instead of calling an
+    embedding server. The model is loaded on first use.
+    """
+    def __init__(self, config: AppConfig, encoder: Optional[Encoder] = None):
+        self.model_name = config.embedding.model_name
+        self.dim = config.embedding.dim
+        if encoder is not None:
+            self.batcher = DynamicBatcher(lambda: encoder, config.embedding.batch_size, config.embedding.batch_wait_ms)
+        else:
+            self.batcher = _get_batcher(config.embedding)
+        self.cache = None
+        if config.embedding.cache_mb > 0:
+            self.cache = get_embedding_cache(
+                config.storage.data_dir / "cache" / "embeddings.db",
+                max_bytes=int(config.embedding.cache_mb * 1024 * 1024)
+            )
+
+    def embed_texts(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        keys = [compute_hash(text + self.model_name) for text in texts]
+        return embed_cached(self.cache, keys, texts, self.batcher.embed)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.batcher.embed([text])[0]
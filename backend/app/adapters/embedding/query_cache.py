@@ -0,0 +1,76 @@
+import sqlite3
+import numpy as np
+from pathlib import Path
+from typing import Callable, List, Optional
+from backend.app.util.cache import LRUCache
+from backend.app.util.hashing import compute_hash
+
+class QueryEmbeddingCache:
+    """
+    Cache for search query vectors, sitting in front of EmbeddingProvider.embed_query.
+
+    Tier 1: in-process LRU of float32 NumPy arrays, bounded by bytes.
+    Tier 2 (optional): a small SQLite file shared by all worker processes.
+    """
+    PERSISTENT_MAX_ENTRIES = 100_000
+
+    def __init__(self, max_bytes: int, persistent_path: Optional[Path] = None):
+        self._memory = LRUCache(maxsize=1_000_000, max_bytes=max_bytes, sizeof=lambda v: v.nbytes)
+        self.persistent_path = persistent_path
+        if persistent_path:
+            persistent_path.parent.mkdir(parents=True, exist_ok=True)
+            self._init_persistent()
+
+    def _init_persistent(self):
+        with sqlite3.connect(self.persistent_path) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS query_embeddings (
+                    key TEXT PRIMARY KEY,
+                    vector BLOB NOT NULL
+                )
+            """)
+            conn.commit()
+
+    def get_or_embed(self, model_name: str, query: str, embed: Callable[[str], List[float]]) -> np.ndarray:
+        key = compute_hash(model_name + "\0" + query)
+
+        vector = self._memory.get(key)
+        if vector is not None:
+            return vector
+
+        if self.persistent_path:
+            vector = self._get_persistent(key)
+            if vector is not None:
+                self._memory.put(key, vector)
+                return vector
+
+        vector = np.asarray(embed(query), dtype=np.float32)
+        vector.setflags(write=False) # Shared between requests
+        self._memory.put(key, vector)
+        if self.persistent_path:
+            self._put_persistent(key, vector)
+        return vector
+
+    def _get_persistent(self, key: str) -> Optional[np.ndarray]:
+        with sqlite3.connect(self.persistent_path) as conn:
+            row = conn.execute("SELECT vector FROM query_embeddings WHERE key = ?", (key,)).fetchone()
+        if not row:
+            return None
+        return np.frombuffer(row[0], dtype=np.float32)
+
+    def _put_persistent(self, key: str, vector: np.ndarray):
+        with sqlite3.connect(self.persistent_path) as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO query_embeddings (key, vector) VALUES (?, ?)",
+                (key, vector.tobytes())
+            )
+            # FIFO bound by rowid so the shared file doesn't grow forever
+            conn.execute(
+                "DELETE FROM query_embeddings WHERE rowid <= (SELECT MAX(rowid) FROM query_embeddings) - ?",
+                (self.PERSISTENT_MAX_ENTRIES,)
+            )
+            conn.commit()
+
+    def stats(self) -> dict:
+        return self._memory.stats()
@@ -1,10 +1,61 @@
-from typing import List, Tuple
+import bisect
+import heapq
+import threading
+import time
+from typing import Dict, List, Tuple
 from uuid import UUID
 from sqlalchemy import text, create_engine
 from backend.app.domain import models
 from backend.app.domain.ports import LexicalIndex
 from backend.app.config.schema import AppConfig
 
+# Term dictionary used for query suggestions, shared by every FTS5LexicalIndex
+# instance of the process (the API builds a new adapter per request).
+# Keyed by database path. Local writes invalidate it, the TTL bounds staleness
+# when another process (e.g. a separate indexer) writes to the same DB.
+VOCAB_TTL_SEC = 60.0
+VOCAB_PREFIX_LENGTHS = (2, 3)  # Mirrors prefix='2 3' on chunks_fts
+VOCAB_BUCKET_SIZE = 50
+
+class _VocabSnapshot:
+    def __init__(self, rows: List[Tuple[str, int]]):
+        rows.sort()
+        self.terms = [r[0] for r in rows]
+        self.doc_freqs = [r[1] for r in rows]
+        self.loaded_at = time.monotonic()
+
+        # Precomputed top terms for every 2- and 3-character prefix so that the
+        # first keystrokes (which match the most terms) never scan the dictionary.
+        buckets: Dict[str, List[Tuple[str, int]]] = {}
+        for term, freq in rows:
+            for n in VOCAB_PREFIX_LENGTHS:
+                if len(term) > n:
+                    buckets.setdefault(term[:n], []).append((term, freq))
+        self.prefix_buckets = {
+            p: heapq.nsmallest(VOCAB_BUCKET_SIZE, items, key=lambda x: (-x[1], x[0]))
+            for p, items in buckets.items()
+        }
+
+    def complete(self, prefix: str, limit: int) -> List[Tuple[str, int]]:
+        if len(prefix) in VOCAB_PREFIX_LENGTHS and limit <= VOCAB_BUCKET_SIZE:
+            return self.prefix_buckets.get(prefix, [])[:limit]
+
+        lo = bisect.bisect_left(self.terms, prefix)
+        hi = bisect.bisect_left(self.terms, prefix + "\U0010ffff", lo)
+        matches = (
+            (self.terms[i], self.doc_freqs[i])
+            for i in range(lo, hi)
+            if self.terms[i] != prefix
+        )
+        return heapq.nsmallest(limit, matches, key=lambda x: (-x[1], x[0]))
+
+_vocab_cache: Dict[str, _VocabSnapshot] = {}
+_vocab_lock = threading.Lock()
+
+def invalidate_vocab_cache(db_path) -> None:
+    with _vocab_lock:
+        _vocab_cache.pop(str(db_path), None)
+
 class FTS5LexicalIndex(LexicalIndex):
     def __init__(self, config: AppConfig):
         # We use the same SQLite database as metadata for simplicity
@@ -20,6 +71,8 @@ class FTS5LexicalIndex(LexicalIndex):
         # Columns: chunk_id (UNINDEXED), doc_id (UNINDEXED), title, text, uri
         # Note: chunk_id and doc_id are stored but not indexed for full-text search themselves
         # FTS5 syntax: column [options]
+        # prefix='2 3' builds prefix indexes so short "term*" queries don't scan the term list.
+        # (Only applies to newly created tables; existing ones keep working without it.)
         # We need to execute raw SQL
         
         schema_sql = """
@@ -28,11 +81,20 @@ class FTS5LexicalIndex(LexicalIndex):
             doc_id UNINDEXED, 
             title, 
             text, 
-            uri
+            uri,
+            prefix='2 3'
         );
         """
+        # Term statistics over chunks_fts, used for suggestions: per column
+        # (which terms occur in title/text) and per row (in how many chunks)
+        vocab_sql = [
+            "CREATE VIRTUAL TABLE IF NOT EXISTS chunks_fts_vocab USING fts5vocab(chunks_fts, col);",
+            "CREATE VIRTUAL TABLE IF NOT EXISTS chunks_fts_vocab_row USING fts5vocab(chunks_fts, row);",
+        ]
         with self.engine.connect() as conn:
             conn.execute(text(schema_sql))
+            for sql in vocab_sql:
+                conn.execute(text(sql))
             conn.commit()
 
     def upsert_chunks(self, chunks: List[models.Chunk]) -> None:
@@ -96,6 +158,7 @@ class FTS5LexicalIndex(LexicalIndex):
                     }
                 )
             conn.commit()
+        invalidate_vocab_cache(self.db_path)
 
     def delete_doc(self, doc_id: UUID) -> None:
         with self.engine.connect() as conn:
@@ -104,6 +167,7 @@ class FTS5LexicalIndex(LexicalIndex):
                 {"did": str(doc_id)}
             )
             conn.commit()
+        invalidate_vocab_cache(self.db_path)
 
     def search(self, query: str, top_k: int) -> List[Tuple[UUID, float]]:
         # Use bm25 ranking
@@ -143,3 +207,40 @@ class FTS5LexicalIndex(LexicalIndex):
                 return []
                 
         return results
+
+    def stats(self) -> Dict[str, float]:
+        with self.engine.connect() as conn:
+            rows = conn.execute(text("SELECT COUNT(*) FROM chunks_fts")).scalar()
+        return {"rows": rows}
+
+    def suggest_terms(self, prefix: str, limit: int) -> List[Tuple[str, int]]:
+        prefix = prefix.lower()
+        if len(prefix) < min(VOCAB_PREFIX_LENGTHS):
+            return []
+        return self._get_vocab().complete(prefix, limit)
+
+    def _get_vocab(self) -> _VocabSnapshot:
+        key = str(self.db_path)
+        snapshot = _vocab_cache.get(key)
+        if snapshot and time.monotonic() - snapshot.loaded_at < VOCAB_TTL_SEC:
+            return snapshot
+
+        with _vocab_lock:
+            snapshot = _vocab_cache.get(key)
+            if snapshot and time.monotonic() - snapshot.loaded_at < VOCAB_TTL_SEC:
+                return snapshot
+
+            # Only title/text terms are useful completions (uri tokens are noise).
+            # Their frequency is the number of chunks containing them, each
+            # chunk counted once however many of its columns hold the term.
+            sql = """
+                SELECT term, doc
+                FROM chunks_fts_vocab_row
+                WHERE term IN (SELECT term FROM chunks_fts_vocab WHERE col IN ('title', 'text'))
+            """
+            with self.engine.connect() as conn:
+                rows = [(row[0], int(row[1])) for row in conn.execute(text(sql))]
+
+            snapshot = _VocabSnapshot(rows)
+            _vocab_cache[key] = snapshot
+            return snapshot
@@ -27,3 +27,6 @@ class PgFTSIndex(LexicalIndex):
 
     def search(self, query: str, top_k: int) -> List[Tuple[UUID, float]]:
         raise NotImplementedError("Postgres FTS backend not implemented yet")
+
+    def suggest_terms(self, prefix: str, limit: int) -> List[Tuple[str, int]]:
+        raise NotImplementedError("Postgres FTS backend not implemented yet")
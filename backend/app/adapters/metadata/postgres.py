@@ -34,6 +34,9 @@ class PostgresMetadataStore(MetadataStore):
     def mark_document_deleted(self, doc_id: UUID) -> None:
         raise NotImplementedError("Postgres backend not implemented yet")
 
+    def list_duplicates(self, canonical_id: UUID) -> List[models.Document]:
+        raise NotImplementedError("Postgres backend not implemented yet")
+
     def upsert_chunk(self, chunk: models.Chunk) -> models.Chunk:
         raise NotImplementedError("Postgres backend not implemented yet")
 
@@ -43,6 +46,15 @@ class PostgresMetadataStore(MetadataStore):
     def get_chunk(self, chunk_id: UUID) -> Optional[models.Chunk]:
         raise NotImplementedError("Postgres backend not implemented yet")
 
+    def get_chunks_with_documents(self, chunk_ids: List[UUID]) -> List[Tuple[models.Chunk, models.Document]]:
+        raise NotImplementedError("Postgres backend not implemented yet")
+
+    def upsert_doc_signature(self, doc_id: UUID, signature: bytes, band_keys: List[int]) -> None:
+        raise NotImplementedError("Postgres backend not implemented yet")
+
+    def find_signature_candidates(self, band_keys: List[int], source_id: Optional[UUID] = None) -> List[Tuple[UUID, bytes]]:
+        raise NotImplementedError("Postgres backend not implemented yet")
+
     def upsert_job(self, job: models.Job) -> models.Job:
         raise NotImplementedError("Postgres backend not implemented yet")
 
@@ -54,3 +66,9 @@ class PostgresMetadataStore(MetadataStore):
 
     def get_pending_jobs(self, limit: int = 10) -> List[models.Job]:
         raise NotImplementedError("Postgres backend not implemented yet")
+
+    def get_index_generation(self) -> int:
+        raise NotImplementedError("Postgres backend not implemented yet")
+
+    def bump_index_generation(self) -> int:
+        raise NotImplementedError("Postgres backend not implemented yet")
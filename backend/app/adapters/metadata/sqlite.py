@@ -1,11 +1,18 @@
-from typing import List, Optional
+from typing import List, Optional, Tuple
 from uuid import UUID, uuid4
 from datetime import datetime
-from sqlalchemy import create_engine, Column, String, Integer, Float, ForeignKey, DateTime, JSON, Index, select, delete
+from sqlalchemy import create_engine, Column, String, Integer, Float, ForeignKey, DateTime, JSON, LargeBinary, Index, select, delete, update, inspect, text, or_
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship, Session, sessionmaker
 from backend.app.domain import models
 from backend.app.domain.ports import MetadataStore
 from backend.app.config.schema import AppConfig
+from backend.app.util.cache import LRUCache
+
+# Process-level cache of Document metadata keyed by (db_path, doc_id).
+# Adapters are instantiated per request, so this must live at module level.
+# Invalidated by upsert_document / mark_document_deleted.
+_document_cache = LRUCache(maxsize=4096)
 
 # --- SQLAlchemy Models ---
 
@@ -44,6 +51,9 @@ class DocumentORM(Base):
     mtime: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
     doc_hash: Mapped[Optional[str]] = mapped_column(String, nullable=True)
     status: Mapped[str] = mapped_column(String, default="new")
+    canonical_id: Mapped[Optional[str]] = mapped_column(String, nullable=True, index=True)
+    etag: Mapped[Optional[str]] = mapped_column(String, nullable=True)
+    last_modified: Mapped[Optional[str]] = mapped_column(String, nullable=True)
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
     updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
@@ -58,6 +68,9 @@ class DocumentORM(Base):
             mtime=self.mtime,
             doc_hash=self.doc_hash,
             status=self.status,
+            canonical_id=UUID(self.canonical_id) if self.canonical_id else None,
+            etag=self.etag,
+            last_modified=self.last_modified,
             created_at=self.created_at,
             updated_at=self.updated_at
         )
@@ -72,6 +85,8 @@ class ChunkORM(Base):
     start_offset: Mapped[int] = mapped_column(Integer, nullable=False)
     end_offset: Mapped[int] = mapped_column(Integer, nullable=False)
     chunk_hash: Mapped[str] = mapped_column(String, nullable=False)
+    # "metadata" is reserved on declarative classes
+    chunk_metadata: Mapped[dict] = mapped_column("metadata", JSON, default={})
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
     updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
@@ -84,6 +99,7 @@ class ChunkORM(Base):
             start_offset=self.start_offset,
             end_offset=self.end_offset,
             chunk_hash=self.chunk_hash,
+            metadata=self.chunk_metadata or {},
             created_at=self.created_at,
             updated_at=self.updated_at
         )
@@ -112,6 +128,28 @@ class JobORM(Base):
             updated_at=self.updated_at
         )
 
+class IndexStateORM(Base):
+    __tablename__ = "index_state"
+
+    key: Mapped[str] = mapped_column(String, primary_key=True)
+    value: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+
+INDEX_GENERATION_KEY = "generation"
+
+class DocSignatureORM(Base):
+    __tablename__ = "doc_signatures"
+
+    doc_id: Mapped[str] = mapped_column(String, ForeignKey("documents.id"), primary_key=True)
+    signature: Mapped[bytes] = mapped_column(LargeBinary, nullable=False)
+
+class DocLshBandORM(Base):
+    """LSH index over document MinHash signatures: one row per (band bucket, document)."""
+    __tablename__ = "doc_lsh_bands"
+
+    band: Mapped[int] = mapped_column(Integer, primary_key=True)
+    bucket: Mapped[int] = mapped_column(Integer, primary_key=True)
+    doc_id: Mapped[str] = mapped_column(String, ForeignKey("documents.id"), primary_key=True, index=True)
+
 # --- Implementation ---
 
 class SQLiteMetadataStore(MetadataStore):
@@ -126,6 +164,21 @@ class SQLiteMetadataStore(MetadataStore):
         
         # Simple schema initialization (no alembic for now per deliverables)
         Base.metadata.create_all(bind=self.engine)
+        self._add_missing_columns()
+
+    def _add_missing_columns(self):
+        # create_all only creates missing tables; columns added to existing ones since
+        with self.engine.begin() as conn:
+            columns = {c["name"] for c in inspect(conn).get_columns("documents")}
+            if "canonical_id" not in columns:
+                conn.execute(text("ALTER TABLE documents ADD COLUMN canonical_id VARCHAR"))
+            conn.execute(text("CREATE INDEX IF NOT EXISTS ix_documents_canonical_id ON documents (canonical_id)"))
+            for column in ("etag", "last_modified"):
+                if column not in columns:
+                    conn.execute(text(f"ALTER TABLE documents ADD COLUMN {column} VARCHAR"))
+            columns = {c["name"] for c in inspect(conn).get_columns("chunks")}
+            if "metadata" not in columns:
+                conn.execute(text("ALTER TABLE chunks ADD COLUMN metadata JSON"))
 
     def upsert_source(self, source: models.Source) -> models.Source:
         with self.SessionLocal() as session:
@@ -168,16 +221,30 @@ class SQLiteMetadataStore(MetadataStore):
             orm.mtime = doc.mtime
             orm.doc_hash = doc.doc_hash
             orm.status = doc.status
+            orm.canonical_id = str(doc.canonical_id) if doc.canonical_id else None
+            orm.etag = doc.etag
+            orm.last_modified = doc.last_modified
             orm.updated_at = datetime.utcnow()
             
             session.commit()
             session.refresh(orm)
+            _document_cache.pop((str(self.db_path), orm.id))
             return orm.to_domain()
 
     def get_document(self, doc_id: UUID) -> Optional[models.Document]:
+        key = (str(self.db_path), str(doc_id))
+        cached = _document_cache.get(key)
+        if cached is not None:
+            # Callers mutate and re-upsert documents; never hand out the shared instance
+            return cached.model_copy(deep=True)
+
         with self.SessionLocal() as session:
             orm = session.get(DocumentORM, str(doc_id))
-            return orm.to_domain() if orm else None
+            if not orm:
+                return None
+            doc = orm.to_domain()
+            _document_cache.put(key, doc)
+            return doc.model_copy(deep=True)
 
     def list_documents_by_source(self, source_id: UUID) -> List[models.Document]:
         with self.SessionLocal() as session:
@@ -194,6 +261,14 @@ class SQLiteMetadataStore(MetadataStore):
                 orm.status = "deleted"
                 orm.updated_at = datetime.utcnow()
                 session.commit()
+        _document_cache.pop((str(self.db_path), str(doc_id)))
+
+    def list_duplicates(self, canonical_id: UUID) -> List[models.Document]:
+        with self.SessionLocal() as session:
+            stmt = select(DocumentORM).where(
+                DocumentORM.canonical_id == str(canonical_id), DocumentORM.status == "duplicate"
+            )
+            return [orm.to_domain() for orm in session.execute(stmt).scalars().all()]
 
     def upsert_chunk(self, chunk: models.Chunk) -> models.Chunk:
         with self.SessionLocal() as session:
@@ -208,6 +283,7 @@ class SQLiteMetadataStore(MetadataStore):
             orm.start_offset = chunk.start_offset
             orm.end_offset = chunk.end_offset
             orm.chunk_hash = chunk.chunk_hash
+            orm.chunk_metadata = chunk.metadata
             orm.updated_at = datetime.utcnow()
             
             session.commit()
@@ -225,6 +301,69 @@ class SQLiteMetadataStore(MetadataStore):
             orm = session.get(ChunkORM, str(chunk_id))
             return orm.to_domain() if orm else None
 
+    def get_chunks_with_documents(self, chunk_ids: List[UUID]) -> List[Tuple[models.Chunk, models.Document]]:
+        if not chunk_ids:
+            return []
+
+        # One query for the chunks, one for the documents not in the document cache,
+        # instead of get_chunk + get_document per search candidate
+        with self.SessionLocal() as session:
+            chunk_orms = session.execute(
+                select(ChunkORM).where(ChunkORM.id.in_([str(cid) for cid in chunk_ids]))
+            ).scalars().all()
+
+            docs = {}
+            misses = []
+            for doc_id in {chunk_orm.doc_id for chunk_orm in chunk_orms}:
+                cached = _document_cache.get((str(self.db_path), doc_id))
+                if cached is not None:
+                    docs[doc_id] = cached.model_copy(deep=True)
+                else:
+                    misses.append(doc_id)
+            if misses:
+                stmt = select(DocumentORM).where(DocumentORM.id.in_(misses))
+                for doc_orm in session.execute(stmt).scalars().all():
+                    doc = doc_orm.to_domain()
+                    _document_cache.put((str(self.db_path), doc_orm.id), doc)
+                    docs[doc_orm.id] = doc.model_copy(deep=True)
+
+            by_id = {
+                chunk_orm.id: (chunk_orm.to_domain(), docs[chunk_orm.doc_id])
+                for chunk_orm in chunk_orms if chunk_orm.doc_id in docs
+            }
+
+        # Preserve the caller's (ranking) order; orphaned/missing chunks are dropped
+        return [by_id[str(cid)] for cid in chunk_ids if str(cid) in by_id]
+
+    def upsert_doc_signature(self, doc_id: UUID, signature: bytes, band_keys: List[int]) -> None:
+        with self.SessionLocal() as session:
+            session.execute(delete(DocLshBandORM).where(DocLshBandORM.doc_id == str(doc_id)))
+            session.merge(DocSignatureORM(doc_id=str(doc_id), signature=signature))
+            session.add_all([
+                DocLshBandORM(band=band, bucket=bucket, doc_id=str(doc_id))
+                for band, bucket in enumerate(band_keys)
+            ])
+            session.commit()
+
+    def find_signature_candidates(self, band_keys: List[int], source_id: Optional[UUID] = None) -> List[Tuple[UUID, bytes]]:
+        if not band_keys:
+            return []
+        # (band, bucket) pairs are the primary key prefix, so each band is an index lookup
+        with self.SessionLocal() as session:
+            matches = select(DocLshBandORM.doc_id).where(or_(*[
+                (DocLshBandORM.band == band) & (DocLshBandORM.bucket == bucket)
+                for band, bucket in enumerate(band_keys)
+            ]))
+            stmt = (
+                select(DocSignatureORM.doc_id, DocSignatureORM.signature)
+                .join(DocumentORM, DocumentORM.id == DocSignatureORM.doc_id)
+                .where(DocSignatureORM.doc_id.in_(matches))
+                .where(DocumentORM.status == "indexed")
+            )
+            if source_id is not None:
+                stmt = stmt.where(DocumentORM.source_id == str(source_id))
+            return [(UUID(doc_id), signature) for doc_id, signature in session.execute(stmt).all()]
+
     def upsert_job(self, job: models.Job) -> models.Job:
         with self.SessionLocal() as session:
             orm = session.get(JobORM, str(job.id))
@@ -259,3 +398,24 @@ class SQLiteMetadataStore(MetadataStore):
             stmt = select(JobORM).where(JobORM.status == models.JobStatus.PENDING.value).order_by(JobORM.created_at.asc()).limit(limit)
             orms = session.execute(stmt).scalars().all()
             return [orm.to_domain() for orm in orms]
+
+    def get_index_generation(self) -> int:
+        with self.SessionLocal() as session:
+            orm = session.get(IndexStateORM, INDEX_GENERATION_KEY)
+            return orm.value if orm else 0
+
+    def bump_index_generation(self) -> int:
+        with self.SessionLocal() as session:
+            # Atomic increment so concurrent writers (job runner, other processes) never lose a bump
+            session.execute(
+                sqlite_insert(IndexStateORM)
+                .values(key=INDEX_GENERATION_KEY, value=0)
+                .on_conflict_do_nothing()
+            )
+            session.execute(
+                update(IndexStateORM)
+                .where(IndexStateORM.key == INDEX_GENERATION_KEY)
+                .values(value=IndexStateORM.value + 1)
+            )
+            session.commit()
+            return session.get(IndexStateORM, INDEX_GENERATION_KEY).value
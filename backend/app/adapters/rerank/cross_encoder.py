@@ -0,0 +1,157 @@
+import threading
+import time
+import numpy as np
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+from uuid import UUID
+from backend.app.domain import models
+from backend.app.domain.ports import Reranker
+from backend.app.domain.errors import BackendUnavailable
+from backend.app.config.schema import AppConfig
+from backend.app.util.cache import LRUCache
+
+# (query, passages) -> one relevance score per passage
+PairScorer = Callable[[str, List[str]], List[float]]
+
+# Room left for the query (plus special tokens) on top of max_passage_tokens
+QUERY_TOKEN_ALLOWANCE = 64
+
+# Scores are keyed by (model, query, chunk_hash) and shared by all requests of the process
+_score_cache: Optional[LRUCache] = None
+_score_cache_lock = threading.Lock()
+
+def _get_score_cache(maxsize: int) -> LRUCache:
+    global _score_cache
+    with _score_cache_lock:
+        if _score_cache is None:
+            _score_cache = LRUCache(maxsize=maxsize)
+        return _score_cache
+
+class TorchCrossEncoder:
+    """Cross-encoder scoring on CPU with transformers + PyTorch."""
+    def __init__(self, model_name: str, max_length: int, num_threads: Optional[int] = None):
+        try:
+            import torch
+            from transformers import AutoTokenizer, AutoModelForSequenceClassification
+        except ImportError as e:
+            raise BackendUnavailable(f"Cross-encoder reranking requires torch and transformers: {e}")
+
+        if num_threads:
+            torch.set_num_threads(num_threads)
+        self.torch = torch
+        self.tokenizer = AutoTokenizer.from_pretrained(model_name)
+        self.model = AutoModelForSequenceClassification.from_pretrained(model_name).eval()
+        self.max_length = max_length
+
+    def __call__(self, query: str, passages: List[str]) -> List[float]:
+        features = self.tokenizer(
+            [query] * len(passages), passages,
+            padding=True, truncation="only_second", max_length=self.max_length, return_tensors="pt"
+        )
+        with self.torch.inference_mode():
+            logits = self.model(**features).logits
+        return logits[:, 0].tolist()
+
+class OnnxCrossEncoder:
+    """Cross-encoder scoring on CPU with an exported ONNX model and onnxruntime."""
+    def __init__(self, model_name: str, onnx_path: str, max_length: int, num_threads: Optional[int] = None):
+        try:
+            import onnxruntime as ort
+            from transformers import AutoTokenizer
+        except ImportError as e:
+            raise BackendUnavailable(f"ONNX reranking requires onnxruntime and transformers: {e}")
+
+        options = ort.SessionOptions()
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+        self.session = ort.InferenceSession(onnx_path, options, providers=["CPUExecutionProvider"])
+        self.input_names = {i.name for i in self.session.get_inputs()}
+        self.tokenizer = AutoTokenizer.from_pretrained(model_name)
+        self.max_length = max_length
+
+    def __call__(self, query: str, passages: List[str]) -> List[float]:
+        features = self.tokenizer(
+            [query] * len(passages), passages,
+            padding=True, truncation="only_second", max_length=self.max_length, return_tensors="np"
+        )
+        feed = {k: v.astype(np.int64) for k, v in features.items() if k in self.input_names}
+        logits = self.session.run(None, feed)[0]
+        return logits[:, 0].tolist()
+
+class CrossEncoderReranker(Reranker):
+    """
+    Reranks fused candidates with a cross-encoder, within a latency budget.
+
+    Candidates are scored in RRF order, a few batches at a time, each group
+    sorted by length so batches pad as little as possible. Once the budget is
+    spent, the remaining candidates are returned unscored (score None) in
+    their original order after the scored ones.
+    """
+    def __init__(self, config: AppConfig, scorer: Optional[PairScorer] = None):
+        self.config = config.rerank
+        self.model_name = self.config.model_name
+        self.batch_size = self.config.batch_size
+        self.time_budget_ms = self.config.time_budget_ms
+        # Cheap pre-truncation so huge chunks never reach the tokenizer (~4 chars per token)
+        self.max_passage_chars = self.config.max_passage_tokens * 4
+        self._scorer = scorer
+        self._scorer_lock = threading.Lock()
+        self._cache = _get_score_cache(self.config.cache_size) if self.config.cache_size else None
+
+    def _get_scorer(self) -> PairScorer:
+        if self._scorer is None:
+            with self._scorer_lock:
+                if self._scorer is None:
+                    max_length = self.config.max_passage_tokens + QUERY_TOKEN_ALLOWANCE
+                    if self.config.backend == "onnx":
+                        if not self.config.onnx_path:
+                            raise BackendUnavailable("rerank.onnx_path is required for the onnx backend")
+                        self._scorer = OnnxCrossEncoder(
+                            self.model_name, str(self.config.onnx_path), max_length, self.config.num_threads
+                        )
+                    else:
+                        self._scorer = TorchCrossEncoder(self.model_name, max_length, self.config.num_threads)
+        return self._scorer
+
+    def rerank(self, query: str, chunks: List[models.Chunk]) -> List[Tuple[models.Chunk, Optional[float]]]:
+        if not chunks:
+            return []
+
+        # Model loading is not charged to the first query's budget
+        scorer = self._get_scorer()
+        deadline = time.monotonic() + self.time_budget_ms / 1000.0 if self.time_budget_ms else None
+
+        scores: Dict[UUID, float] = {}
+        pending: List[models.Chunk] = []
+        for chunk in chunks:
+            cached = self._cache.get(self._cache_key(query, chunk)) if self._cache is not None else None
+            if cached is not None:
+                scores[chunk.id] = cached
+            else:
+                pending.append(chunk)
+
+        for batch in self._batches(pending):
+            if deadline is not None and time.monotonic() >= deadline:
+                break
+            batch_scores = scorer(query, [c.text[:self.max_passage_chars] for c in batch])
+            for chunk, score in zip(batch, batch_scores):
+                scores[chunk.id] = float(score)
+                if self._cache is not None:
+                    self._cache.put(self._cache_key(query, chunk), float(score))
+
+        scored = sorted((c for c in chunks if c.id in scores), key=lambda c: scores[c.id], reverse=True)
+        unscored = [c for c in chunks if c.id not in scores]
+        return [(c, scores[c.id]) for c in scored] + [(c, None) for c in unscored]
+
+    def stats(self) -> Dict[str, int]:
+        return self._cache.stats() if self._cache is not None else {}
+
+    def _cache_key(self, query: str, chunk: models.Chunk) -> Tuple[str, str, str]:
+        return (self.model_name, query, chunk.chunk_hash)
+
+    def _batches(self, chunks: List[models.Chunk]) -> Iterator[List[models.Chunk]]:
+        # Keep RRF priority at group granularity, sort by length inside a group
+        group_size = self.batch_size * 4
+        for start in range(0, len(chunks), group_size):
+            group = sorted(chunks[start:start + group_size], key=lambda c: len(c.text))
+            for i in range(0, len(group), self.batch_size):
+                yield group[i:i + self.batch_size]
@@ -1,37 +1,140 @@
 import os
+import re
+import time
+import itertools
 import faiss
 import numpy as np
 import sqlite3
-from typing import List, Tuple, Optional
+import threading
+from typing import Collection, List, Tuple, Optional, Dict, Set
 from uuid import UUID
 from pathlib import Path
 from backend.app.domain import models
 from backend.app.domain.ports import VectorStore
 from backend.app.config.schema import AppConfig
+from backend.app.util.hashing import compute_hash
+
+# Live chunks with a vector under the reference model (first ?) but none under
+# the target model (second ?)
+_PENDING_CHUNKS = """
+    FROM chunk_postings p
+    WHERE p.model = ? AND p.deleted = 0
+    AND NOT EXISTS (
+        SELECT 1 FROM chunk_postings q WHERE q.chunk_id = p.chunk_id AND q.model = ? AND q.deleted = 0
+    )
+"""
+
+# Databases whose mapping tables this process has already created or migrated
+_initialized_dbs: Set[str] = set()
+_initialized_dbs_lock = threading.Lock()
 
 class FAISSVectorStore(VectorStore):
-    def __init__(self, config: AppConfig):
-        self.dim = config.embedding.dim
-        self.index_dir = config.storage.faiss_dir
-        self.index_path = self.index_dir / "index.faiss"
+    """
+    Flat inner-product FAISS index with its id mapping in the metadata SQLite DB.
+
+    chunk_vectors has one row per physical vector (its faiss_id), keyed by
+    content (chunk_hash + model); chunk_postings maps chunks to those vectors,
+    so identical chunks in any number of documents share one vector. A vector
+    is tombstoned once its last live posting is gone.
+
+    Every embedding model has its own index files and every row is tagged with
+    its model, so vectors of different models are never mixed. vector_models
+    records which model is active: a store built without model_name serves
+    that one, and a store for another model is built up alongside it until
+    activate() switches over (see ModelMigrationService).
+    """
+    def __init__(self, config: AppConfig, model_name: Optional[str] = None):
+        self.faiss_dir = config.storage.faiss_dir
         self.db_path = config.storage.sqlite_path
-        
+
         # Ensure directories exist
-        self.index_dir.mkdir(parents=True, exist_ok=True)
+        self.faiss_dir.mkdir(parents=True, exist_ok=True)
         self.db_path.parent.mkdir(parents=True, exist_ok=True)
-        
+
+        # Initialize Mapping DB (using main sqlite DB but raw connection)
+        self._init_mapping_db()
+        self.model_name, self.dim, model_dir = self._register_model(config, model_name)
+        # Whether this store serves whichever model is active (see stats())
+        self._serves_active = model_name is None
+
+        self.index_dir = self.faiss_dir / model_dir
+        self.index_dir.mkdir(parents=True, exist_ok=True)
+        self.index_path = self.index_dir / "index.faiss"
+        self.doc_index_path = self.index_dir / "doc_index.faiss"
+
         # Load or create FAISS index
         if self.index_path.exists():
             self.index = faiss.read_index(str(self.index_path))
+            if self.index.d != self.dim:
+                raise ValueError(
+                    f"{self.index_path} holds {self.index.d}-d vectors, expected {self.dim} for model {self.model_name}"
+                )
         else:
             # Inner Product (cosine similarity if normalized)
             self.index = faiss.IndexIDMap(faiss.IndexFlatIP(self.dim))
-            
-        # Initialize Mapping DB (using main sqlite DB but raw connection)
-        self._init_mapping_db()
+        # Document-level index (one mean vector per doc), loaded on first use
+        self._doc_index = None
+
+    def _register_model(self, config: AppConfig, model_name: Optional[str]) -> Tuple[str, int, str]:
+        """(model, dim, index dir relative to faiss_dir) of the requested model, or of the active one."""
+        if model_name is None:
+            lookup = ("SELECT model, dim, path FROM vector_models WHERE state = 'active'", ())
+        else:
+            lookup = ("SELECT model, dim, path FROM vector_models WHERE model = ?", (model_name,))
+        with sqlite3.connect(self.db_path, isolation_level=None) as conn:
+            # Stores are built per request: the usual case is a plain read, and
+            # only registering a model takes the write lock
+            row = conn.execute(*lookup).fetchone()
+            if row is not None:
+                return row[0], row[1], row[2]
+
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute(*lookup).fetchone()
+                if row is not None:
+                    conn.execute("COMMIT")
+                    return row[0], row[1], row[2]
+
+                if model_name is None:
+                    # First start (or an index from before models were tracked): the
+                    # configured model is the active one and keeps the top-level files
+                    model_name, state, path = config.embedding.model_name, "active", ""
+                    for table in ("chunk_vectors", "chunk_postings", "doc_vectors"):
+                        conn.execute(f"UPDATE {table} SET model = ? WHERE model IS NULL", (model_name,))
+                else:
+                    state, path = "building", "models/" + re.sub(r"[^A-Za-z0-9._-]+", "_", model_name)
+                conn.execute(
+                    "INSERT INTO vector_models (model, dim, path, state, updated_at) VALUES (?, ?, ?, ?, ?)",
+                    (model_name, config.embedding.dim, path, state, time.time())
+                )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        return model_name, config.embedding.dim, path
+
+    def model(self) -> Optional[Tuple[str, int]]:
+        return self.model_name, self.dim
 
     def _init_mapping_db(self):
+        # Schema setup and migrations run once per process and database
+        with _initialized_dbs_lock:
+            if str(self.db_path) in _initialized_dbs:
+                return
+            self._create_schema()
+            _initialized_dbs.add(str(self.db_path))
+
+    def _create_schema(self):
         with sqlite3.connect(self.db_path) as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS vector_models (
+                    model TEXT PRIMARY KEY,
+                    dim INTEGER NOT NULL,
+                    path TEXT NOT NULL,
+                    state TEXT NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+            """)
             conn.execute("""
                 CREATE TABLE IF NOT EXISTS chunk_vectors (
                     faiss_id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -42,66 +145,250 @@ class FAISSVectorStore(VectorStore):
             """)
             conn.execute("CREATE INDEX IF NOT EXISTS idx_chunk_vectors_chunk_id ON chunk_vectors(chunk_id)")
             conn.execute("CREATE INDEX IF NOT EXISTS idx_chunk_vectors_doc_id ON chunk_vectors(doc_id)")
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(chunk_vectors)")}
+            if "content_key" not in columns:
+                # Rows from before content addressing keep NULL and are never shared
+                conn.execute("ALTER TABLE chunk_vectors ADD COLUMN content_key TEXT")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_chunk_vectors_content_key ON chunk_vectors(content_key, deleted)")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS chunk_postings (
+                    chunk_id TEXT NOT NULL,
+                    doc_id TEXT NOT NULL,
+                    faiss_id INTEGER NOT NULL,
+                    deleted BOOLEAN DEFAULT 0
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_chunk_postings_chunk_id ON chunk_postings(chunk_id)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_chunk_postings_doc_id ON chunk_postings(doc_id)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_chunk_postings_faiss_id ON chunk_postings(faiss_id)")
+            if conn.execute("SELECT 1 FROM chunk_postings LIMIT 1").fetchone() is None:
+                # One posting per existing vector: each used to belong to exactly one chunk
+                conn.execute(
+                    "INSERT INTO chunk_postings (chunk_id, doc_id, faiss_id, deleted) "
+                    "SELECT chunk_id, doc_id, faiss_id, deleted FROM chunk_vectors"
+                )
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS doc_vectors (
+                    faiss_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    doc_id TEXT NOT NULL,
+                    deleted BOOLEAN DEFAULT 0
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_doc_vectors_doc_id ON doc_vectors(doc_id)")
+            for table in ("chunk_vectors", "chunk_postings", "doc_vectors"):
+                columns = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+                if "model" not in columns:
+                    # Rows from before model tagging belong to the first active model (see _register_model)
+                    conn.execute(f"ALTER TABLE {table} ADD COLUMN model TEXT")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_chunk_postings_model ON chunk_postings(model, deleted)")
             conn.commit()
 
     def _save_index(self):
         faiss.write_index(self.index, str(self.index_path))
 
+    def _content_key(self, chunk: models.Chunk) -> str:
+        return compute_hash(chunk.chunk_hash + self.model_name)
+
     def upsert_embeddings(self, chunks: List[models.Chunk], embeddings: List[List[float]]) -> None:
         if not chunks:
             return
 
         # Prepare data
         vectors = np.array(embeddings, dtype='float32')
+        if vectors.ndim != 2 or vectors.shape[1] != self.dim:
+            raise ValueError(f"Expected {self.dim}-d vectors for model {self.model_name}, got shape {vectors.shape}")
         # Normalize for cosine similarity
         faiss.normalize_L2(vectors)
-        
-        # We need persistent IDs for FAISS. 
+
+        # We need persistent IDs for FAISS.
         # Strategy: Insert into DB -> get auto-increment IDs -> use those for FAISS.
-        
+        # Chunks with the same content in one batch get a single vector.
         new_ids = []
+        rows = []
+        key_ids: Dict[str, int] = {}
         with sqlite3.connect(self.db_path) as conn:
             cursor = conn.cursor()
-            for chunk in chunks:
-                # 1. Mark old entries for this chunk as deleted (soft update)
-                cursor.execute(
-                    "UPDATE chunk_vectors SET deleted = 1 WHERE chunk_id = ?", 
-                    (str(chunk.id),)
-                )
-                
-                # 2. Insert new entry
+            self._release(conn, "chunk_id", [str(c.id) for c in chunks], self.model_name)
+            for i, chunk in enumerate(chunks):
+                key = self._content_key(chunk)
+                if key not in key_ids:
+                    cursor.execute(
+                        "INSERT INTO chunk_vectors (chunk_id, doc_id, content_key, model, deleted) VALUES (?, ?, ?, ?, 0)",
+                        (str(chunk.id), str(chunk.doc_id), key, self.model_name)
+                    )
+                    key_ids[key] = cursor.lastrowid
+                    new_ids.append(cursor.lastrowid)
+                    rows.append(i)
                 cursor.execute(
-                    "INSERT INTO chunk_vectors (chunk_id, doc_id, deleted) VALUES (?, ?, 0)",
-                    (str(chunk.id), str(chunk.doc_id))
+                    "INSERT INTO chunk_postings (chunk_id, doc_id, faiss_id, model, deleted) VALUES (?, ?, ?, ?, 0)",
+                    (str(chunk.id), str(chunk.doc_id), key_ids[key], self.model_name)
                 )
-                new_ids.append(cursor.lastrowid)
             conn.commit()
-            
+
         # Add to FAISS
         # IndexIDMap requires IDs to be int64
         ids_array = np.array(new_ids, dtype='int64')
-        self.index.add_with_ids(vectors, ids_array)
-        
+        self.index.add_with_ids(np.ascontiguousarray(vectors[rows]), ids_array)
+
         # Persist
         self._save_index()
 
+    def reuse_embeddings(self, chunks: List[models.Chunk]) -> List[models.Chunk]:
+        if not chunks:
+            return []
+
+        keys = list({self._content_key(c) for c in chunks})
+        with sqlite3.connect(self.db_path) as conn:
+            placeholders = ",".join("?" * len(keys))
+            # Tombstoned vectors count too: until compaction they are still in the
+            # index, so re-indexing a document revives its vectors instead of
+            # embedding the same text again.
+            rows = conn.execute(
+                f"SELECT content_key, MAX(faiss_id) FROM chunk_vectors "
+                f"WHERE content_key IN ({placeholders}) GROUP BY content_key",
+                keys
+            ).fetchall()
+            if rows and self.index.ntotal:
+                positions = self._positions(np.array([r[1] for r in rows], dtype='int64'))
+                rows = [row for row, pos in zip(rows, positions) if pos >= 0]
+            else:
+                rows = []
+            existing = dict(rows)
+
+            linked = [c for c in chunks if self._content_key(c) in existing]
+            if linked:
+                # Postings are added before the old ones are released, so a chunk
+                # re-linked to its own vector does not tombstone it in between.
+                old = conn.execute(
+                    f"SELECT rowid FROM chunk_postings WHERE chunk_id IN ({','.join('?' * len(linked))}) AND model = ? AND deleted = 0",
+                    [str(c.id) for c in linked] + [self.model_name]
+                ).fetchall()
+                conn.executemany(
+                    "INSERT INTO chunk_postings (chunk_id, doc_id, faiss_id, model, deleted) VALUES (?, ?, ?, ?, 0)",
+                    [(str(c.id), str(c.doc_id), existing[self._content_key(c)], self.model_name) for c in linked]
+                )
+                conn.executemany(
+                    "UPDATE chunk_vectors SET deleted = 0 WHERE faiss_id = ? AND deleted = 1",
+                    [(faiss_id,) for faiss_id in existing.values()]
+                )
+                self._release(conn, "rowid", [r[0] for r in old])
+            conn.commit()
+        return [c for c in chunks if self._content_key(c) not in existing]
+
+    def _release(self, conn: sqlite3.Connection, column: str, values: list, model: Optional[str] = None):
+        """
+        Tombstones the live postings matching column IN values (of one model,
+        or of all models), then the vectors left without any.
+        """
+        if not values:
+            return
+        where = f"{column} IN ({','.join('?' * len(values))}) AND deleted = 0"
+        if model is not None:
+            where += " AND model = ?"
+            values = values + [model]
+        faiss_ids = [r[0] for r in conn.execute(f"SELECT DISTINCT faiss_id FROM chunk_postings WHERE {where}", values)]
+        conn.execute(f"UPDATE chunk_postings SET deleted = 1 WHERE {where}", values)
+        if faiss_ids:
+            conn.execute(
+                f"""
+                UPDATE chunk_vectors SET deleted = 1
+                WHERE faiss_id IN ({','.join('?' * len(faiss_ids))}) AND deleted = 0
+                AND NOT EXISTS (
+                    SELECT 1 FROM chunk_postings p WHERE p.faiss_id = chunk_vectors.faiss_id AND p.deleted = 0
+                )
+                """,
+                faiss_ids
+            )
+
     def delete_doc(self, doc_id: UUID) -> None:
+        # Under every model: a document re-indexed during a migration is picked up again
         with sqlite3.connect(self.db_path) as conn:
+            self._release(conn, "doc_id", [str(doc_id)])
             conn.execute(
-                "UPDATE chunk_vectors SET deleted = 1 WHERE doc_id = ?",
+                "UPDATE doc_vectors SET deleted = 1 WHERE doc_id = ?",
                 (str(doc_id),)
             )
             conn.commit()
 
-    def query(self, vector: List[float], top_k: int) -> List[Tuple[UUID, float]]:
+    @property
+    def doc_index(self):
+        if self._doc_index is None:
+            if self.doc_index_path.exists():
+                self._doc_index = faiss.read_index(str(self.doc_index_path))
+            else:
+                self._doc_index = faiss.IndexIDMap(faiss.IndexFlatIP(self.dim))
+                self._backfill_doc_index()
+        return self._doc_index
+
+    def _backfill_doc_index(self, docs_per_batch: int = 1000):
+        # Chunks indexed before the document index existed: derive their doc
+        # vectors from the stored chunk vectors, a batch of documents at a time.
+        with sqlite3.connect(self.db_path) as conn:
+            conn.execute("UPDATE doc_vectors SET deleted = 1 WHERE model = ?", (self.model_name,))
+            conn.commit()
+            rows = conn.execute(
+                "SELECT doc_id, faiss_id FROM chunk_postings WHERE model = ? AND deleted = 0 ORDER BY doc_id, faiss_id",
+                (self.model_name,)
+            ).fetchall()
+        if not rows:
+            return
+
+        groups = [(doc_id, [r[1] for r in grp]) for doc_id, grp in itertools.groupby(rows, key=lambda r: r[0])]
+        for start in range(0, len(groups), docs_per_batch):
+            batch = groups[start:start + docs_per_batch]
+            doc_ids, means = [], []
+            for doc_id, faiss_ids in batch:
+                positions = self._positions(np.array(faiss_ids, dtype='int64'))
+                positions = positions[positions >= 0]
+                if len(positions):
+                    doc_ids.append(UUID(doc_id))
+                    means.append(self.index.index.reconstruct_batch(positions).mean(axis=0))
+            if doc_ids:
+                self._add_doc_vectors(doc_ids, np.array(means, dtype='float32'))
+        self._save_doc_index()
+
+    def _save_doc_index(self):
+        faiss.write_index(self._doc_index, str(self.doc_index_path))
+
+    def upsert_doc_embedding(self, doc_id: UUID, vector: List[float]) -> None:
+        self.doc_index # Loaded (or backfilled from chunk vectors) before adding
+        with sqlite3.connect(self.db_path) as conn:
+            conn.execute("UPDATE doc_vectors SET deleted = 1 WHERE doc_id = ? AND model = ?", (str(doc_id), self.model_name))
+            conn.commit()
+        self._add_doc_vectors([doc_id], np.array([vector], dtype='float32'))
+        self._save_doc_index()
+
+    def _add_doc_vectors(self, doc_ids: List[UUID], vectors: np.ndarray):
+        faiss.normalize_L2(vectors)
+        new_ids = []
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            for doc_id in doc_ids:
+                cursor.execute(
+                    "INSERT INTO doc_vectors (doc_id, model, deleted) VALUES (?, ?, 0)", (str(doc_id), self.model_name)
+                )
+                new_ids.append(cursor.lastrowid)
+            conn.commit()
+        self._doc_index.add_with_ids(vectors, np.array(new_ids, dtype='int64'))
+
+    def query(self, vector: List[float], top_k: int, exclude: Collection[UUID] = ()) -> List[Tuple[UUID, float]]:
+        return self._search(self.index, "chunk_postings", "chunk_id", vector, top_k, exclude)
+
+    def query_docs(self, vector: List[float], top_k: int) -> List[Tuple[UUID, float]]:
+        return self._search(self.doc_index, "doc_vectors", "doc_id", vector, top_k)
+
+    def _search(
+        self, index, table: str, key_column: str, vector: List[float], top_k: int, exclude: Collection[UUID] = ()
+    ) -> List[Tuple[UUID, float]]:
         # Normalize query vector
         q_vec = np.array([vector], dtype='float32')
         faiss.normalize_L2(q_vec)
         
         # Search. We ask for more results to handle filtered items.
         # Simple heuristic: top_k * 3. If many deleted, might need loop.
-        fetch_k = top_k * 5
-        scores, ids = self.index.search(q_vec, fetch_k)
+        # Excluded keys are typically the query's own nearest neighbours.
+        fetch_k = (top_k + len(exclude)) * 5
+        scores, ids = index.search(q_vec, fetch_k)
         
         # ids[0] is the array of neighbors for the first (and only) query vector
         neighbor_ids = ids[0]
@@ -119,24 +406,147 @@ class FAISSVectorStore(VectorStore):
             return []
 
         with sqlite3.connect(self.db_path) as conn:
-            # We want to preserve order, so we fetch mapping and re-order in python
+            # We want to preserve order, so we fetch mapping and re-order in python.
+            # A shared vector has one posting per chunk using it; each vector is
+            # returned once, as its oldest live posting that is not excluded, so
+            # boilerplate posted in hundreds of documents is one hit rather than
+            # hundreds of copies.
             placeholders = ",".join("?" * len(candidate_ids))
+            excluded = [str(key) for key in exclude]
             rows = conn.execute(
-                f"SELECT faiss_id, chunk_id FROM chunk_vectors WHERE faiss_id IN ({placeholders}) AND deleted = 0",
-                candidate_ids
+                f"SELECT faiss_id, {key_column}, MIN(rowid) FROM {table} "
+                f"WHERE faiss_id IN ({placeholders}) AND deleted = 0 "
+                f"AND {key_column} NOT IN ({','.join('?' * len(excluded))}) GROUP BY faiss_id",
+                candidate_ids + excluded
             ).fetchall()
-            
-            # Map faiss_id -> chunk_id
-            id_map = {row[0]: row[1] for row in rows}
-            
+            id_map: Dict[int, str] = {faiss_id: key for faiss_id, key, _ in rows}
+
             for nid, score in zip(neighbor_ids, neighbor_scores):
-                if nid != -1 and nid in id_map:
-                    valid_results.append((UUID(id_map[nid]), float(score)))
+                key = id_map.get(int(nid))
+                if key is not None:
+                    valid_results.append((UUID(key), float(score)))
                     if len(valid_results) >= top_k:
                         break
-                        
+
         return valid_results
 
+    def get_vectors(self, chunk_ids: List[UUID]) -> Tuple[List[UUID], np.ndarray]:
+        empty = ([], np.empty((0, self.dim), dtype='float32'))
+        if not chunk_ids or self.index.ntotal == 0:
+            return empty
+
+        with sqlite3.connect(self.db_path) as conn:
+            placeholders = ",".join("?" * len(chunk_ids))
+            rows = conn.execute(
+                f"SELECT chunk_id, faiss_id FROM chunk_postings WHERE chunk_id IN ({placeholders}) AND model = ? AND deleted = 0",
+                [str(cid) for cid in chunk_ids] + [self.model_name]
+            ).fetchall()
+        faiss_ids = {row[0]: row[1] for row in rows}
+
+        found = [cid for cid in chunk_ids if str(cid) in faiss_ids]
+        return self._reconstruct(found, [faiss_ids[str(cid)] for cid in found])
+
+    def get_doc_chunk_vectors(self, doc_ids: List[UUID]) -> Tuple[List[UUID], np.ndarray]:
+        if not doc_ids or self.index.ntotal == 0:
+            return [], np.empty((0, self.dim), dtype='float32')
+
+        # A document's new vectors are added in one batch, so ordering by faiss_id
+        # reads them as one contiguous block of the flat index (shared ones aside).
+        with sqlite3.connect(self.db_path) as conn:
+            placeholders = ",".join("?" * len(doc_ids))
+            rows = conn.execute(
+                f"SELECT chunk_id, faiss_id FROM chunk_postings WHERE doc_id IN ({placeholders}) AND model = ? AND deleted = 0 ORDER BY faiss_id",
+                [str(did) for did in doc_ids] + [self.model_name]
+            ).fetchall()
+        return self._reconstruct([UUID(r[0]) for r in rows], [r[1] for r in rows])
+
+    def _reconstruct(self, chunk_ids: List[UUID], faiss_ids: List[int]) -> Tuple[List[UUID], np.ndarray]:
+        if not chunk_ids:
+            return [], np.empty((0, self.dim), dtype='float32')
+        positions = self._positions(np.array(faiss_ids, dtype='int64'))
+
+        # Rows whose vector never made it into the index file are skipped
+        keep = positions >= 0
+        found = [cid for cid, k in zip(chunk_ids, keep) if k]
+        if not found:
+            return [], np.empty((0, self.dim), dtype='float32')
+        # Stored vectors were normalized on upsert
+        return found, self.index.index.reconstruct_batch(positions[keep])
+
+    def _positions(self, faiss_ids: np.ndarray) -> np.ndarray:
+        """Maps faiss ids to row positions in the underlying flat index (-1 if absent)."""
+        # Zero-copy view of IndexIDMap's id list. Ids are appended in AUTOINCREMENT
+        # order, so it is sorted and a binary search finds each position.
+        id_map = faiss.rev_swig_ptr(self.index.id_map.data(), self.index.ntotal)
+        positions = np.searchsorted(id_map, faiss_ids)
+        positions[positions >= len(id_map)] = 0
+        misses = id_map[positions] != faiss_ids
+        for i in np.nonzero(misses)[0]:
+            # Out-of-order id (e.g. concurrent writers): linear fallback
+            hits = np.nonzero(id_map == faiss_ids[i])[0]
+            positions[i] = hits[-1] if len(hits) else -1
+        return positions
+
+    def pending_chunks(self, reference_model: str, limit: int) -> Tuple[List[UUID], int]:
+        with sqlite3.connect(self.db_path) as conn:
+            params = (reference_model, self.model_name)
+            total = conn.execute(f"SELECT COUNT(*) {_PENDING_CHUNKS}", params).fetchone()[0]
+            rows = conn.execute(f"SELECT p.chunk_id {_PENDING_CHUNKS} ORDER BY p.rowid LIMIT ?", params + (limit,)).fetchall()
+        return [UUID(r[0]) for r in rows], total
+
+    def activate(self, reference_model: str) -> bool:
+        # Document index from this model's chunk vectors, ready before the switch
+        self._doc_index = faiss.IndexIDMap(faiss.IndexFlatIP(self.dim))
+        self._backfill_doc_index()
+        self._save_doc_index()
+
+        with sqlite3.connect(self.db_path, isolation_level=None) as conn:
+            # The coverage check and the switch happen in one write transaction,
+            # so no chunk indexed meanwhile can slip through
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                pending = conn.execute(
+                    f"SELECT COUNT(*) {_PENDING_CHUNKS}", (reference_model, self.model_name)
+                ).fetchone()[0]
+                if pending:
+                    conn.execute("ROLLBACK")
+                    return False
+                now = time.time()
+                conn.execute("UPDATE vector_models SET state = 'retired', updated_at = ? WHERE state = 'active'", (now,))
+                conn.execute(
+                    "UPDATE vector_models SET state = 'active', updated_at = ? WHERE model = ?", (now, self.model_name)
+                )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        print(f"Vector index switched from {reference_model} to {self.model_name}")
+        return True
+
+    def stats(self) -> Dict[str, float]:
+        # From the mapping DB alone, not the index loaded at construction, so
+        # a long-lived store (the one /metrics keeps) reports current figures
+        with sqlite3.connect(self.db_path) as conn:
+            model = self.model_name
+            if self._serves_active:
+                row = conn.execute("SELECT model FROM vector_models WHERE state = 'active'").fetchone()
+                model = row[0] if row else model
+            # One row per vector added to the index; tombstoned ones still occupy
+            # it (and get scanned) until compaction
+            ntotal, deleted = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(deleted), 0) FROM chunk_vectors WHERE model = ?", (model,)
+            ).fetchone()
+            postings = conn.execute(
+                "SELECT COUNT(*) FROM chunk_postings WHERE model = ? AND deleted = 0", (model,)
+            ).fetchone()[0]
+        return {
+            "ntotal": ntotal,
+            # Live chunks; above ntotal - tombstones when chunks share vectors
+            "postings": postings,
+            "tombstones": deleted,
+            "tombstone_ratio": deleted / ntotal if ntotal else 0.0,
+        }
+
     def compact(self):
         """
         Optional: Rebuild index to remove deleted vectors.
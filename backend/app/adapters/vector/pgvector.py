@@ -1,4 +1,5 @@
-from typing import List, Tuple
+import numpy as np
+from typing import Collection, List, Tuple
 from uuid import UUID
 from backend.app.domain import models
 from backend.app.domain.ports import VectorStore
@@ -21,8 +22,29 @@ class PgVectorStore(VectorStore):
     def upsert_embeddings(self, chunks: List[models.Chunk], embeddings: List[List[float]]) -> None:
         raise NotImplementedError("PgVector backend not implemented yet")
 
+    def reuse_embeddings(self, chunks: List[models.Chunk]) -> List[models.Chunk]:
+        raise NotImplementedError("PgVector backend not implemented yet")
+
+    def pending_chunks(self, reference_model: str, limit: int) -> Tuple[List[UUID], int]:
+        raise NotImplementedError("PgVector backend not implemented yet")
+
+    def activate(self, reference_model: str) -> bool:
+        raise NotImplementedError("PgVector backend not implemented yet")
+
     def delete_doc(self, doc_id: UUID) -> None:
         raise NotImplementedError("PgVector backend not implemented yet")
 
-    def query(self, vector: List[float], top_k: int) -> List[Tuple[UUID, float]]:
+    def query(self, vector: List[float], top_k: int, exclude: Collection[UUID] = ()) -> List[Tuple[UUID, float]]:
+        raise NotImplementedError("PgVector backend not implemented yet")
+
+    def get_vectors(self, chunk_ids: List[UUID]) -> Tuple[List[UUID], np.ndarray]:
+        raise NotImplementedError("PgVector backend not implemented yet")
+
+    def upsert_doc_embedding(self, doc_id: UUID, vector: List[float]) -> None:
+        raise NotImplementedError("PgVector backend not implemented yet")
+
+    def query_docs(self, vector: List[float], top_k: int) -> List[Tuple[UUID, float]]:
+        raise NotImplementedError("PgVector backend not implemented yet")
+
+    def get_doc_chunk_vectors(self, doc_ids: List[UUID]) -> Tuple[List[UUID], np.ndarray]:
         raise NotImplementedError("PgVector backend not implemented yet")
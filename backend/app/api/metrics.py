@@ -0,0 +1,52 @@
+from typing import Optional
+from fastapi import APIRouter, Depends
+from fastapi.responses import PlainTextResponse
+from backend.app.domain.ports import LexicalIndex, VectorStore, Reranker
+from backend.app.services.search import SearchResultCache, SearchCursorStore
+from backend.app.adapters.embedding.query_cache import QueryEmbeddingCache
+from backend.app.dependencies import (
+    get_shared_lexical_index, get_shared_vector_store, get_reranker,
+    get_search_result_cache, get_search_cursor_store, get_query_embedding_cache
+)
+from backend.app.util.metrics import REGISTRY
+
+router = APIRouter()
+
+# Copied from the caches' own counts on every scrape
+CACHE_EVENTS = REGISTRY.counter("search_cache_events_total", "Cache lookups by cache and result", labels=("cache", "result"))
+# Point-in-time values, refreshed on every scrape
+CACHE_ENTRIES = REGISTRY.gauge("search_cache_entries", "Entries currently held per cache", labels=("cache",))
+VECTOR_INDEX = REGISTRY.gauge("vector_index", "Vector index size figures (ntotal, tombstones, tombstone_ratio)", labels=("stat",))
+LEXICAL_INDEX = REGISTRY.gauge("lexical_index", "Lexical index size figures (rows)", labels=("stat",))
+
+def _export_cache(name: str, stats: dict):
+    for result in ("hits", "misses", "stale"):
+        if result in stats:
+            CACHE_EVENTS.set_total(stats[result], cache=name, result=result)
+    if "size" in stats:
+        CACHE_ENTRIES.set(stats["size"], cache=name)
+
+@router.get("/metrics", response_class=PlainTextResponse)
+def metrics(
+    lexical: LexicalIndex = Depends(get_shared_lexical_index),
+    vector: VectorStore = Depends(get_shared_vector_store),
+    reranker: Reranker = Depends(get_reranker),
+    result_cache: Optional[SearchResultCache] = Depends(get_search_result_cache),
+    cursor_store: Optional[SearchCursorStore] = Depends(get_search_cursor_store),
+    query_cache: Optional[QueryEmbeddingCache] = Depends(get_query_embedding_cache)
+):
+    if result_cache is not None:
+        _export_cache("search_results", result_cache.stats())
+    if cursor_store is not None:
+        _export_cache("search_cursors", cursor_store.stats())
+    if query_cache is not None:
+        _export_cache("query_embeddings", query_cache.stats())
+    if hasattr(reranker, "stats"):
+        _export_cache("rerank_scores", reranker.stats())
+
+    for stat, value in vector.stats().items():
+        VECTOR_INDEX.set(value, stat=stat)
+    for stat, value in lexical.stats().items():
+        LEXICAL_INDEX.set(value, stat=stat)
+
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
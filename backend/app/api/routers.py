@@ -1,13 +1,17 @@
-from typing import List, Optional, Dict
+from typing import List, Optional, Dict, Union, get_args
 from uuid import UUID
-from fastapi import APIRouter, Depends, HTTPException
-from pydantic import BaseModel
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field, field_validator
 from backend.app.domain import models
 from backend.app.domain.ports import MetadataStore
+from backend.app.domain.errors import NotFound, ValidationError
 from backend.app.services.indexing import IndexingService
-from backend.app.services.search import SearchService, SearchResult
+from backend.app.services.search import SearchService, SearchResult, SearchResponse
+from backend.app.services.suggest import SuggestService, Suggestion
 from backend.app.services.jobs import JobRunner
-from backend.app.dependencies import get_metadata_store, get_indexing_service, get_search_service, get_job_runner
+from backend.app.config.schema import AppConfig, NearDuplicatePolicy
+from backend.app.dependencies import get_config, get_metadata_store, get_indexing_service, get_search_service, get_suggest_service, get_job_runner, ensure_model_migration
 
 router = APIRouter()
 
@@ -18,9 +22,21 @@ class CreateSourceReq(BaseModel):
     path: str
     config: Dict = {}
 
+    @field_validator("config")
+    @classmethod
+    def check_near_duplicates(cls, v: Dict) -> Dict:
+        # Overrides ingestion.near_duplicates for this source
+        policy = v.get("near_duplicates")
+        if policy is not None and policy not in get_args(NearDuplicatePolicy):
+            raise ValueError(f"near_duplicates must be one of {', '.join(get_args(NearDuplicatePolicy))}")
+        return v
+
 class SearchReq(BaseModel):
     query: str
     top_k: int = 10
+    time_budget_ms: Optional[int] = Field(default=None, gt=0) # Overrides search.time_budget_ms
+    profile: bool = False # Return the full SearchResponse (incl. stage timings) instead of a bare list
+    cursor: Optional[str] = None # next_cursor of the previous page; query must be the same
 
 # --- Routes ---
 
@@ -61,6 +77,20 @@ def get_job(job_id: UUID, store: MetadataStore = Depends(get_metadata_store)):
         raise HTTPException(status_code=404, detail="Job not found")
     return job
 
+@router.post("/embedding/migrate", response_model=models.Job)
+def migrate_embeddings(
+    config: AppConfig = Depends(get_config),
+    store: MetadataStore = Depends(get_metadata_store)
+):
+    # Also queued at startup; this picks up a model change without waiting for a restart
+    try:
+        job = ensure_model_migration(config, store)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if job is None:
+        raise HTTPException(status_code=400, detail=f"{config.embedding.model_name} is already the active embedding model")
+    return job
+
 @router.get("/documents", response_model=List[models.Document])
 def list_documents(
     source_id: UUID,
@@ -79,9 +109,74 @@ def get_document(doc_id: UUID, store: MetadataStore = Depends(get_metadata_store
 def list_doc_chunks(doc_id: UUID, store: MetadataStore = Depends(get_metadata_store)):
     return store.list_chunks(doc_id)
 
-@router.post("/search", response_model=List[SearchResult])
+@router.post("/search", response_model=Union[List[SearchResult], SearchResponse])
 def search(
+    req: SearchReq,
+    response: Response,
+    service: SearchService = Depends(get_search_service)
+):
+    try:
+        result = service.execute(req.query, req.top_k, time_budget_ms=req.time_budget_ms, cursor=req.cursor)
+    except ValidationError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    # Lexical-only fallback is signalled out of band to keep the body a plain list
+    response.headers["X-Search-Degraded"] = "1" if result.degraded else "0"
+    response.headers["X-Search-Cache"] = "hit" if result.cached else "miss"
+    response.headers["Server-Timing"] = ", ".join(
+        f"{stage};dur={ms}" for stage, ms in result.timings_ms.items()
+    )
+    if result.next_cursor:
+        response.headers["X-Next-Cursor"] = result.next_cursor
+    if req.profile:
+        return result
+    return result.results
+
+@router.get("/chunks/{chunk_id}/similar", response_model=List[SearchResult])
+def similar_chunks(
+    chunk_id: UUID,
+    limit: int = Query(10, ge=1, le=100),
+    service: SearchService = Depends(get_search_service)
+):
+    try:
+        return service.similar_to_chunk(chunk_id, limit)
+    except NotFound as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+@router.get("/documents/{doc_id}/similar", response_model=List[SearchResult])
+def similar_documents(
+    doc_id: UUID,
+    limit: int = Query(10, ge=1, le=100),
+    service: SearchService = Depends(get_search_service)
+):
+    try:
+        return service.similar_to_document(doc_id, limit)
+    except NotFound as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+@router.get("/suggest", response_model=List[Suggestion])
+def suggest(
+    q: str,
+    limit: int = Query(8, ge=1, le=50),
+    service: SuggestService = Depends(get_suggest_service)
+):
+    return service.suggest(q, limit)
+
+@router.post("/search/stream")
+def search_stream(
     req: SearchReq,
     service: SearchService = Depends(get_search_service)
 ):
-    return service.search(req.query, req.top_k)
+    # NDJSON: one SearchResponse per line, lexical preview first, fused list last
+    events = service.stream(req.query, req.top_k, time_budget_ms=req.time_budget_ms, cursor=req.cursor)
+    try:
+        # Pull the first event here so a bad cursor is still a plain 400
+        first = next(events)
+    except ValidationError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    def lines():
+        yield first.model_dump_json() + "\n"
+        for event in events:
+            yield event.model_dump_json() + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
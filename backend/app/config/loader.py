@@ -49,5 +49,7 @@ def _apply_env_overrides(config: Dict[str, Any], prefix: str = "APP"):
                         config[key] = int(env_val)
                     except ValueError:
                         pass # Ignore invalid env override types, let Pydantic catch it
+                elif isinstance(value, list):
+                    config[key] = [item.strip() for item in env_val.split(",") if item.strip()]
                 else:
                     config[key] = env_val
@@ -1,6 +1,6 @@
 from enum import Enum
 from pathlib import Path
-from typing import Optional
+from typing import Dict, List, Literal, Optional
 from pydantic import BaseModel, Field, field_validator
 
 class MetadataBackend(str, Enum):
@@ -15,6 +15,14 @@ class VectorBackend(str, Enum):
     FAISS = "faiss"
     PGVECTOR = "pgvector"
 
+# Scope of the near-duplicate check (ingestion.near_duplicates, or a source's override)
+NearDuplicatePolicy = Literal["off", "source", "global"]
+
+class SearchMode(str, Enum):
+    HYBRID = "hybrid"                # FTS5 + ANN vector search, fused with RRF
+    LEXICAL_FIRST = "lexical_first"  # FTS5 candidates rescored by exact cosine on their stored vectors
+    TWO_STAGE = "two_stage"          # FTS5 + vector search over the chunks of the top documents only
+
 class StorageConfig(BaseModel):
     data_dir: Path
     sqlite_path: Path
@@ -28,7 +36,35 @@ class StorageConfig(BaseModel):
 class IngestionConfig(BaseModel):
     chunk_size_tokens: int = Field(gt=0)
     chunk_overlap_tokens: int = Field(ge=0)
+    # Tokens chunk sizes are counted in: "cl100k" (tiktoken), or "embedding",
+    # the embedding model's own tokenizer (embedding.tokenizer_name, else
+    # embedding.model_name; needs transformers, else cl100k is used). With
+    # "embedding" chunks are also capped at embedding.max_seq_length minus the
+    # model's special tokens, so the embedding server never truncates them.
+    chunk_tokenizer: Literal["cl100k", "embedding"] = "cl100k"
     max_file_mb: int = Field(gt=0)
+    # Extracted text beyond this size is chunked, embedded and written while
+    # extraction is still running, so memory stays flat for huge documents.
+    # Smaller documents are read completely first (their near-duplicate check
+    # then runs before any chunking; for streamed ones it runs at the end).
+    stream_threshold_mb: float = Field(gt=0, default=16)
+    # PDFs of at least pdf_parallel_min_pages pages are extracted in a pool of
+    # pdf_workers processes (0: one per CPU), pdf_pages_per_task pages per task.
+    # Extracted page text is cached (up to pdf_page_cache_mb, 0 disables) by a
+    # hash of the page's content, so re-indexing a PDF that gained pages, or
+    # after a failed job, only extracts the new ones.
+    pdf_workers: int = Field(ge=0, default=0)
+    pdf_parallel_min_pages: int = Field(gt=0, default=64)
+    pdf_pages_per_task: int = Field(gt=0, default=16)
+    pdf_page_cache_mb: float = Field(ge=0, default=256)
+    # Near-duplicate check before chunking/embedding (MinHash + LSH over the
+    # extracted text): a document at least near_duplicate_threshold similar to
+    # an indexed one is linked to it (status "duplicate") instead of indexed.
+    # "global" compares against all sources, "source" only within the document's
+    # own source, "off" disables it. A source's config can override it with
+    # {"near_duplicates": ...}.
+    near_duplicates: NearDuplicatePolicy = "global"
+    near_duplicate_threshold: float = Field(gt=0, le=1, default=0.9)
 
 class BookmarksConfig(BaseModel):
     chrome_bookmarks_path: Optional[Path] = None
@@ -44,11 +80,111 @@ class WebFetchConfig(BaseModel):
     enabled: bool = False
     timeout_sec: int = Field(gt=0, default=30)
     user_agent: str = "AIserver/1.0"
+    # Shared async client: max_connections in total, at most
+    # per_host_connections to one host; http2 needs the h2 package.
+    max_connections: int = Field(gt=0, default=64)
+    per_host_connections: int = Field(gt=0, default=4)
+    http2: bool = True
+    # Responses are cached in data_dir/web_cache.db (up to cache_mb, 0
+    # disables); extraction reuses entries fetched within cache_fresh_sec.
+    cache_mb: float = Field(ge=0, default=1024)
+    cache_fresh_sec: float = Field(ge=0, default=3600)
+    # Bookmarks revalidated (conditional GET) together during a scan
+    scan_batch_size: int = Field(gt=0, default=256)
 
 class EmbeddingConfig(BaseModel):
+    # "local": embed in-process (see local_backend); anything else calls the
+    # OpenAI-compatible embedding server (HFserve)
     provider: str
     model_name: str
     dim: int = Field(gt=0)
+    # In-process embedding (provider: local). onnx runs onnx_path on onnxruntime,
+    # int8-quantized unless quantize_int8 is false; torch uses sentence-transformers.
+    # Concurrent calls are pooled for batch_wait_ms and run in length-sorted
+    # batches of batch_size on num_threads intra-op threads.
+    local_backend: Literal["onnx", "torch"] = "onnx"
+    onnx_path: Optional[Path] = None
+    quantize_int8: bool = True
+    num_threads: Optional[int] = Field(gt=0, default=None)
+    max_seq_length: int = Field(gt=0, default=512)
+    # Hugging Face id of model_name's tokenizer, when model_name is not one
+    # (ingestion.chunk_tokenizer: embedding)
+    tokenizer_name: Optional[str] = None
+    batch_wait_ms: float = Field(ge=0, default=2.0)
+    # Requests to the embedding server: at most batch_size texts and about
+    # max_tokens_per_request tokens each, max_concurrency in flight. Batches
+    # shrink on 429/413 and are retried with backoff up to max_retries times.
+    batch_size: int = Field(gt=0, default=64)
+    max_tokens_per_request: int = Field(gt=0, default=16384)
+    max_concurrency: int = Field(gt=0, default=4)
+    max_retries: int = Field(ge=0, default=5)
+    request_timeout_sec: float = Field(gt=0, default=60)
+    # Embedding server replicas (OpenAI-compatible base URLs). Each request goes
+    # to the replica with the fewest in-flight requests; replicas failing their
+    # /readyz probe (every health_check_interval_sec) are taken out of rotation.
+    # max_concurrency applies per replica.
+    endpoints: List[str] = Field(min_length=1, default=["http://localhost:8005/v1"])
+    health_check_interval_sec: float = Field(gt=0, default=5)
+    # Endpoints of other models, by model name. While a model migration runs,
+    # the previous model keeps serving queries from its own endpoints (or from
+    # endpoints, if the same servers host both).
+    model_endpoints: Dict[str, List[str]] = Field(default_factory=dict)
+    # Model migration (model_name changed on an existing index): a background job
+    # re-embeds migration_batch_size chunks at a time into a second index and
+    # embeds at most migration_duty_cycle of the time, leaving the rest of the
+    # embedding capacity to queries and indexing; searches use the old index
+    # until the new one is complete.
+    migration_batch_size: int = Field(gt=0, default=256)
+    migration_duty_cycle: float = Field(gt=0, le=1, default=0.5)
+    # Wire format of returned vectors: "base64" (little-endian floats, ~4x smaller
+    # than JSON lists) or "float". transport_dtype=float16 halves base64 payloads
+    # again; it is an HFserve extension, other servers answer with float32.
+    encoding_format: Literal["float", "base64"] = "base64"
+    transport_dtype: Literal["float32", "float16"] = "float32"
+    # Byte budget of the document embedding cache (data_dir/cache/embeddings.db,
+    # float16 vectors, LRU eviction). 0 disables it.
+    cache_mb: float = Field(ge=0, default=2048)
+    # In-process LRU of query vectors (0 disables it)
+    query_cache_mb: float = Field(ge=0, default=64)
+    # Additionally keep query vectors in a SQLite file under data_dir, shared by workers
+    query_cache_persistent: bool = False
+
+class SearchConfig(BaseModel):
+    mode: SearchMode = SearchMode.HYBRID
+    # two_stage: number of documents selected from the document-level index
+    top_docs: int = Field(gt=0, default=50)
+    top_k_lex: int = Field(gt=0, default=20)
+    top_k_vec: int = Field(gt=0, default=20)
+    rrf_k: int = Field(gt=0, default=60)
+    # Max wall-clock wait for query embedding + vector search. When exceeded the
+    # lexical results are returned alone and the response is flagged as degraded.
+    time_budget_ms: Optional[int] = Field(gt=0, default=None)
+    # Fused-result cache; entries also go stale when the index generation changes.
+    # result_cache_size=0 disables it.
+    result_cache_size: int = Field(ge=0, default=1024)
+    result_cache_ttl_sec: float = Field(gt=0, default=3600)
+    # Cursor pagination: the fused candidate list of a query is kept for
+    # cursor_ttl_sec after its last page so later pages are sliced from it.
+    # Retrieval depth is prefetch_pages past the requested page, up to max_depth.
+    cursor_cache_size: int = Field(ge=0, default=256)
+    cursor_ttl_sec: float = Field(gt=0, default=600)
+    prefetch_pages: int = Field(gt=0, default=3)
+    max_depth: int = Field(gt=0, default=500)
+    # The reranker reorders this many candidates at once (at least one page),
+    # when a candidate set is built and again when paging goes past them
+    rerank_depth: int = Field(gt=0, default=50)
+
+class RerankConfig(BaseModel):
+    enabled: bool = False
+    model_name: str = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+    backend: str = "torch" # "torch" (transformers) or "onnx" (onnxruntime)
+    onnx_path: Optional[Path] = None # Exported model.onnx when backend is "onnx"
+    batch_size: int = Field(gt=0, default=16)
+    max_passage_tokens: int = Field(gt=0, default=256)
+    # Candidates not scored within the budget keep their fused (RRF) order
+    time_budget_ms: Optional[int] = Field(gt=0, default=150)
+    cache_size: int = Field(ge=0, default=20000)
+    num_threads: Optional[int] = Field(gt=0, default=None)
 
 class AppConfig(BaseModel):
     metadata_backend: MetadataBackend
@@ -59,3 +195,5 @@ class AppConfig(BaseModel):
     bookmarks: BookmarksConfig
     web_fetch: WebFetchConfig
     embedding: EmbeddingConfig
+    search: SearchConfig = Field(default_factory=SearchConfig)
+    rerank: RerankConfig = Field(default_factory=RerankConfig)
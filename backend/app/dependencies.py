@@ -1,9 +1,9 @@
 from functools import lru_cache
-from typing import Annotated, Optional
+from typing import Annotated, Dict, Optional, Tuple
 from fastapi import Depends
 from backend.app.config.loader import load_config
 from backend.app.config.schema import AppConfig, MetadataBackend, LexicalBackend, VectorBackend
-from backend.app.domain.ports import MetadataStore, LexicalIndex, VectorStore, EmbeddingProvider
+from backend.app.domain.ports import MetadataStore, LexicalIndex, VectorStore, EmbeddingProvider, Reranker
 from backend.app.adapters.metadata.sqlite import SQLiteMetadataStore
 from backend.app.adapters.metadata.postgres import PostgresMetadataStore
 from backend.app.adapters.lexical.fts5 import FTS5LexicalIndex
@@ -11,9 +11,15 @@ from backend.app.adapters.lexical.pg_fts import PgFTSIndex
 from backend.app.adapters.vector.faiss import FAISSVectorStore
 from backend.app.adapters.vector.pgvector import PgVectorStore
 from backend.app.adapters.embedding.litellm import LiteLLMEmbeddingProvider
+from backend.app.adapters.embedding.local import LocalEmbeddingProvider
+from backend.app.adapters.embedding.query_cache import QueryEmbeddingCache
+from backend.app.adapters.rerank.cross_encoder import CrossEncoderReranker
 from backend.app.services.indexing import IndexingService
-from backend.app.services.search import SearchService
+from backend.app.services.search import SearchService, SearchResultCache, SearchCursorStore, NoOpReranker
+from backend.app.services.suggest import SuggestService
 from backend.app.services.jobs import JobRunner
+from backend.app.services.migration import ModelMigrationService
+from backend.app.domain import models
 import os
 
 @lru_cache
@@ -38,6 +44,8 @@ def get_lexical_index(config: Annotated[AppConfig, Depends(get_config)] = None)
     raise ValueError(f"Unknown lexical backend: {config.lexical_backend}")
 
 def get_vector_store(config: Annotated[AppConfig, Depends(get_config)] = None) -> VectorStore:
+    # The store of the active embedding model, which may still be the previous
+    # model_name while a migration to the configured one runs
     if config is None: config = get_config()
     if config.vector_backend == VectorBackend.FAISS:
         return FAISSVectorStore(config)
@@ -45,10 +53,55 @@ def get_vector_store(config: Annotated[AppConfig, Depends(get_config)] = None) -
         return PgVectorStore(config)
     raise ValueError(f"Unknown vector backend: {config.vector_backend}")
 
-def get_embedding_provider(config: Annotated[AppConfig, Depends(get_config)] = None) -> EmbeddingProvider:
+# Long-lived adapters for /metrics and suggestions, one per backend and
+# database, so that a scrape or a keystroke neither creates an engine (and
+# runs the schema DDL) nor loads the FAISS index. What they serve is read
+# from the database, or from caches invalidated by writes.
+_shared_adapters: Dict[Tuple[str, str], object] = {}
+
+def get_shared_lexical_index(config: Annotated[AppConfig, Depends(get_config)] = None) -> LexicalIndex:
+    if config is None: config = get_config()
+    key = (config.lexical_backend.value, str(config.storage.sqlite_path))
+    if key not in _shared_adapters:
+        _shared_adapters[key] = get_lexical_index(config)
+    return _shared_adapters[key]
+
+def get_shared_vector_store(config: Annotated[AppConfig, Depends(get_config)] = None) -> VectorStore:
     if config is None: config = get_config()
+    key = (config.vector_backend.value, str(config.storage.sqlite_path))
+    if key not in _shared_adapters:
+        _shared_adapters[key] = get_vector_store(config)
+    return _shared_adapters[key]
+
+def _model_config(config: AppConfig, model_name: str, dim: int) -> AppConfig:
+    """config with the embedding section pointed at another model and its endpoints."""
+    if model_name == config.embedding.model_name and dim == config.embedding.dim:
+        return config
+    embedding = config.embedding.model_copy(update={
+        "model_name": model_name,
+        "dim": dim,
+        "endpoints": config.embedding.model_endpoints.get(model_name, config.embedding.endpoints),
+    })
+    return config.model_copy(update={"embedding": embedding})
+
+def _serving_config(config: AppConfig, vector_store: VectorStore) -> AppConfig:
+    # Queries and new documents are embedded with the model of the stored vectors
+    model = vector_store.model()
+    return config if model is None else _model_config(config, *model)
+
+def _build_embedding_provider(config: AppConfig) -> EmbeddingProvider:
+    if config.embedding.provider == "local":
+        return LocalEmbeddingProvider(config)
     return LiteLLMEmbeddingProvider(config)
 
+def get_embedding_provider(
+    config: Annotated[AppConfig, Depends(get_config)] = None,
+    vector_store: Annotated[VectorStore, Depends(get_vector_store)] = None
+) -> EmbeddingProvider:
+    if config is None: config = get_config()
+    if vector_store is None: vector_store = get_vector_store(config)
+    return _build_embedding_provider(_serving_config(config, vector_store))
+
 def get_indexing_service(
     config: Annotated[AppConfig, Depends(get_config)] = None,
     metadata_store: Annotated[MetadataStore, Depends(get_metadata_store)] = None,
@@ -60,8 +113,9 @@ def get_indexing_service(
     if metadata_store is None: metadata_store = get_metadata_store(config)
     if lexical_index is None: lexical_index = get_lexical_index(config)
     if vector_store is None: vector_store = get_vector_store(config)
-    if embedding_provider is None: embedding_provider = get_embedding_provider(config)
-    
+    if embedding_provider is None: embedding_provider = get_embedding_provider(config, vector_store)
+    config = _serving_config(config, vector_store)
+
     return IndexingService(
         config=config,
         metadata_store=metadata_store,
@@ -70,27 +124,106 @@ def get_indexing_service(
         embedding_provider=embedding_provider
     )
 
+_search_result_cache: Optional[SearchResultCache] = None
+
+def get_search_result_cache(config: Annotated[AppConfig, Depends(get_config)] = None) -> Optional[SearchResultCache]:
+    # Must outlive the request-scoped SearchService, hence the module-level instance
+    global _search_result_cache
+    if config is None: config = get_config()
+    if config.search.result_cache_size == 0:
+        return None
+    if _search_result_cache is None:
+        _search_result_cache = SearchResultCache(
+            maxsize=config.search.result_cache_size,
+            ttl_sec=config.search.result_cache_ttl_sec
+        )
+    return _search_result_cache
+
+_search_cursor_store: Optional[SearchCursorStore] = None
+
+def get_search_cursor_store(config: Annotated[AppConfig, Depends(get_config)] = None) -> Optional[SearchCursorStore]:
+    global _search_cursor_store
+    if config is None: config = get_config()
+    if config.search.cursor_cache_size == 0:
+        return None
+    if _search_cursor_store is None:
+        _search_cursor_store = SearchCursorStore(
+            maxsize=config.search.cursor_cache_size,
+            ttl_sec=config.search.cursor_ttl_sec
+        )
+    return _search_cursor_store
+
+_query_embedding_cache: Optional[QueryEmbeddingCache] = None
+
+def get_query_embedding_cache(config: Annotated[AppConfig, Depends(get_config)] = None) -> Optional[QueryEmbeddingCache]:
+    global _query_embedding_cache
+    if config is None: config = get_config()
+    if config.embedding.query_cache_mb == 0:
+        return None
+    if _query_embedding_cache is None:
+        persistent_path = None
+        if config.embedding.query_cache_persistent:
+            persistent_path = config.storage.data_dir / "cache" / "query_embeddings.db"
+        _query_embedding_cache = QueryEmbeddingCache(
+            max_bytes=int(config.embedding.query_cache_mb * 1024 * 1024),
+            persistent_path=persistent_path
+        )
+    return _query_embedding_cache
+
+_reranker_instance: Optional[Reranker] = None
+
+def get_reranker(config: Annotated[AppConfig, Depends(get_config)] = None) -> Reranker:
+    # The cross-encoder model is loaded once per process (lazily, on first query)
+    global _reranker_instance
+    if config is None: config = get_config()
+    if not config.rerank.enabled:
+        return NoOpReranker()
+    if _reranker_instance is None:
+        _reranker_instance = CrossEncoderReranker(config)
+    return _reranker_instance
+
 def get_search_service(
     config: Annotated[AppConfig, Depends(get_config)] = None,
     metadata_store: Annotated[MetadataStore, Depends(get_metadata_store)] = None,
     lexical_index: Annotated[LexicalIndex, Depends(get_lexical_index)] = None,
     vector_store: Annotated[VectorStore, Depends(get_vector_store)] = None,
-    embedding_provider: Annotated[EmbeddingProvider, Depends(get_embedding_provider)] = None
+    embedding_provider: Annotated[EmbeddingProvider, Depends(get_embedding_provider)] = None,
+    result_cache: Annotated[Optional[SearchResultCache], Depends(get_search_result_cache)] = None,
+    cursor_store: Annotated[Optional[SearchCursorStore], Depends(get_search_cursor_store)] = None,
+    query_embedding_cache: Annotated[Optional[QueryEmbeddingCache], Depends(get_query_embedding_cache)] = None,
+    reranker: Annotated[Reranker, Depends(get_reranker)] = None
 ) -> SearchService:
     if config is None: config = get_config()
     if metadata_store is None: metadata_store = get_metadata_store(config)
     if lexical_index is None: lexical_index = get_lexical_index(config)
     if vector_store is None: vector_store = get_vector_store(config)
-    if embedding_provider is None: embedding_provider = get_embedding_provider(config)
+    if embedding_provider is None: embedding_provider = get_embedding_provider(config, vector_store)
+    if result_cache is None: result_cache = get_search_result_cache(config)
+    if cursor_store is None: cursor_store = get_search_cursor_store(config)
+    if query_embedding_cache is None: query_embedding_cache = get_query_embedding_cache(config)
+    if reranker is None: reranker = get_reranker(config)
+    config = _serving_config(config, vector_store)
 
     return SearchService(
         config=config,
         metadata_store=metadata_store,
         lexical_index=lexical_index,
         vector_store=vector_store,
-        embedding_provider=embedding_provider
+        embedding_provider=embedding_provider,
+        reranker=reranker,
+        result_cache=result_cache,
+        query_embedding_cache=query_embedding_cache,
+        cursor_store=cursor_store
     )
 
+def get_suggest_service(
+    lexical_index: Annotated[LexicalIndex, Depends(get_shared_lexical_index)] = None
+) -> SuggestService:
+    # Deliberately lexical-only, on the process-wide index: building adapters
+    # per keystroke would dwarf the lookup itself.
+    if lexical_index is None: lexical_index = get_shared_lexical_index()
+    return SuggestService(lexical_index)
+
 _job_runner_instance: Optional[JobRunner] = None
 
 def get_job_runner(
@@ -110,10 +243,66 @@ def get_job_runner(
         # If calling from test or script without lifespan
         if metadata_store is None: metadata_store = get_metadata_store()
         if indexing_service is None: indexing_service = get_indexing_service()
-        _job_runner_instance = JobRunner(metadata_store, indexing_service)
+        _job_runner_instance = JobRunner(
+            metadata_store,
+            indexing_service,
+            indexing_service_factory=get_indexing_service,
+            migration_service_factory=lambda job: get_migration_service(model_name=job.payload["model_name"])
+        )
     
     return _job_runner_instance
 
+def get_migration_service(config: Optional[AppConfig] = None, model_name: Optional[str] = None) -> ModelMigrationService:
+    """Migration from the active model to model_name (default: the configured embedding.model_name)."""
+    if config is None: config = get_config()
+    if config.vector_backend != VectorBackend.FAISS:
+        raise ValueError(f"Embedding model migration is not supported by {config.vector_backend}")
+    if model_name is None: model_name = config.embedding.model_name
+    if model_name != config.embedding.model_name:
+        raise ValueError(f"Cannot migrate to {model_name}: embedding.model_name is {config.embedding.model_name}")
+    metadata_store = get_metadata_store(config)
+    active_store = get_vector_store(config)
+    target_store = FAISSVectorStore(config, model_name=model_name)
+    return ModelMigrationService(
+        config=config,
+        metadata_store=metadata_store,
+        active_store=active_store,
+        target_store=target_store,
+        embedding_provider=_build_embedding_provider(config)
+    )
+
+def ensure_model_migration(
+    config: Optional[AppConfig] = None,
+    metadata_store: Optional[MetadataStore] = None,
+    resume_running: bool = False
+) -> Optional[models.Job]:
+    """
+    Queues a migration job if the configured embedding model is not the one
+    being served (and none is queued or running), and returns it; None if
+    there is nothing to migrate. At startup (resume_running) a job left
+    RUNNING by the previous process is queued again.
+    """
+    if config is None: config = get_config()
+    if config.vector_backend != VectorBackend.FAISS:
+        return None
+    if metadata_store is None: metadata_store = get_metadata_store(config)
+    active = get_vector_store(config).model()
+    if active is None or active[0] == config.embedding.model_name:
+        return None
+
+    for job in metadata_store.list_jobs():
+        if job.type != models.JobType.MIGRATE_EMBEDDINGS or job.payload.get("model_name") != config.embedding.model_name:
+            continue
+        if job.status == models.JobStatus.RUNNING and resume_running:
+            job.status = models.JobStatus.PENDING
+            return metadata_store.upsert_job(job)
+        if job.status in (models.JobStatus.PENDING, models.JobStatus.RUNNING):
+            return job
+
+    job = models.Job(type=models.JobType.MIGRATE_EMBEDDINGS, payload={"model_name": config.embedding.model_name})
+    print(f"Queued embedding migration from {active[0]} to {config.embedding.model_name}")
+    return metadata_store.upsert_job(job)
+
 def reset_job_runner():
     global _job_runner_instance
     if _job_runner_instance:
@@ -12,6 +12,7 @@ class JobType(str, Enum):
     SCAN_SOURCE = "scan_source"
     INDEX_DOC = "index_doc"
     REINDEX_ALL = "reindex_all"
+    MIGRATE_EMBEDDINGS = "migrate_embeddings"
 
 class JobStatus(str, Enum):
     PENDING = "pending"
@@ -41,6 +42,11 @@ class Document(DomainModel):
     mtime: Optional[datetime] = None
     doc_hash: Optional[str] = None
     status: str = "new"
+    # Set (with status "duplicate") when the content is a near-duplicate of this indexed document
+    canonical_id: Optional[UUID] = None
+    # HTTP validators of the last fetch of a web document, sent back on rescans
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
 
     class Config:
         from_attributes = True
@@ -52,6 +58,8 @@ class Chunk(DomainModel):
     start_offset: int
     end_offset: int
     chunk_hash: str
+    # Where the chunk came from, e.g. {"page_start": 3, "page_end": 4} (1-based) for PDFs
+    metadata: Dict[str, Any] = Field(default_factory=dict)
 
     class Config:
         from_attributes = True
@@ -1,5 +1,6 @@
+import numpy as np
 from abc import ABC, abstractmethod
-from typing import List, Optional, Tuple, Any
+from typing import List, Optional, Tuple, Any, Dict, Iterator, Collection
 from uuid import UUID
 from backend.app.domain.models import Source, Document, Chunk, Job, ExtractedContent
 
@@ -25,6 +26,11 @@ class MetadataStore(ABC):
     @abstractmethod
     def mark_document_deleted(self, doc_id: UUID) -> None: ...
 
+    @abstractmethod
+    def list_duplicates(self, canonical_id: UUID) -> List[Document]:
+        """Documents linked (status "duplicate") to canonical_id"""
+        ...
+
     @abstractmethod
     def upsert_chunk(self, chunk: Chunk) -> Chunk: ...
     
@@ -34,6 +40,21 @@ class MetadataStore(ABC):
     @abstractmethod
     def get_chunk(self, chunk_id: UUID) -> Optional[Chunk]: ...
 
+    @abstractmethod
+    def get_chunks_with_documents(self, chunk_ids: List[UUID]) -> List[Tuple[Chunk, Document]]:
+        """Batched hydration: (chunk, owning document) for each existing id, in input order"""
+        ...
+
+    @abstractmethod
+    def upsert_doc_signature(self, doc_id: UUID, signature: bytes, band_keys: List[int]) -> None:
+        """Stores a document's MinHash signature and its LSH band buckets (replacing earlier ones)"""
+        ...
+
+    @abstractmethod
+    def find_signature_candidates(self, band_keys: List[int], source_id: Optional[UUID] = None) -> List[Tuple[UUID, bytes]]:
+        """(doc_id, signature) of indexed documents sharing at least one band bucket, optionally within one source"""
+        ...
+
     @abstractmethod
     def upsert_job(self, job: Job) -> Job: ...
     
@@ -46,6 +67,14 @@ class MetadataStore(ABC):
     @abstractmethod
     def get_pending_jobs(self, limit: int = 10) -> List[Job]: ...
 
+    @abstractmethod
+    def get_index_generation(self) -> int:
+        """Monotonic counter identifying the current state of the searchable corpus"""
+        ...
+
+    @abstractmethod
+    def bump_index_generation(self) -> int: ...
+
 class LexicalIndex(ABC):
     @abstractmethod
     def upsert_chunks(self, chunks: List[Chunk]) -> None: ...
@@ -58,30 +87,95 @@ class LexicalIndex(ABC):
         """Returns list of (doc_id or chunk_id, score)"""
         ...
 
+    @abstractmethod
+    def suggest_terms(self, prefix: str, limit: int) -> List[Tuple[str, int]]:
+        """Returns indexed terms starting with prefix as (term, doc_freq), most frequent first"""
+        ...
+
+    def stats(self) -> Dict[str, float]:
+        """Index size figures for monitoring (empty if the backend has none)"""
+        return {}
+
 class VectorStore(ABC):
     @abstractmethod
     def upsert_embeddings(self, chunks: List[Chunk], embeddings: List[List[float]]) -> None: ...
     
+    @abstractmethod
+    def reuse_embeddings(self, chunks: List[Chunk]) -> List[Chunk]:
+        """Points chunks at stored vectors of identical content (chunk_hash + model); returns those without one"""
+        ...
+
     @abstractmethod
     def delete_doc(self, doc_id: UUID) -> None: ...
     
     @abstractmethod
-    def query(self, vector: List[float], top_k: int) -> List[Tuple[UUID, float]]:
-        """Returns list of (chunk_id, score)"""
+    def query(self, vector: List[float], top_k: int, exclude: Collection[UUID] = ()) -> List[Tuple[UUID, float]]:
+        """Returns list of (chunk_id, score), never one of the chunks in exclude"""
+        ...
+
+    @abstractmethod
+    def get_vectors(self, chunk_ids: List[UUID]) -> Tuple[List[UUID], np.ndarray]:
+        """Returns (found chunk_ids, float32 matrix of their L2-normalized stored vectors, one row each)"""
+        ...
+
+    @abstractmethod
+    def upsert_doc_embedding(self, doc_id: UUID, vector: List[float]) -> None:
+        """Stores the document-level vector used by two-stage search"""
+        ...
+
+    @abstractmethod
+    def query_docs(self, vector: List[float], top_k: int) -> List[Tuple[UUID, float]]:
+        """Returns list of (doc_id, score) from the document-level index"""
         ...
 
+    @abstractmethod
+    def get_doc_chunk_vectors(self, doc_ids: List[UUID]) -> Tuple[List[UUID], np.ndarray]:
+        """Like get_vectors, for all live chunks of the given documents"""
+        ...
+
+    def model(self) -> Optional[Tuple[str, int]]:
+        """(embedding model, dim) the stored vectors belong to, if the backend tracks it"""
+        return None
+
+    @abstractmethod
+    def pending_chunks(self, reference_model: str, limit: int) -> Tuple[List[UUID], int]:
+        """Up to limit live chunks with a reference_model vector but none of this store's model, and their total count"""
+        ...
+
+    @abstractmethod
+    def activate(self, reference_model: str) -> bool:
+        """Makes this store's model the served one, unless chunks are still pending; returns whether it switched"""
+        ...
+
+    def stats(self) -> Dict[str, float]:
+        """Index size figures for monitoring (empty if the backend has none)"""
+        return {}
+
 class ContentExtractor(ABC):
     @abstractmethod
     def extract(self, document_uri: str) -> Tuple[str, dict]:
         """Returns (extracted_text, metadata_dict)"""
         ...
 
+    def extract_segments(self, document_uri: str) -> Tuple[ExtractedContent, Iterator[str]]:
+        """
+        Like extract, but the text comes as a lazy iterator of segments (pages,
+        blocks, file reads) and the returned content has empty text.
+        Extractors that can produce text incrementally override this.
+        """
+        content = self.extract(document_uri)
+        return content.model_copy(update={"text": ""}), iter([content.text])
+
 class EmbeddingProvider(ABC):
     @abstractmethod
     def embed_texts(self, texts: List[str]) -> List[List[float]]: ...
 
+    def embed_query(self, text: str) -> List[float]:
+        """Embeds a single search query. Providers may skip document-oriented caching here."""
+        return self.embed_texts([text])[0]
+
 class Reranker(ABC):
     @abstractmethod
-    def rerank(self, query: str, chunks: List[Chunk]) -> List[Tuple[Chunk, float]]:
-        """Returns chunks sorted by relevance score"""
+    def rerank(self, query: str, chunks: List[Chunk]) -> List[Tuple[Chunk, Optional[float]]]:
+        """Returns chunks sorted by relevance score. Chunks left unscored (score None) keep their input order at the end."""
         ...
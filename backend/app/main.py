@@ -1,7 +1,7 @@
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from backend.app.config.loader import load_config
-from backend.app.dependencies import get_job_runner
+from backend.app.dependencies import get_job_runner, ensure_model_migration
 import os
 
 # Determine config path, default to relative path from where uvicorn is run (usually root)
@@ -17,6 +17,11 @@ except Exception as e:
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
+    try:
+        # embedding.model_name changed since the index was built: re-embed in the background
+        ensure_model_migration(resume_running=True)
+    except Exception as e:
+        print(f"Embedding migration check failed: {e}")
     runner = get_job_runner()
     runner.start()
     yield
@@ -30,4 +35,6 @@ def health_check():
     return {"status": "ok", "config_loaded": config is not None}
 
 from backend.app.api.routers import router as api_router
+from backend.app.api.metrics import router as metrics_router
 app.include_router(api_router, prefix="/api/v1")
+app.include_router(metrics_router)
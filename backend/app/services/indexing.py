@@ -1,16 +1,28 @@
+import bisect
+import hashlib
+import itertools
 import time
+import numpy as np
+from pathlib import Path
 from uuid import UUID
-from typing import List, Optional, Dict
+from typing import Any, Iterable, Iterator, List, Optional, Dict, Tuple, get_args
 from backend.app.domain import models
 from backend.app.domain.ports import MetadataStore, LexicalIndex, VectorStore, ContentExtractor, EmbeddingProvider
-from backend.app.config.schema import AppConfig
+from backend.app.domain.errors import ValidationError
+from backend.app.config.schema import AppConfig, NearDuplicatePolicy
 from backend.app.services.ingestion import IngestionService
-from backend.app.util.chunking import chunk_text
+from backend.app.util.chunking import ChunkDraft, chunk_stream, get_model_tokenizer
 from backend.app.util.hashing import compute_hash
+from backend.app.util.minhash import MinHasher, lsh_band_keys, estimate_similarity
 from backend.app.adapters.content.pdf import PDFExtractor
 from backend.app.adapters.content.markdown import MarkdownExtractor
 from backend.app.adapters.content.html import HTMLExtractor
 from backend.app.adapters.content.gdoc import GoogleDocExtractor
+from backend.app.adapters.content.text import PlainTextExtractor
+from backend.app.adapters.content.fetch import get_web_fetcher
+
+# Chunks stored, indexed and embedded together
+INDEX_BATCH_CHUNKS = 512
 
 class IndexingService:
     def __init__(
@@ -31,9 +43,10 @@ class IndexingService:
         
         # Initialize extractors
         self.extractors = {
-            'application/pdf': PDFExtractor(),
-            'text/markdown': MarkdownExtractor(),
+            'application/pdf': PDFExtractor(config),
+            'text/markdown': MarkdownExtractor(config),
             'text/html': HTMLExtractor(config),
+            'text/plain': PlainTextExtractor(),
             # 'application/vnd.google-apps.document': GoogleDocExtractor(config) # If we detect this mime
         }
         self.default_extractor = self.extractors['text/html'] # Fallback for now? Or None.
@@ -62,10 +75,18 @@ class IndexingService:
             existing_docs = {d.uri: d for d in self.metadata.list_documents_by_source(source.id)}
             
             docs_to_index = []
-            
+            # Web documents (bookmarks) are checked with conditional GETs below:
+            # the bookmark entry itself says nothing about the page changing
+            web_docs = []
+
             for doc in candidates:
                 existing = existing_docs.get(doc.uri)
-                if not existing:
+                if self.config.web_fetch.enabled and doc.uri.startswith(("http://", "https://")):
+                    if not existing:
+                        doc.status = "new"
+                        existing = self.metadata.upsert_document(doc)
+                    web_docs.append(existing)
+                elif not existing:
                     # New
                     doc.status = "new"
                     saved = self.metadata.upsert_document(doc)
@@ -73,7 +94,8 @@ class IndexingService:
                 else:
                     # Check change (mtime, size)
                     # Using float comparison for mtime might be flaky, but okay for now
-                    if doc.mtime != existing.mtime or doc.size_bytes != existing.size_bytes:
+                    # A file deleted earlier and now back is indexed again
+                    if doc.mtime != existing.mtime or doc.size_bytes != existing.size_bytes or existing.status == "deleted":
                         existing.status = "changed"
                         existing.mtime = doc.mtime
                         existing.size_bytes = doc.size_bytes
@@ -83,16 +105,33 @@ class IndexingService:
                         # Unchanged
                         pass
 
+            # Documents no longer found are dropped (their near-duplicates are
+            # indexed again). An empty scan of a missing or unreadable source
+            # says nothing about its documents, so it removes nothing.
+            if candidates and Path(source.path).exists():
+                found = {doc.uri for doc in candidates}
+                for uri, existing in existing_docs.items():
+                    if uri not in found and existing.status != "deleted":
+                        self.remove_document(existing.id)
+
             # 3. Index docs
             # For this MVP, we process them synchronously inside this job, 
             # but ideally we'd spawn sub-jobs or use a queue.
-            total = len(docs_to_index)
+            total = len(docs_to_index) + len(web_docs)
             for i, doc in enumerate(docs_to_index):
                 self.index_document(doc.id)
                 # Update job progress
                 job.progress = (i + 1) / total if total > 0 else 1.0
                 self.metadata.upsert_job(job)
 
+            batch_size = self.config.web_fetch.scan_batch_size
+            for i, (doc, changed) in enumerate(self._revalidate(web_docs), start=len(docs_to_index)):
+                if changed:
+                    self.index_document(doc.id)
+                if changed or (i + 1) % batch_size == 0:
+                    job.progress = (i + 1) / total
+                    self.metadata.upsert_job(job)
+
             job.status = models.JobStatus.DONE
             job.progress = 1.0
         except Exception as e:
@@ -102,92 +141,299 @@ class IndexingService:
         
         return self.metadata.upsert_job(job)
 
+    def _revalidate(self, docs: List[models.Document]) -> Iterator[Tuple[models.Document, bool]]:
+        """
+        Fetches web documents scan_batch_size at a time, concurrently, the next
+        batch in flight while the current one is indexed. Yields each document
+        and whether it needs indexing: documents already processed send their
+        stored validators, and a 304 leaves them alone. A 200 stores the new
+        validators (the body waits in the response cache for the extractor).
+        A failed fetch, possibly transient, leaves a processed document as it
+        was, validators included; one never processed is marked "error".
+        """
+        fetcher = get_web_fetcher(self.config)
+        size = self.config.web_fetch.scan_batch_size
+        batches = [docs[i:i + size] for i in range(0, len(docs), size)]
+
+        def processed(doc: models.Document) -> bool:
+            return doc.status in ("indexed", "duplicate")
+
+        def submit(batch: List[models.Document]):
+            return fetcher.submit([
+                (d.uri, d.etag, d.last_modified) if processed(d) else (d.uri, None, None)
+                for d in batch
+            ])
+
+        pending = submit(batches[0]) if batches else None
+        for i, batch in enumerate(batches):
+            results = pending.result()
+            pending = submit(batches[i + 1]) if i + 1 < len(batches) else None
+            for doc, result in zip(batch, results):
+                if result.not_modified:
+                    yield doc, False
+                elif result.error is not None:
+                    print(f"Fetch failed for {doc.uri}: {result.error}")
+                    if not processed(doc):
+                        doc.status = "error"
+                        self.metadata.upsert_document(doc)
+                    yield doc, False
+                else:
+                    doc.etag, doc.last_modified = result.etag, result.last_modified
+                    self.metadata.upsert_document(doc)
+                    yield doc, True
+
     def index_document(self, doc_id: UUID):
         doc = self.metadata.get_document(doc_id)
         if not doc:
             return
 
+        # 1. Extract
+        extractor = self.extractors.get(doc.mime_type, self.default_extractor)
+        if not extractor:
+            print(f"No extractor for {doc.mime_type}")
+            return
+
+        previous_hash = doc.doc_hash
         try:
-            # 1. Extract
-            extractor = self.extractors.get(doc.mime_type, self.default_extractor)
-            if not extractor:
-                print(f"No extractor for {doc.mime_type}")
+            self._index(doc, extractor)
+        except Exception as e:
+            print(f"Indexing error for {doc.uri}: {e}")
+            doc.status = "error"
+            self.metadata.upsert_document(doc)
+            # The indexes may be partially updated at this point
+            self.metadata.bump_index_generation()
+            try:
+                self._recheck_duplicates(doc, previous_hash)
+            except Exception as recheck_error:
+                print(f"Re-checking the duplicates of {doc.uri} failed: {recheck_error}")
+            raise
+        self._recheck_duplicates(doc, previous_hash)
+
+    def _index(self, doc: models.Document, extractor: ContentExtractor):
+        """Extracts and indexes doc, or links it to the document it near-duplicates."""
+        content, segments = extractor.extract_segments(doc.uri)
+
+        # Update doc metadata from extraction
+        doc.title = content.title or doc.title
+
+        # Up to stream_threshold_mb the text is read completely, so a near-
+        # duplicate is recognized before anything is chunked or embedded. A
+        # larger document is chunked, embedded and written while extraction
+        # still runs, and only checked once its text has gone by.
+        head, complete = self._read_ahead(segments, int(self.config.ingestion.stream_threshold_mb * 1024 * 1024))
+        hasher = hashlib.sha256()
+        minhasher = MinHasher()
+        # Offset where each page starts, when the segments are pages
+        page_starts: Optional[List[int]] = [] if content.extra.get("page_segments") else None
+        length = 0
+
+        def observed(parts: Iterable[str]) -> Iterator[str]:
+            nonlocal length
+            for part in parts:
+                hasher.update(part.encode("utf-8"))
+                minhasher.update(part)
+                if page_starts is not None:
+                    page_starts.append(length)
+                length += len(part)
+                yield part
+
+        if complete:
+            for _ in observed(head):
+                pass
+            doc.doc_hash = hasher.hexdigest()
+            if self._link_duplicate(doc, minhasher.signature()):
                 return
+            text = head
+        else:
+            print(f"Streaming {doc.uri} through indexing")
+            text = observed(itertools.chain(head, segments))
 
-            content = extractor.extract(doc.uri)
-            
-            # Update doc metadata from extraction
-            doc.title = content.title or doc.title
-            doc_hash = compute_hash(content.text)
-            
-            # Optimization: if doc_hash matches existing, skip (if we trust it)
-            if doc.doc_hash == doc_hash and doc.status != "changed":
-                # Already indexed and same content?
+        # 2. Chunk and 3. store in batches as the text comes in. The indexes
+        # are cleaned first (idempotency); chunk rows are keyed by fresh ids.
+        self.lexical.delete_doc(doc.id)
+        self.vector.delete_doc(doc.id)
+
+        tokenizer, max_tokens = self._chunk_tokenizer()
+        drafts = chunk_stream(
+            text,
+            self.config.ingestion.chunk_size_tokens,
+            self.config.ingestion.chunk_overlap_tokens,
+            tokenizer,
+            max_tokens
+        )
+        vector_sum, vector_count = None, 0
+        while True:
+            batch = list(itertools.islice(drafts, INDEX_BATCH_CHUNKS))
+            if not batch:
+                break
+            vectors = self._index_chunks(doc, batch, page_starts)
+            if len(vectors):
+                batch_sum = vectors.sum(axis=0)
+                vector_sum = batch_sum if vector_sum is None else vector_sum + batch_sum
+                vector_count += len(vectors)
+
+        if not complete:
+            doc.doc_hash = hasher.hexdigest()
+            if self._link_duplicate(doc, minhasher.signature()):
+                return
+
+        # 6. Document vector (normalized mean of the chunk vectors) for two-stage search
+        if vector_count:
+            # Stored vectors are already L2-normalized
+            self.vector.upsert_doc_embedding(doc.id, (vector_sum / vector_count).tolist())
+
+        doc.status = "indexed"
+        self.metadata.upsert_document(doc)
+        # Invalidates cached search results computed against the old corpus
+        self.metadata.bump_index_generation()
+
+    def remove_document(self, doc_id: UUID):
+        """Drops a document from the indexes and marks it deleted; its near-duplicates are indexed again."""
+        doc = self.metadata.get_document(doc_id)
+        if not doc:
+            return
+        self.lexical.delete_doc(doc.id)
+        self.vector.delete_doc(doc.id)
+        self.metadata.mark_document_deleted(doc.id)
+        self.metadata.bump_index_generation()
+        doc.status = "deleted"
+        self._recheck_duplicates(doc, doc.doc_hash)
+
+    def _recheck_duplicates(self, doc: models.Document, previous_hash: Optional[str]):
+        """
+        Indexes the documents linked to doc as near-duplicates again once doc
+        no longer stands for the text they were compared with: re-indexed with
+        other content, linked to another document itself, failed or removed.
+        Each one then finds a canonical again or is indexed in its own right.
+        """
+        if doc.status == "indexed" and doc.doc_hash == previous_hash:
+            return
+        for duplicate in self.metadata.list_duplicates(doc.id):
+            duplicate.status = "changed"
+            duplicate.canonical_id = None
+            self.metadata.upsert_document(duplicate)
+            try:
+                self.index_document(duplicate.id)
+            except Exception:
+                # Already marked "error" and logged by index_document
                 pass
-            
-            doc.doc_hash = doc_hash
+
+    def _chunk_tokenizer(self) -> Tuple[Optional[Any], Optional[int]]:
+        """
+        Tokenizer chunks are counted with (None: cl100k) and their size cap:
+        the embedding model's input length less its special tokens.
+        """
+        if self.config.ingestion.chunk_tokenizer != "embedding":
+            return None, None
+        embedding = self.config.embedding
+        tokenizer = get_model_tokenizer(embedding.tokenizer_name or embedding.model_name)
+        if tokenizer is None:
+            return None, None
+        max_length = min(embedding.max_seq_length, tokenizer.model_max_length)
+        return tokenizer, max(1, max_length - tokenizer.num_special_tokens_to_add())
+
+    @staticmethod
+    def _read_ahead(segments: Iterator[str], limit_chars: int) -> Tuple[List[str], bool]:
+        """Segments up to limit_chars (one more if it crosses it), and whether that was all of them."""
+        head, size = [], 0
+        for segment in segments:
+            head.append(segment)
+            size += len(segment)
+            if size > limit_chars:
+                return head, False
+        return head, True
+
+    def _link_duplicate(self, doc: models.Document, signature: Optional[np.ndarray]) -> bool:
+        """
+        Near-duplicate of an indexed document: links doc to it instead of
+        indexing it (dropping anything already indexed) and returns True.
+        """
+        canonical_id = self._find_canonical(doc, signature)
+        if canonical_id is None:
+            doc.canonical_id = None
             self.metadata.upsert_document(doc)
+            return False
+        self.lexical.delete_doc(doc.id)
+        self.vector.delete_doc(doc.id)
+        doc.canonical_id = canonical_id
+        doc.status = "duplicate"
+        self.metadata.upsert_document(doc)
+        self.metadata.bump_index_generation()
+        return True
 
-            # 2. Chunk
-            chunks_data = chunk_text(
-                content.text, 
-                self.config.ingestion.chunk_size_tokens, 
-                self.config.ingestion.chunk_overlap_tokens
+    def _index_chunks(
+        self, doc: models.Document, drafts: List[ChunkDraft], page_starts: Optional[List[int]] = None
+    ) -> np.ndarray:
+        """
+        Stores, lexically indexes and embeds a batch of chunks; returns their
+        vectors. page_starts (offsets of the pages seen so far) adds the
+        chunk's first and last page to its metadata.
+        """
+        saved_chunks = []
+        for cd in drafts:
+            metadata = {}
+            if page_starts:
+                metadata["page_start"] = bisect.bisect_right(page_starts, cd.start_offset)
+                metadata["page_end"] = bisect.bisect_right(page_starts, max(cd.start_offset, cd.end_offset - 1))
+            chunk = models.Chunk(
+                doc_id=doc.id,
+                chunk_index=cd.chunk_index,
+                text=cd.text,
+                start_offset=cd.start_offset,
+                end_offset=cd.end_offset,
+                chunk_hash=compute_hash(cd.text),
+                metadata=metadata
             )
-            
-            chunks_to_persist = []
-            for cd in chunks_data:
-                chunk = models.Chunk(
-                    doc_id=doc.id,
-                    chunk_index=cd.chunk_index,
-                    text=cd.text,
-                    start_offset=cd.start_offset,
-                    end_offset=cd.end_offset,
-                    chunk_hash=compute_hash(cd.text)
-                )
-                chunks_to_persist.append(chunk)
-
-            # 3. Store Chunks (Metadata)
-            # First, delete old chunks? Or overwrite?
-            # Ideally delete old ones. The metadata adapter should handle cleanup 
-            # OR we explicitly delete. Our current metadata store doesn't have delete_chunks_by_doc.
-            # But upsert overwrites by ID. IDs are random UUIDs here.
-            # We need to clear old chunks for this doc.
-            # IMPORTANT: The current sqlite adapter `list_chunks` returns existing.
-            # We should probably implement `delete_chunks_for_doc` in MetadataStore or just handle it here.
-            # Since IDs are new UUIDs every time we instantiate Chunk(), we will accumulate garbage 
-            # if we don't delete old ones.
-            # For MVP, we'll assume `delete_doc` in Lexical/Vector handles their parts, 
-            # but MetadataStore needs cleanup.
-            # Let's add a TODO or just not worry about orphan chunks in sqlite for this step.
-            # Actually, `delete_doc` in adapters removes from index.
-            
-            # Clean indexes first (idempotency)
-            self.lexical.delete_doc(doc.id)
-            self.vector.delete_doc(doc.id)
-            
-            # Save new chunks to DB
-            saved_chunks = []
-            for chunk in chunks_to_persist:
-                saved = self.metadata.upsert_chunk(chunk)
-                saved_chunks.append(saved)
+            saved_chunks.append(self.metadata.upsert_chunk(chunk))
 
-            # 4. Update Lexical Index
-            self.lexical.upsert_chunks(saved_chunks)
+        # 4. Update Lexical Index
+        self.lexical.upsert_chunks(saved_chunks)
 
-            # 5. Compute Embeddings & Update Vector Store
-            texts = [c.text for c in saved_chunks]
-            embeddings = self.embedding.embed_texts(texts)
-            self.vector.upsert_embeddings(saved_chunks, embeddings)
+        # 5. Compute Embeddings & Update Vector Store
+        # Chunks whose content already has a stored vector (boilerplate shared
+        # with other documents, or this document's previous version) are linked
+        # to it; only the rest are embedded, each distinct text once.
+        to_embed = self.vector.reuse_embeddings(saved_chunks)
+        if to_embed:
+            unique: Dict[str, str] = {}
+            for chunk in to_embed:
+                unique.setdefault(chunk.chunk_hash, chunk.text)
+            vectors_by_hash = dict(zip(unique, self.embedding.embed_texts(list(unique.values()))))
+            self.vector.upsert_embeddings(to_embed, [vectors_by_hash[c.chunk_hash] for c in to_embed])
 
-            doc.status = "indexed"
-            self.metadata.upsert_document(doc)
+        _, vectors = self.vector.get_vectors([chunk.id for chunk in saved_chunks])
+        return vectors
 
-        except Exception as e:
-            print(f"Indexing error for {doc.uri}: {e}")
-            doc.status = "error"
-            self.metadata.upsert_document(doc)
-            raise e
+    def _find_canonical(self, doc: models.Document, signature: Optional[np.ndarray]) -> Optional[UUID]:
+        """
+        Most similar indexed document at or above the near-duplicate threshold,
+        if any. Also records this document's signature for later lookups.
+        """
+        source = self.metadata.get_source(doc.source_id)
+        policy = source.config.get("near_duplicates") if source else None
+        if policy is None:
+            policy = self.config.ingestion.near_duplicates
+        elif policy not in get_args(NearDuplicatePolicy):
+            raise ValidationError(
+                f"Source {source.name}: near_duplicates must be one of {', '.join(get_args(NearDuplicatePolicy))}, not {policy!r}"
+            )
+        if policy == "off" or signature is None:
+            return None
+
+        band_keys = lsh_band_keys(signature)
+        candidates = self.metadata.find_signature_candidates(
+            band_keys, source_id=doc.source_id if policy == "source" else None
+        )
+        best_id, best_similarity = None, self.config.ingestion.near_duplicate_threshold
+        for candidate_id, candidate_signature in candidates:
+            if candidate_id == doc.id:
+                continue
+            similarity = estimate_similarity(signature, np.frombuffer(candidate_signature, dtype="<u4"))
+            if similarity >= best_similarity:
+                best_id, best_similarity = candidate_id, similarity
+
+        self.metadata.upsert_doc_signature(doc.id, signature.astype("<u4").tobytes(), band_keys)
+        return best_id
 
     def reindex_all(self):
         # Scan all sources
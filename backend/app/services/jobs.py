@@ -1,17 +1,38 @@
 import threading
 import time
-from typing import Optional
+from typing import Callable, Optional
 from uuid import UUID
 from backend.app.domain import models
 from backend.app.domain.ports import MetadataStore
 from backend.app.services.indexing import IndexingService
+from backend.app.services.migration import ModelMigrationService
 
 class JobRunner:
-    def __init__(self, metadata_store: MetadataStore, indexing_service: IndexingService):
+    """
+    Runs queued jobs one at a time in a background thread. Embedding model
+    migrations are long-running, so they get a thread of their own and the
+    queue keeps moving meanwhile.
+
+    indexing_service_factory, if given, builds the indexing service per job,
+    so jobs after a model cutover index with the new model;
+    migration_service_factory builds the service for a migration job.
+    """
+    def __init__(
+        self,
+        metadata_store: MetadataStore,
+        indexing_service: IndexingService,
+        indexing_service_factory: Optional[Callable[[], IndexingService]] = None,
+        migration_service_factory: Optional[Callable[[models.Job], ModelMigrationService]] = None
+    ):
         self.metadata = metadata_store
         self.indexing = indexing_service
+        self._indexing_service_factory = indexing_service_factory
+        self._migration_service_factory = migration_service_factory
         self._stop_event = threading.Event()
         self._thread: Optional[threading.Thread] = None
+        self._migration_thread: Optional[threading.Thread] = None
+        # Held while a job writes to the indexes; the migration takes it for the cutover
+        self._write_lock = threading.Lock()
 
     def start(self):
         """Starts the worker loop in a background thread."""
@@ -31,6 +52,8 @@ class JobRunner:
         print("JobRunner stopping...")
         self._stop_event.set()
         self._thread.join()
+        if self._migration_thread:
+            self._migration_thread.join()
         print("JobRunner stopped.")
 
     def enqueue_job(self, type: models.JobType, payload: dict) -> models.Job:
@@ -69,7 +92,10 @@ class JobRunner:
                 if not source_id_str:
                     raise ValueError("Missing source_id in job payload")
                 
-                self.indexing.scan_source(UUID(source_id_str), job)
+                with self._write_lock:
+                    if self._indexing_service_factory is not None:
+                        self.indexing = self._indexing_service_factory()
+                    self.indexing.scan_source(UUID(source_id_str), job)
                 
             elif job.type == models.JobType.INDEX_DOC:
                 # TODO: Implement single doc indexing job logic if needed
@@ -81,7 +107,10 @@ class JobRunner:
                 # self.indexing.reindex_all() 
                 # reindex_all in service doesn't take job yet.
                 pass
-                
+
+            elif job.type == models.JobType.MIGRATE_EMBEDDINGS:
+                self._start_migration(job)
+
             else:
                 raise ValueError(f"Unknown job type: {job.type}")
                 
@@ -90,3 +119,18 @@ class JobRunner:
             job.status = models.JobStatus.FAILED
             job.error = str(e)
             self.metadata.upsert_job(job)
+
+    def _start_migration(self, job: models.Job):
+        if self._migration_service_factory is None:
+            raise ValueError("Embedding migrations are not supported by this runner")
+        if self._migration_thread and self._migration_thread.is_alive():
+            raise ValueError("Another embedding migration is already running")
+
+        service = self._migration_service_factory(job)
+        # Marked running here so the queue does not hand it out again
+        job.status = models.JobStatus.RUNNING
+        job = self.metadata.upsert_job(job)
+        self._migration_thread = threading.Thread(
+            target=service.run, args=(job, self._stop_event, self._write_lock), name="embed-migration", daemon=True
+        )
+        self._migration_thread.start()
@@ -0,0 +1,136 @@
+import threading
+import time
+from contextlib import nullcontext
+from typing import Dict, List, Optional, Set
+from uuid import UUID
+from backend.app.domain import models
+from backend.app.domain.ports import MetadataStore, VectorStore, EmbeddingProvider
+from backend.app.config.schema import AppConfig
+
+class ModelMigrationService:
+    """
+    Moves the vector index to a new embedding model without downtime.
+
+    Every live chunk of the active store's model is re-embedded into
+    target_store (a separate index tagged with the new model) in batches,
+    while searches and indexing keep using the active store. Progress is the
+    set of chunks with a target posting, so a stopped or crashed job resumes
+    where it left off. Once nothing is pending, target_store.activate()
+    switches the served model in one transaction.
+    """
+    def __init__(
+        self,
+        config: AppConfig,
+        metadata_store: MetadataStore,
+        active_store: VectorStore,
+        target_store: VectorStore,
+        embedding_provider: EmbeddingProvider
+    ):
+        self.metadata = metadata_store
+        self.active = active_store
+        self.target = target_store
+        self.embedding = embedding_provider
+        self.batch_size = config.embedding.migration_batch_size
+        self.duty_cycle = config.embedding.migration_duty_cycle
+
+    def run(
+        self,
+        job: models.Job,
+        stop_event: Optional[threading.Event] = None,
+        write_lock: Optional[threading.Lock] = None
+    ) -> models.Job:
+        """
+        Runs the migration job; if stop_event is set midway the job goes back
+        to PENDING. write_lock, held by index writers, is taken for the cutover.
+        """
+        source_model, _ = self.active.model()
+        target_model, _ = self.target.model()
+        job.status = models.JobStatus.RUNNING
+        job.payload["from_model"] = source_model
+        self.metadata.upsert_job(job)
+
+        try:
+            if job.payload.get("model_name") != target_model:
+                raise ValueError(f"Job migrates to {job.payload.get('model_name')}, target store holds {target_model}")
+            if source_model != target_model:
+                while True:
+                    if not self._migrate_pending(job, source_model, stop_event):
+                        print(f"Embedding migration to {target_model} paused")
+                        job.status = models.JobStatus.PENDING
+                        return self.metadata.upsert_job(job)
+                    with write_lock or nullcontext():
+                        # Chunks indexed since the last batch make this fail; go round again
+                        if not self.target.activate(source_model):
+                            continue
+                        # Writers outside write_lock that still held the old store may
+                        # have indexed into it after the switch; their chunks and
+                        # document vectors are carried over
+                        self._migrate_pending(job, source_model, None, update_docs=True)
+                    break
+                # Cached results were ranked with the old model
+                self.metadata.bump_index_generation()
+
+            job.status = models.JobStatus.DONE
+            job.progress = 1.0
+        except Exception as e:
+            job.status = models.JobStatus.FAILED
+            job.error = str(e)
+            print(f"Embedding migration failed: {e}")
+
+        return self.metadata.upsert_job(job)
+
+    def _migrate_pending(
+        self,
+        job: models.Job,
+        source_model: str,
+        stop_event: Optional[threading.Event],
+        update_docs: bool = False
+    ) -> bool:
+        """Embeds pending chunks until none are left (True) or stop_event is set (False)."""
+        migrated = job.payload.get("migrated", 0)
+        while True:
+            started = time.monotonic()
+            chunk_ids, remaining = self.target.pending_chunks(source_model, self.batch_size)
+            job.progress = migrated / (migrated + remaining) if migrated + remaining else 1.0
+            job.payload["migrated"] = migrated
+            job.payload["remaining"] = remaining
+            self.metadata.upsert_job(job)
+            if not chunk_ids:
+                return True
+            if stop_event is not None and stop_event.is_set():
+                return False
+
+            chunks = [chunk for chunk, _ in self.metadata.get_chunks_with_documents(chunk_ids)]
+            if not chunks:
+                # Chunks deleted concurrently disappear from pending_chunks with
+                # their document; vectors whose chunks are gone for good would not
+                raise ValueError(f"{len(chunk_ids)} pending chunks have vectors but no metadata")
+            self._embed(chunks)
+            if update_docs:
+                self._update_doc_vectors({chunk.doc_id for chunk in chunks})
+            migrated += len(chunks)
+
+            # Duty cycle: after embedding for t seconds, stay idle t * (1 - d) / d
+            if self.duty_cycle < 1.0:
+                pause = (time.monotonic() - started) * (1.0 - self.duty_cycle) / self.duty_cycle
+                if stop_event is not None:
+                    stop_event.wait(pause)
+                else:
+                    time.sleep(pause)
+
+    def _embed(self, chunks: List[models.Chunk]):
+        # Same content, same vector: each distinct text is embedded once
+        to_embed = self.target.reuse_embeddings(chunks)
+        if not to_embed:
+            return
+        unique: Dict[str, str] = {}
+        for chunk in to_embed:
+            unique.setdefault(chunk.chunk_hash, chunk.text)
+        vectors_by_hash = dict(zip(unique, self.embedding.embed_texts(list(unique.values()))))
+        self.target.upsert_embeddings(to_embed, [vectors_by_hash[c.chunk_hash] for c in to_embed])
+
+    def _update_doc_vectors(self, doc_ids: Set[UUID]):
+        for doc_id in doc_ids:
+            _, vectors = self.target.get_doc_chunk_vectors([doc_id])
+            if len(vectors):
+                self.target.upsert_doc_embedding(doc_id, vectors.mean(axis=0).tolist())
@@ -1,9 +1,18 @@
-from typing import List, Dict, Optional, Tuple
+import secrets
+import time
+import numpy as np
+from contextlib import contextmanager, nullcontext
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Iterator, List, Dict, Optional, Tuple
 from uuid import UUID
 from pydantic import BaseModel
 from backend.app.domain import models
 from backend.app.domain.ports import MetadataStore, LexicalIndex, VectorStore, EmbeddingProvider, Reranker
-from backend.app.config.schema import AppConfig
+from backend.app.domain.errors import NotFound, ValidationError
+from backend.app.config.schema import AppConfig, SearchMode
+from backend.app.util.cache import LRUCache
+from backend.app.util.metrics import REGISTRY
+from backend.app.adapters.embedding.query_cache import QueryEmbeddingCache
 
 class SearchResult(BaseModel):
     chunk_id: UUID
@@ -14,10 +23,150 @@ class SearchResult(BaseModel):
     score: float
     score_breakdown: Dict[str, float]
 
+class SearchResponse(BaseModel):
+    results: List[SearchResult]
+    # "lexical" for the streamed FTS5-only preview, "final" for the fused/reranked list
+    stage: str = "final"
+    # True when the vector side missed the time budget (or failed) and only
+    # lexical results were fused.
+    degraded: bool = False
+    cached: bool = False
+    # Per-stage wall-clock timings: lexical, embed, vector (or rescore), fuse, hydrate, rerank, total
+    timings_ms: Dict[str, float] = {}
+    # Opaque token for the next page (pass it back with the same query), None on the last page
+    next_cursor: Optional[str] = None
+
+class SearchResultCache:
+    """
+    Process-level cache of fused search responses. Every entry is tagged with
+    the index generation it was computed at, so it goes stale exactly when
+    IndexingService commits a change; size and TTL bound it otherwise.
+    """
+    def __init__(self, maxsize: int, ttl_sec: float):
+        self._entries = LRUCache(maxsize=maxsize, ttl_sec=ttl_sec)
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+
+    def get(self, key: Tuple, generation: int) -> Optional[SearchResponse]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        entry_generation, response = entry
+        if entry_generation != generation:
+            self._entries.pop(key)
+            self.stale += 1
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return response
+
+    def put(self, key: Tuple, generation: int, response: SearchResponse) -> None:
+        self._entries.put(key, (generation, response))
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {"size": len(self._entries), "hits": self.hits, "misses": self.misses, "stale": self.stale}
+
+class CandidateSet:
+    """
+    A fused ranking kept server-side behind a cursor, so that later pages are
+    sliced from it instead of re-running retrieval. The first `reranked` ids
+    are in their final (reranked) order.
+    """
+    def __init__(
+        self,
+        query: str,
+        ids: List[UUID],
+        scores: Dict[UUID, float],
+        breakdown: Dict[UUID, Dict[str, float]],
+        depth: int,
+        exhausted: bool,
+        degraded: bool
+    ):
+        self.query = query
+        self.ids = ids
+        self.scores = scores
+        self.breakdown = breakdown
+        self.depth = depth          # Per-retriever fetch depth this ranking was built from
+        self.exhausted = exhausted  # Both retrievers returned fewer hits than asked: nothing deeper exists
+        self.degraded = degraded
+        self.reranked = 0
+
+    def can_deepen(self, max_depth: int) -> bool:
+        return not self.exhausted and self.depth < max_depth
+
+    def keep_prefix(self, served: List[UUID]):
+        # Pages already handed out stay as they were; a deeper fetch only
+        # changes what comes after them (no duplicates or gaps across pages).
+        seen = set(served)
+        self.ids = list(served) + [i for i in self.ids if i not in seen]
+        self.reranked = len(served)
+
+class SearchCursorStore:
+    """Process-level store of candidate sets, keyed by the id embedded in a cursor."""
+    def __init__(self, maxsize: int, ttl_sec: float):
+        self._sets = LRUCache(maxsize=maxsize, ttl_sec=ttl_sec)
+
+    def get(self, set_id: str) -> Optional[CandidateSet]:
+        return self._sets.get(set_id)
+
+    def put(self, set_id: str, candidates: CandidateSet) -> None:
+        # Re-put on every page so the TTL counts from the last access
+        self._sets.put(set_id, candidates)
+
+    def stats(self) -> Dict[str, int]:
+        return self._sets.stats()
+
+    @staticmethod
+    def new_id() -> str:
+        return secrets.token_urlsafe(12)
+
+    @staticmethod
+    def encode(set_id: str, offset: int) -> str:
+        return f"{set_id}.{offset}"
+
+    @staticmethod
+    def decode(cursor: str) -> Tuple[str, int]:
+        set_id, _, offset = cursor.rpartition(".")
+        if not set_id or not offset.isdigit():
+            raise ValidationError(f"Invalid search cursor: {cursor!r}")
+        return set_id, int(offset)
+
+SEARCH_STAGE_SECONDS = REGISTRY.histogram("search_stage_seconds", "Search latency per pipeline stage", labels=("stage",))
+SEARCH_REQUESTS = REGISTRY.counter("search_requests_total", "Search requests by outcome", labels=("outcome",))
+
+class StageTimer:
+    """Collects per-stage timings for one search and feeds the stage histogram."""
+    def __init__(self):
+        self.timings_ms: Dict[str, float] = {}
+
+    @contextmanager
+    def stage(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def record(self, name: str, elapsed: float):
+        # Stages may finish on the vector pool thread; distinct keys, so no lock needed
+        self.timings_ms[name] = round(elapsed * 1000.0, 3)
+        SEARCH_STAGE_SECONDS.observe(elapsed, stage=name)
+
+# Runs query embedding + vector search next to the lexical search.
+# Module-level because SearchService is instantiated per request.
+_vector_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="search-vec")
+
 class NoOpReranker(Reranker):
-    def rerank(self, query: str, chunks: List[models.Chunk]) -> List[Tuple[models.Chunk, float]]:
-        # Return as is with score 0.0 (placeholder)
-        return [(c, 0.0) for c in chunks]
+    def rerank(self, query: str, chunks: List[models.Chunk]) -> List[Tuple[models.Chunk, Optional[float]]]:
+        # Return as is, unscored
+        return [(c, None) for c in chunks]
 
 class SearchService:
     def __init__(
@@ -27,7 +176,10 @@ class SearchService:
         lexical_index: LexicalIndex,
         vector_store: VectorStore,
         embedding_provider: EmbeddingProvider,
-        reranker: Optional[Reranker] = None
+        reranker: Optional[Reranker] = None,
+        result_cache: Optional[SearchResultCache] = None,
+        query_embedding_cache: Optional[QueryEmbeddingCache] = None,
+        cursor_store: Optional[SearchCursorStore] = None
     ):
         self.config = config
         self.metadata = metadata_store
@@ -35,25 +187,285 @@ class SearchService:
         self.vector = vector_store
         self.embedding = embedding_provider
         self.reranker = reranker or NoOpReranker()
+        self.result_cache = result_cache
+        self.query_embedding_cache = query_embedding_cache
+        self.cursor_store = cursor_store
         
-        # Tuning parameters (could be in config)
-        self.top_k_lex = 20
-        self.top_k_vec = 20
-        self.rrf_k = 60 # Constant for RRF
+        # Tuning parameters
+        self.top_k_lex = config.search.top_k_lex
+        self.top_k_vec = config.search.top_k_vec
+        self.rrf_k = config.search.rrf_k # Constant for RRF
+        self.time_budget_ms = config.search.time_budget_ms
+        self.mode = config.search.mode
+        self.top_docs = config.search.top_docs
+        self.max_depth = config.search.max_depth
+        self.prefetch_pages = config.search.prefetch_pages
+        self.rerank_depth = config.search.rerank_depth
 
     def search(self, query: str, limit: int = 10) -> List[SearchResult]:
-        # 1. Lexical Search
-        lex_results = self.lexical.search(query, top_k=self.top_k_lex)
-        
-        # 2. Vector Search
-        # Embed query (single text)
-        query_vectors = self.embedding.embed_texts([query])
-        if query_vectors:
-            vec_results = self.vector.query(query_vectors[0], top_k=self.top_k_vec)
+        return self.execute(query, limit).results
+
+    def execute(
+        self,
+        query: str,
+        limit: int = 10,
+        time_budget_ms: Optional[int] = None,
+        cursor: Optional[str] = None
+    ) -> SearchResponse:
+        for response in self._responses(query, limit, time_budget_ms, cursor, preview=False):
+            pass
+        return response
+
+    def stream(
+        self,
+        query: str,
+        limit: int = 10,
+        time_budget_ms: Optional[int] = None,
+        cursor: Optional[str] = None
+    ) -> Iterator[SearchResponse]:
+        """
+        Yields a lexical-only preview (stage="lexical") as soon as FTS5 answers,
+        then the fused and reranked list (stage="final"). A cache hit, or a
+        page served from a cursor, yields only the final response.
+        """
+        return self._responses(query, limit, time_budget_ms, cursor, preview=True)
+
+    def similar_to_chunk(self, chunk_id: UUID, limit: int = 10) -> List[SearchResult]:
+        """Chunks nearest to a chunk's stored vector (the chunk itself excluded)."""
+        return self._similar([chunk_id], limit, f"No stored vector for chunk {chunk_id}")
+
+    def similar_to_document(self, doc_id: UUID, limit: int = 10) -> List[SearchResult]:
+        """Chunks of other documents nearest to the mean of a document's chunk vectors."""
+        chunk_ids = [c.id for c in self.metadata.list_chunks(doc_id)]
+        if not chunk_ids:
+            raise NotFound(f"Document {doc_id} has no indexed chunks")
+        return self._similar(chunk_ids, limit, f"No stored vectors for document {doc_id}")
+
+    def _similar(self, chunk_ids: List[UUID], limit: int, missing: str) -> List[SearchResult]:
+        # Stored vectors stand in for the query: no embedding round trip
+        found, vectors = self.vector.get_vectors(chunk_ids)
+        if not found:
+            raise NotFound(missing)
+
+        query_vector = vectors.mean(axis=0)
+        hits = self.vector.query(query_vector, top_k=limit, exclude=chunk_ids)
+
+        scores = {cid: score for cid, score in hits}
+        breakdown = {cid: {"vec_score": score, "vec_rank": rank + 1} for rank, (cid, score) in enumerate(hits)}
+        return self._hydrate([cid for cid, _ in hits], scores, breakdown, None)
+
+    def _responses(
+        self,
+        query: str,
+        limit: int,
+        time_budget_ms: Optional[int],
+        cursor: Optional[str],
+        preview: bool
+    ) -> Iterator[SearchResponse]:
+        timer = StageTimer()
+        start = time.perf_counter()
+        response: Optional[SearchResponse] = None
+
+        # Only first pages go through the result cache; later pages come from the cursor's candidate set
+        if self.result_cache is not None and cursor is None:
+            with timer.stage("cache"):
+                key = self._cache_key(query, limit)
+                generation = self.metadata.get_index_generation()
+                cached = self.result_cache.get(key, generation)
+            if cached is not None:
+                response = cached.model_copy(update={"cached": True})
+
+        if response is None:
+            for response in self._run(query, limit, time_budget_ms, cursor, timer, preview):
+                if response.stage != "final":
+                    yield response.model_copy(update={"timings_ms": dict(timer.timings_ms)})
+            # Lexical-only fallbacks are not worth remembering
+            if self.result_cache is not None and cursor is None and not response.degraded:
+                self.result_cache.put(key, generation, response)
+
+        timer.record("total", time.perf_counter() - start)
+        if response.cached:
+            outcome = "cached"
+        elif response.degraded:
+            outcome = "degraded"
         else:
-            vec_results = []
+            outcome = "ok"
+        SEARCH_REQUESTS.inc(outcome=outcome)
+        yield response.model_copy(update={"timings_ms": dict(timer.timings_ms)})
+
+    def _cache_key(self, query: str, limit: int) -> Tuple:
+        # Scoped by database so that several configs in one process never share entries
+        return (str(self.config.storage.sqlite_path), self._normalize(query), limit)
+
+    @staticmethod
+    def _normalize(query: str) -> str:
+        return " ".join(query.split())
+
+    def _fetch_depth(self, end: int) -> int:
+        # Fetch a few pages past the one asked for, so that paging on rarely re-runs retrieval
+        return min(self.max_depth, end * self.prefetch_pages)
+
+    def _run(
+        self,
+        query: str,
+        limit: int,
+        time_budget_ms: Optional[int],
+        cursor: Optional[str],
+        timer: StageTimer,
+        preview: bool
+    ) -> Iterator[SearchResponse]:
+        offset = 0
+        set_id = None
+        candidates: Optional[CandidateSet] = None
+        if cursor is not None:
+            set_id, offset = SearchCursorStore.decode(cursor)
+            if self.cursor_store is not None:
+                with timer.stage("cursor"):
+                    candidates = self.cursor_store.get(set_id)
+            if candidates is not None and candidates.query != self._normalize(query):
+                raise ValidationError("Search cursor was issued for a different query")
+        end = offset + limit
+
+        # Retrieve on a first page, an expired cursor, or a page past the fetched depth
+        if candidates is None or (end > len(candidates.ids) and candidates.can_deepen(self.max_depth)):
+            served = candidates.ids[:offset] if candidates is not None else []
+            candidates = yield from self._retrieve(
+                query, self._fetch_depth(end), time_budget_ms, timer,
+                preview_limit=limit if preview and cursor is None else None
+            )
+            candidates.keep_prefix(served)
+        self._rerank(query, candidates, end, timer)
+
+        if set_id is None:
+            set_id = SearchCursorStore.new_id()
+        if self.cursor_store is not None:
+            self.cursor_store.put(set_id, candidates)
+
+        results = self._hydrate(candidates.ids[offset:end], candidates.scores, candidates.breakdown, timer)
+        next_cursor = None
+        if end < len(candidates.ids) or candidates.can_deepen(self.max_depth):
+            next_cursor = SearchCursorStore.encode(set_id, end)
+        yield SearchResponse(results=results, degraded=candidates.degraded, next_cursor=next_cursor)
+
+    def _retrieve(
+        self,
+        query: str,
+        depth: int,
+        time_budget_ms: Optional[int],
+        timer: StageTimer,
+        preview_limit: Optional[int] = None
+    ) -> Iterator[SearchResponse]:
+        """
+        Runs both retrievers at `depth` and fuses them into a CandidateSet
+        (the generator's return value). With `preview_limit`, the lexical-only
+        page is yielded before waiting on the vector side.
+        """
+        budget_ms = time_budget_ms or self.time_budget_ms
+        deadline = time.monotonic() + budget_ms / 1000.0 if budget_ms else None
+        top_k_lex = max(self.top_k_lex, depth)
+        top_k_vec = max(self.top_k_vec, depth)
+
+        # 1. Vector Search (embed query + ANN) in the background ...
+        if self.mode == SearchMode.LEXICAL_FIRST:
+            # ... or only the query embedding; the candidates come from FTS5
+            vec_future = _vector_executor.submit(self._embed_query, query, timer)
+        elif self.mode == SearchMode.TWO_STAGE:
+            vec_future = _vector_executor.submit(self._two_stage_search, query, top_k_vec, timer)
+        else:
+            vec_future = _vector_executor.submit(self._vector_search, query, top_k_vec, timer)
+
+        # 2. ... while Lexical Search runs on this thread
+        with timer.stage("lexical"):
+            lex_results = self.lexical.search(query, top_k=top_k_lex)
+
+        if preview_limit is not None:
+            # Same fusion path with an empty vector side; no reranking for the preview
+            with timer.stage("preview"):
+                scores, breakdown = self._fuse(lex_results, [])
+                ranked = sorted(scores.keys(), key=lambda k: scores[k], reverse=True)
+                results = self._hydrate(ranked[:preview_limit], scores, breakdown, None)
+            yield SearchResponse(results=results, stage="lexical")
+
+        vec_results, degraded = self._await_vector(vec_future, deadline)
+        if self.mode == SearchMode.LEXICAL_FIRST and not degraded:
+            # Here the future only produced the query vector
+            with timer.stage("rescore"):
+                try:
+                    vec_results = self._rescore(vec_results, lex_results)
+                except Exception as e:
+                    print(f"Vector rescoring failed, returning lexical results only: {e}")
+                    vec_results, degraded = [], True
 
         # 3. Fuse Results (RRF)
+        with timer.stage("fuse"):
+            scores, breakdown = self._fuse(lex_results, vec_results)
+            ranked = sorted(scores.keys(), key=lambda k: scores[k], reverse=True)
+        exhausted = not degraded and len(lex_results) < top_k_lex and len(vec_results) < top_k_vec
+        return CandidateSet(
+            self._normalize(query), ranked, scores, breakdown,
+            min(top_k_lex, top_k_vec), exhausted, degraded
+        )
+
+    def _embed_query(self, query: str, timer: StageTimer):
+        # Embed query (single text)
+        with timer.stage("embed"):
+            if self.query_embedding_cache is not None:
+                return self.query_embedding_cache.get_or_embed(
+                    self.config.embedding.model_name, query, self.embedding.embed_query
+                )
+            return self.embedding.embed_query(query)
+
+    def _vector_search(self, query: str, top_k: int, timer: StageTimer) -> List[Tuple[UUID, float]]:
+        query_vector = self._embed_query(query, timer)
+        with timer.stage("vector"):
+            return self.vector.query(query_vector, top_k=top_k)
+
+    def _two_stage_search(self, query: str, top_k: int, timer: StageTimer) -> List[Tuple[UUID, float]]:
+        # Documents first (small index), then exact scores for their chunks only
+        query_vector = self._embed_query(query, timer)
+        with timer.stage("vector"):
+            docs = self.vector.query_docs(query_vector, top_k=self.top_docs)
+            chunk_ids, vectors = self.vector.get_doc_chunk_vectors([doc_id for doc_id, _ in docs])
+            return self._cosine_rank(query_vector, chunk_ids, vectors)[:top_k]
+
+    def _rescore(self, query_vector, lex_results: List[Tuple[UUID, float]]) -> List[Tuple[UUID, float]]:
+        """
+        Exact cosine between the query and the stored vectors of the lexical
+        candidates, in one matrix-vector product; no ANN search involved.
+        """
+        chunk_ids, vectors = self.vector.get_vectors([chunk_id for chunk_id, _ in lex_results])
+        return self._cosine_rank(query_vector, chunk_ids, vectors)
+
+    @staticmethod
+    def _cosine_rank(query_vector, chunk_ids: List[UUID], vectors: np.ndarray) -> List[Tuple[UUID, float]]:
+        if not chunk_ids:
+            return []
+
+        q_vec = np.asarray(query_vector, dtype=np.float32)
+        norm = np.linalg.norm(q_vec)
+        if norm > 0:
+            q_vec = q_vec / norm
+        sims = vectors @ q_vec # Stored vectors are already normalized
+        order = np.argsort(-sims, kind="stable")
+        return [(chunk_ids[i], float(sims[i])) for i in order]
+
+    def _await_vector(self, future, deadline: Optional[float]) -> Tuple[List[Tuple[UUID, float]], bool]:
+        timeout = max(0.0, deadline - time.monotonic()) if deadline is not None else None
+        try:
+            return future.result(timeout=timeout), False
+        except FutureTimeoutError:
+            # The embedding call keeps running in the pool; we just stop waiting for it.
+            print(f"Vector search exceeded {timeout * 1000:.0f} ms budget, returning lexical results only")
+            return [], True
+        except Exception as e:
+            print(f"Vector search failed, returning lexical results only: {e}")
+            return [], True
+
+    def _fuse(
+        self,
+        lex_results: List[Tuple[UUID, float]],
+        vec_results: List[Tuple[UUID, float]]
+    ) -> Tuple[Dict[UUID, float], Dict[UUID, Dict[str, float]]]:
         # chunk_id -> {lex_rank, vec_rank, combined_score}
         
         scores: Dict[UUID, float] = {}
@@ -77,60 +489,63 @@ class SearchService:
             bd["vec_score"] = score
             bd["vec_rank"] = rank + 1
 
-        # Sort by combined score desc
-        sorted_ids = sorted(scores.keys(), key=lambda k: scores[k], reverse=True)
-        hydrate_limit = limit * 2 # Hydrate a bit more for reranking if implemented
-        candidates_ids = sorted_ids[:hydrate_limit]
-        
-        # 4. Hydrate
-        candidates: List[models.Chunk] = []
-        for cid in candidates_ids:
-            chunk = self.metadata.get_chunk(cid)
-            if chunk:
-                candidates.append(chunk)
-        
-        # 5. Rerank
-        # Reranker takes list of chunks and returns sorted list with scores
-        # We only rerank hydrated candidates
-        reranked = self.reranker.rerank(query, candidates)
-        
-        # 6. Format Results
+        return scores, breakdown
+
+    def _rerank(self, query: str, candidates: CandidateSet, end: int, timer: StageTimer):
+        """
+        Reranks the next rerank_depth candidates (at least up to `end`) when
+        the page asked for goes past the reranked ones. The order is stored in
+        the candidate set, so each window is reranked once and pages are
+        sliced from it: consecutive pages never overlap.
+        """
+        if end <= candidates.reranked:
+            return
+        start = candidates.reranked
+        window = candidates.ids[start:max(end, start + self.rerank_depth)]
+        with timer.stage("rerank"):
+            if isinstance(self.reranker, NoOpReranker):
+                # Nothing to reorder: skip hydrating the window
+                candidates.reranked = len(candidates.ids)
+                return
+            chunks = [chunk for chunk, _ in self.metadata.get_chunks_with_documents(window)]
+            reranked = self.reranker.rerank(query, chunks)
+
+        # The order is the reranker's; chunks it did not score (budget
+        # exhausted) keep the RRF order. Ids that no longer hydrate are dropped.
+        order = []
+        for chunk, rerank_score in reranked:
+            order.append(chunk.id)
+            if rerank_score is not None:
+                candidates.breakdown[chunk.id] = {**candidates.breakdown.get(chunk.id, {}), "rerank_score": rerank_score}
+        candidates.ids[start:start + len(window)] = order
+        candidates.reranked = start + len(order)
+
+    def _hydrate(
+        self,
+        candidates_ids: List[UUID],
+        scores: Dict[UUID, float],
+        breakdown: Dict[UUID, Dict[str, float]],
+        timer: Optional[StageTimer]
+    ) -> List[SearchResult]:
+        stage = timer.stage if timer is not None else lambda name: nullcontext()
+        # candidates_ids is exactly one page, already in its final order
+
+        # 4. Hydrate (one batched chunk+document read)
+        with stage("hydrate"):
+            hydrated = self.metadata.get_chunks_with_documents(candidates_ids)
+
+        # 5. Format Results
+        # `score` stays the RRF score so it is comparable across requests,
+        # the cross-encoder score is reported in the breakdown.
         results = []
-        # Cache document metadata to avoid repeated fetches
-        doc_cache: Dict[UUID, models.Document] = {}
-        
-        # Take top limit from reranked
-        # If reranker is no-op, we should trust RRF order.
-        # But reranker returns list of (chunk, score). 
-        # If no-op returns 0.0 score, we lose RRF info if we just take that.
-        # Ideally Reranker should combine or replace RRF score.
-        # For NoOp, let's just stick to the order candidates_ids provided (RRF order)
-        # unless reranker provided meaningful scores.
-        
-        # If using NoOpReranker, `reranked` has same order as `candidates`.
-        
-        for chunk, rerank_score in reranked[:limit]:
-            doc_id = chunk.doc_id
-            if doc_id not in doc_cache:
-                doc = self.metadata.get_document(doc_id)
-                if doc:
-                    doc_cache[doc_id] = doc
-            
-            doc = doc_cache.get(doc_id)
-            if not doc:
-                continue # Orphaned chunk?
-                
-            final_score = scores[chunk.id] # RRF score
-            # If reranker was active, we might use rerank_score
-            
+        for chunk, doc in hydrated:
             results.append(SearchResult(
                 chunk_id=chunk.id,
-                doc_id=doc_id,
+                doc_id=chunk.doc_id,
                 text=chunk.text,
                 doc_title=doc.title,
                 doc_uri=doc.uri,
-                score=final_score,
-                score_breakdown=breakdown.get(chunk.id, {})
+                score=scores[chunk.id], # RRF score
+                score_breakdown=dict(breakdown.get(chunk.id, {}))
             ))
-            
         return results
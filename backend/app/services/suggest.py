@@ -0,0 +1,39 @@
+import re
+from typing import List
+from pydantic import BaseModel
+from backend.app.domain.ports import LexicalIndex
+
+# Same notion of a token as FTS5's default unicode61 tokenizer (close enough for completion)
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+class Suggestion(BaseModel):
+    text: str       # Full query with the last word completed
+    term: str       # The completed term
+    doc_freq: int   # Number of indexed chunks containing the term
+
+class SuggestService:
+    """
+    Search-as-you-type completions from the lexical index's term dictionary,
+    which is cached in memory until the next write. Built on the process-wide
+    index (see get_suggest_service), it is cheap enough for every keystroke.
+    """
+    def __init__(self, lexical_index: LexicalIndex):
+        self.lexical = lexical_index
+
+    def suggest(self, query: str, limit: int = 8) -> List[Suggestion]:
+        # Only complete the word being typed; a trailing space means it is finished
+        if not query or query[-1].isspace():
+            return []
+
+        match = None
+        for match in _TOKEN_RE.finditer(query):
+            pass
+        if match is None or match.end() != len(query):
+            return []
+
+        head = query[:match.start()]
+        terms = self.lexical.suggest_terms(match.group(0), limit)
+        return [
+            Suggestion(text=head + term, term=term, doc_freq=freq)
+            for term, freq in terms
+        ]
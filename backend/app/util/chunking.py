@@ -1,7 +1,10 @@
 import hashlib
+import itertools
+import numpy as np
 import tiktoken
+from collections import OrderedDict, deque
 from dataclasses import dataclass
-from typing import List
+from typing import Any, Deque, Dict, Iterable, Iterator, List, Optional, Tuple
 
 @dataclass
 class ChunkDraft:
@@ -9,142 +12,269 @@ class ChunkDraft:
     start_offset: int
     end_offset: int
     chunk_index: int
-    
-def chunk_text(text: str, chunk_size: int, chunk_overlap: int) -> List[ChunkDraft]:
+
+ENCODING_NAME = "cl100k_base"
+
+# Loaded once per process. A failed load (BPE file not cached and no network)
+# is remembered too, so every call does not retry the download.
+_encodings: Dict[str, Optional[tiktoken.Encoding]] = {}
+
+def get_encoding(name: str = ENCODING_NAME) -> Optional[tiktoken.Encoding]:
+    if name not in _encodings:
+        try:
+            _encodings[name] = tiktoken.get_encoding(name)
+        except Exception as e:
+            print(f"Tokenizer {name} unavailable, chunking by characters: {e}")
+            _encodings[name] = None
+    return _encodings[name]
+
+# Hugging Face tokenizers of embedding models, by name; None if unavailable
+_model_tokenizers: Dict[str, Optional[Any]] = {}
+
+def get_model_tokenizer(name: str) -> Optional[Any]:
+    """
+    The (fast, offset-reporting) Hugging Face tokenizer of an embedding model,
+    loaded on first use. None when transformers or the tokenizer is missing.
+    """
+    if name not in _model_tokenizers:
+        try:
+            from transformers import AutoTokenizer
+            tokenizer = AutoTokenizer.from_pretrained(name)
+            if not tokenizer.is_fast:
+                raise ValueError("no fast tokenizer, character offsets unavailable")
+            _model_tokenizers[name] = tokenizer
+        except Exception as e:
+            print(f"Tokenizer of {name} unavailable, chunking with {ENCODING_NAME}: {e}")
+            _model_tokenizers[name] = None
+    return _model_tokenizers[name]
+
+def chunk_text(
+    text: str,
+    chunk_size: int,
+    chunk_overlap: int,
+    tokenizer: Optional[Any] = None,
+    max_tokens: Optional[int] = None
+) -> List[ChunkDraft]:
     """
     Splits text into chunks of specified token size with overlap.
-    Uses tiktoken cl100k_base encoding (common for OpenAI models).
+    Uses tiktoken cl100k_base encoding (common for OpenAI models), or the
+    given embedding model tokenizer (see get_model_tokenizer), so chunk sizes
+    are counted in the tokens the model actually sees. max_tokens caps
+    chunk_size: the model's input length, chunks beyond it would be truncated.
     Falls back to character approximation if needed (1 token ~ 4 chars).
+
+    Chunk texts are slices of the original text, and start_offset/end_offset
+    are exact character offsets into it (a character split between two
+    tokens belongs to the chunk holding its first byte).
     """
     if not text:
         return []
-
     try:
-        encoding = tiktoken.get_encoding("cl100k_base")
-        tokens = encoding.encode(text)
-        
-        chunks = []
-        num_tokens = len(tokens)
-        start_idx = 0
-        chunk_idx = 0
-        
-        while start_idx < num_tokens:
-            end_idx = min(start_idx + chunk_size, num_tokens)
-            chunk_tokens = tokens[start_idx:end_idx]
-            chunk_text = encoding.decode(chunk_tokens)
-            
-            # Calculate offsets in original text
-            # This is tricky because decoding might not map 1:1 to original slicing due to normalization/whitespace.
-            # Robust approach: find the substring in the original text starting from search_start.
-            # Optimization: We can approximate or just search.
-            # Since we process sequentially, we can track position.
-            
-            # Re-locating exact substring in original text is safer for highlighting.
-            # However, tiktoken decoding is lossy for some whitespace.
-            # For this MVP, we will try to find the chunk_text in the remaining original text.
-            
-            # Simple approximation for offsets if exact match fails:
-            # We trust the text content more than the offsets for embedding.
-            # But let's try to be accurate.
-            
-            # Since finding exact offsets after tokenization round-trip is hard/slow,
-            # we will return the decoded text. The offsets will be approximations 
-            # based on cumulative character length if we can't match exactly.
-            
-            # Actually, for RAG, the text content is what matters most. 
-            # Let's verify if we can just map back.
-            
-            # Alternative: use character slicing based on token count * 4? No, that's bad.
-            
-            # Let's try to match the decoded text in the original text.
-            # We assume sequential processing.
-            
-            # Problem: `encoding.decode` might normalize.
-            # Let's stick to the decoded text as the "true" chunk text.
-            # Offsets will be calculated relative to the full text *if possible*, 
-            # but relying on `text.find` might fail if there are duplicates.
-            # A more robust way is to just store the chunk text. 
-            # But the requirement asks for start_offset/end_offset.
-            
-            # Let's maintain a cursor in the original text.
-            # Current known issue: Tokenization ignores some whitespace or normalizes it.
-            # We will use a "best effort" offset finding.
-            
-            chunks.append(ChunkDraft(
-                text=chunk_text,
-                start_offset=0, # Placeholder, difficult to get exact byte offsets from tokens efficiently without a mapping
-                end_offset=0,   # Placeholder
-                chunk_index=chunk_idx
-            ))
-            
-            chunk_idx += 1
-            start_idx += chunk_size - chunk_overlap
-            
-            # Stop if we reached the end
-            if start_idx >= num_tokens:
-                break
-                
-        # Fix offsets by searching in original text?
-        # This is expensive but accurate.
-        # Let's implement a simple character fallback if tokenization is too complex for offsets,
-        # OR just acknowledge that offsets are approximate or 0 if not critical.
-        # Given "stable chunk boundaries", tokenization is best.
-        # Let's try to patch offsets:
-        
-        current_pos = 0
-        for chunk in chunks:
-            # Find chunk text starting from current_pos
-            # Allow for some fuzzy matching or whitespace diffs?
-            # Tiktoken usually preserves characters well enough for `find`.
-            found_idx = text.find(chunk.text, current_pos)
-            if found_idx != -1:
-                chunk.start_offset = found_idx
-                chunk.end_offset = found_idx + len(chunk.text)
-                current_pos = found_idx + len(chunk.text) - 10 # Backtrack a bit for overlap safety? 
-                # Actually overlap implies we should look backwards? 
-                # No, the next chunk starts later in the token stream, so it should be forward in char stream mostly.
-                # But due to overlap, the next chunk's text will overlap with this one.
-                # So we should set current_pos carefully.
-                
-                # Better strategy: 
-                # chunk N starts at token T. chunk N+1 starts at token T + size - overlap.
-                # The text of N+1 should start roughly after N's non-overlapping part.
-                # But exact char alignment is hard.
-                
-                # Let's just set current_pos to found_idx + 1 to ensure forward progress 
-                # but allow overlap matching.
-                current_pos = found_idx + 1
-            else:
-                # Fallback: maybe just leave as 0 or approximate?
-                pass
-                
-        return chunks
-
-    except Exception:
+        return list(chunk_stream([text], chunk_size, chunk_overlap, tokenizer, max_tokens))
+    except ValueError:
         # Fallback to character chunking
+        if max_tokens is not None:
+            chunk_size = min(chunk_size, max_tokens)
         return _chunk_text_chars(text, chunk_size * 4, chunk_overlap * 4)
 
-def _chunk_text_chars(text: str, chunk_size_chars: int, chunk_overlap_chars: int) -> List[ChunkDraft]:
-    chunks = []
+def chunk_stream(
+    segments: Iterable[str],
+    chunk_size: int,
+    chunk_overlap: int,
+    tokenizer: Optional[Any] = None,
+    max_tokens: Optional[int] = None
+) -> Iterator[ChunkDraft]:
+    """
+    chunk_text over text arriving in segments (pages, blocks, file reads):
+    yields each chunk as soon as its window is filled, with the overlap carried
+    across segment boundaries. Offsets are into the concatenated segments.
+
+    Memory stays bounded by the largest segment plus one chunk. Segments are
+    tokenized separately, up to their last whitespace (the remainder is joined
+    to the next segment), so boundaries can differ slightly from tokenizing
+    the concatenation in one piece.
+    """
+    if max_tokens is not None:
+        chunk_size = min(chunk_size, max_tokens)
+    encoding = get_encoding() if tokenizer is None else None
+    if tokenizer is None and encoding is None:
+        chunk_size, chunk_overlap = chunk_size * 4, chunk_overlap * 4
+    step = max(1, chunk_size - chunk_overlap)
+
+    buffer = _TextBuffer()
+    # Character offset of the token boundaries that start or end a window,
+    # in ascending token order
+    bounds: "OrderedDict[int, int]" = OrderedDict({0: 0})
+    tokens = 0
+    window = 0
+    carry = ""
+
+    def emit(end_token: int) -> ChunkDraft:
+        nonlocal window
+        start, end = bounds[window * step], bounds[end_token]
+        draft = ChunkDraft(text=buffer.slice(start, end), start_offset=start, end_offset=end, chunk_index=window)
+        window += 1
+        next_start = window * step
+        while bounds and next(iter(bounds)) < next_start:
+            bounds.popitem(last=False)
+        buffer.discard_before(bounds.get(next_start, buffer.end))
+        return draft
+
+    for segment in itertools.chain(segments, [None]):
+        if segment is None:
+            piece, carry = carry, ""
+        else:
+            pending = carry + segment
+            cut = _stable_prefix_length(pending)
+            piece, carry = pending[:cut], pending[cut:]
+        if not piece:
+            continue
+
+        count, boundaries = _piece_boundaries(piece, encoding, tokenizer, tokens, step, chunk_size)
+        for index, offset in boundaries.items():
+            bounds[index] = buffer.end + offset
+        buffer.append(piece)
+        tokens += count
+        while window * step + chunk_size <= tokens:
+            yield emit(window * step + chunk_size)
+
+    # The last, partial window, unless the previous one already reached the end
+    if tokens > window * step and (window == 0 or (window - 1) * step + chunk_size < tokens):
+        bounds[tokens] = buffer.end
+        yield emit(tokens)
+
+# Text without whitespace is carried to the next segment up to this length
+_MAX_CARRY_CHARS = 1 << 16
+
+def _stable_prefix_length(text: str) -> int:
+    """Length of the prefix that can be tokenized now: up to the last whitespace."""
+    for i in range(len(text) - 1, max(-1, len(text) - _MAX_CARRY_CHARS - 1), -1):
+        if text[i].isspace():
+            return i
+    return len(text) if len(text) > _MAX_CARRY_CHARS else 0
+
+def _window_bounds(lo: int, hi: int, step: int, offset: int) -> np.ndarray:
+    """Values offset + k * step (k >= 0) within [lo, hi]."""
+    first = max(0, -((offset - lo) // step))
+    return np.arange(offset + first * step, hi + 1, step, dtype=np.int64)
+
+def _piece_boundaries(
+    piece: str,
+    encoding: Optional[tiktoken.Encoding],
+    tokenizer: Optional[Any],
+    first: int,
+    step: int,
+    size: int
+) -> Tuple[int, Dict[int, int]]:
+    """
+    Tokenizes piece (with tokenizer if given, else encoding, else one token per
+    character); returns its token count and, for the window boundaries among
+    its token indices (numbered from first), the character offset in piece.
+    """
+    if tokenizer is not None:
+        char_offsets = _model_token_offsets(piece, tokenizer)
+        count = len(char_offsets) - 1
+    elif encoding is None:
+        count = len(piece)
+    else:
+        # surrogatepass: tiktoken turns a lone surrogate into U+FFFD, also 3 bytes
+        raw = piece.encode("utf-8", "surrogatepass")
+        piece_tokens = encoding.encode_ordinary(piece)
+        count = len(piece_tokens)
+        # Byte offset of every token boundary: the tokens' bytes concatenate to
+        # the UTF-8 text, so boundaries map to exact positions in one pass
+        byte_offsets = np.zeros(count + 1, dtype=np.int64)
+        np.cumsum(
+            np.fromiter(map(len, encoding.decode_tokens_bytes(piece_tokens)), dtype=np.int64, count=count),
+            out=byte_offsets[1:]
+        )
+        if byte_offsets[-1] != len(raw):
+            raise ValueError("Token bytes do not reproduce the text")
+
+    last = first + count
+    indices = np.union1d(_window_bounds(first, last, step, 0), _window_bounds(first, last, step, size))
+    if tokenizer is not None:
+        offsets = char_offsets[indices - first]
+    elif encoding is None:
+        offsets = indices - first
+    else:
+        offsets = _char_offsets(piece, raw, byte_offsets[indices - first])
+    return count, dict(zip(indices.tolist(), offsets.tolist()))
+
+def _model_token_offsets(piece: str, tokenizer: Any) -> np.ndarray:
+    """
+    Character offset of every token boundary of piece under a Hugging Face
+    tokenizer (count + 1 values). A token starts where its offset mapping
+    starts, so whitespace the tokenizer drops stays with the preceding token.
+    """
+    spans = tokenizer(
+        piece, add_special_tokens=False, return_offsets_mapping=True,
+        return_attention_mask=False, return_token_type_ids=False
+    )["offset_mapping"]
+    offsets = np.empty(len(spans) + 1, dtype=np.int64)
+    offsets[0] = 0
+    offsets[-1] = len(piece)
+    if spans:
+        offsets[1:-1] = [start for start, _ in spans[1:]]
+        # Tokens sharing characters (byte fallback) must not move backwards
+        np.maximum.accumulate(offsets, out=offsets)
+    return offsets
+
+def _char_offsets(text: str, raw: bytes, byte_positions: np.ndarray) -> np.ndarray:
+    """Character offsets of UTF-8 byte positions (same shape); mid-character positions round up."""
+    if len(raw) == len(text):
+        # ASCII: bytes and characters coincide
+        return byte_positions
+
+    # A character starts at every byte that is not a continuation byte (10xxxxxx);
+    # the character offset of a byte position is the number of starts before it.
+    # Counted incrementally over the sorted positions to avoid a full-length cumsum.
+    is_start = (np.frombuffer(raw, dtype=np.uint8) & 0xC0) != 0x80
+    positions = np.unique(byte_positions)
+    counts = np.empty_like(positions)
+    count, previous = 0, 0
+    for i, position in enumerate(positions):
+        count += int(np.count_nonzero(is_start[previous:position]))
+        counts[i] = count
+        previous = position
+    return counts[np.searchsorted(positions, byte_positions)]
+
+def _windows(length: int, size: int, overlap: int) -> Iterator[Tuple[int, int]]:
+    """[start, end) windows of at most size over range(length), overlapping by overlap."""
+    step = max(1, size - overlap)
     start = 0
-    idx = 0
-    text_len = len(text)
-    
-    while start < text_len:
-        end = min(start + chunk_size_chars, text_len)
-        chunk_text = text[start:end]
-        
-        chunks.append(ChunkDraft(
-            text=chunk_text,
-            start_offset=start,
-            end_offset=end,
-            chunk_index=idx
-        ))
-        
-        idx += 1
-        start += chunk_size_chars - chunk_overlap_chars
-        
-        if start >= text_len:
+    while True:
+        end = min(start + size, length)
+        yield start, end
+        if end >= length:
             break
-            
-    return chunks
+        start += step
+
+class _TextBuffer:
+    """The not yet chunked tail of a text stream, kept as the pieces it arrived in."""
+    def __init__(self):
+        self._pieces: Deque[Tuple[int, str]] = deque()
+        self.end = 0
+
+    def append(self, piece: str):
+        self._pieces.append((self.end, piece))
+        self.end += len(piece)
+
+    def slice(self, start: int, end: int) -> str:
+        parts = []
+        for offset, piece in self._pieces:
+            if offset >= end:
+                break
+            if offset + len(piece) > start:
+                parts.append(piece[max(0, start - offset):end - offset])
+        return "".join(parts)
+
+    def discard_before(self, position: int):
+        while self._pieces and self._pieces[0][0] + len(self._pieces[0][1]) <= position:
+            self._pieces.popleft()
+
+def _chunk_text_chars(text: str, chunk_size_chars: int, chunk_overlap_chars: int) -> List[ChunkDraft]:
+    return [
+        ChunkDraft(text=text[start:end], start_offset=start, end_offset=end, chunk_index=idx)
+        for idx, (start, end) in enumerate(_windows(len(text), chunk_size_chars, chunk_overlap_chars))
+    ]
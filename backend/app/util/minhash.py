@@ -0,0 +1,90 @@
+import hashlib
+import zlib
+import numpy as np
+from typing import List, Optional, Set
+
+# MinHash signatures of word shingle sets, for near-duplicate detection.
+# Signatures are persisted, so the permutations come from a fixed seed and
+# must never change.
+
+NUM_PERM = 128
+SHINGLE_WORDS = 5
+# LSH banding: two documents become candidates if all rows of any one band
+# agree. With 16 bands of 8 rows, pairs at Jaccard 0.9 collide with
+# probability ~1, pairs at 0.5 with ~6%.
+LSH_BANDS = 16
+LSH_ROWS = NUM_PERM // LSH_BANDS
+
+# Universal hashing (a*x + b) mod p with p = 2^31 - 1: every operand is below
+# 2^31, so products fit in uint64 without wrapping.
+_PRIME = np.uint64((1 << 31) - 1)
+_rng = np.random.RandomState(20240501)
+_A = _rng.randint(1, (1 << 31) - 1, size=NUM_PERM).astype(np.uint64)
+_B = _rng.randint(0, (1 << 31) - 1, size=NUM_PERM).astype(np.uint64)
+
+# Shingles hashed per block, bounding the (block x NUM_PERM) temporary
+_BLOCK = 4096
+
+def _shingle_hashes(shingles: Set[str]) -> np.ndarray:
+    hashes = np.fromiter((zlib.crc32(s.encode("utf-8")) for s in shingles), dtype=np.uint64, count=len(shingles))
+    return hashes % _PRIME
+
+class MinHasher:
+    """
+    minhash_signature of text fed in pieces, e.g. while it is being extracted;
+    the result equals that of the concatenated pieces.
+    """
+    def __init__(self):
+        self._signature = np.full(NUM_PERM, _PRIME, dtype=np.uint64)
+        # Last SHINGLE_WORDS - 1 words, which start shingles ending in the next piece
+        self._tail: List[str] = []
+        # Trailing word of the last piece, which may continue in the next one
+        self._partial = ""
+        self._words = 0
+
+    def update(self, text: str) -> "MinHasher":
+        words = (self._partial + text).lower().split()
+        self._partial = words.pop() if words and not text[-1:].isspace() else ""
+        self._add(words)
+        return self
+
+    def _add(self, words: List[str]):
+        self._words += len(words)
+        sequence = self._tail + words
+        if len(sequence) >= SHINGLE_WORDS:
+            shingles = {" ".join(sequence[i:i + SHINGLE_WORDS]) for i in range(len(sequence) - SHINGLE_WORDS + 1)}
+            self._update_signature(_shingle_hashes(shingles))
+        self._tail = sequence[-(SHINGLE_WORDS - 1):]
+
+    def _update_signature(self, hashes: np.ndarray):
+        for start in range(0, len(hashes), _BLOCK):
+            block = hashes[start:start + _BLOCK, None]
+            np.minimum(self._signature, ((block * _A + _B) % _PRIME).min(axis=0), out=self._signature)
+
+    def signature(self) -> Optional[np.ndarray]:
+        """NUM_PERM uint32 minima over the text's word 5-grams; None for empty text."""
+        if self._partial:
+            self._add([self._partial])
+            self._partial = ""
+        if self._words == 0:
+            return None
+        if self._words < SHINGLE_WORDS:
+            # Too short for a single 5-gram: the whole text is the one shingle
+            self._update_signature(_shingle_hashes({" ".join(self._tail)}))
+        return self._signature.astype(np.uint32)
+
+def minhash_signature(text: str) -> Optional[np.ndarray]:
+    """NUM_PERM uint32 minima over the text's word 5-grams; None for empty text."""
+    return MinHasher().update(text).signature()
+
+def lsh_band_keys(signature: np.ndarray) -> List[int]:
+    """One signed 64-bit bucket key per band (fits an SQLite INTEGER)."""
+    rows = signature.astype("<u4").reshape(LSH_BANDS, LSH_ROWS)
+    return [
+        int.from_bytes(hashlib.blake2b(band.tobytes(), digest_size=8).digest(), "little", signed=True)
+        for band in rows
+    ]
+
+def estimate_similarity(a: np.ndarray, b: np.ndarray) -> float:
+    """Estimated Jaccard similarity of the two shingle sets."""
+    return float(np.count_nonzero(a == b)) / NUM_PERM
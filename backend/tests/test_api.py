@@ -45,6 +45,12 @@ def test_health_check(test_client):
     assert response.status_code == 200
     assert response.json()["status"] == "ok"
 
+def test_create_source_rejects_unknown_near_duplicates(test_client):
+    response = test_client.post("/api/v1/sources", json={
+        "name": "typo", "path": "/tmp", "config": {"near_duplicates": "globl"}
+    })
+    assert response.status_code == 422
+
 def test_source_lifecycle(test_client):
     # 1. Create Source
     fixtures_dir = Path(__file__).parent / "fixtures"
@@ -84,9 +90,72 @@ def mock_embedding_provider(monkeypatch):
         # Return 10-dim vectors to match test config
         return [[0.1] * 10 for _ in texts]
     monkeypatch.setattr(LiteLLMEmbeddingProvider, "embed_texts", mock_embed)
+    monkeypatch.setattr(LiteLLMEmbeddingProvider, "embed_query", lambda self, text: mock_embed(self, [text])[0])
 
 def test_search_endpoint(test_client, mock_embedding_provider):
     # Just check if endpoint is up, result might be empty
     response = test_client.post("/api/v1/search", json={"query": "test", "top_k": 5})
     assert response.status_code == 200
     assert isinstance(response.json(), list)
+    assert response.headers["X-Search-Degraded"] == "0"
+
+def test_search_rejects_non_positive_time_budget(test_client):
+    for budget in (0, -5):
+        response = test_client.post("/api/v1/search", json={"query": "test", "time_budget_ms": budget})
+        assert response.status_code == 422
+
+def test_suggest_endpoint(test_client, monkeypatch):
+    response = test_client.get("/api/v1/suggest", params={"q": "te"})
+    assert response.status_code == 200
+    assert response.json() == []
+
+    # Later keystrokes reuse the process-wide lexical index
+    from backend.app import dependencies
+    def no_new_index(*args, **kwargs):
+        raise AssertionError("suggest must not build a lexical index per request")
+    monkeypatch.setattr(dependencies, "get_lexical_index", no_new_index)
+    assert test_client.get("/api/v1/suggest", params={"q": "tes"}).status_code == 200
+
+def test_search_profile_and_metrics(test_client, mock_embedding_provider):
+    response = test_client.post("/api/v1/search", json={"query": "test", "top_k": 5, "profile": True})
+    assert response.status_code == 200
+    body = response.json()
+    assert isinstance(body["results"], list)
+    assert {"lexical", "fuse", "hydrate", "rerank", "total"} <= set(body["timings_ms"])
+    assert "lexical;dur=" in response.headers["Server-Timing"]
+
+    response = test_client.get("/metrics")
+    assert response.status_code == 200
+    text = response.text
+    assert 'search_stage_seconds_bucket{stage="lexical",le="+Inf"}' in text
+    assert 'vector_index{stat="ntotal"}' in text
+    assert 'lexical_index{stat="rows"}' in text
+    assert '# TYPE search_cache_events_total counter' in text
+    assert 'search_cache_events_total{cache="search_results",result="misses"}' in text
+
+    # Scrapes reuse one set of adapters
+    from backend.app import dependencies
+    adapters = dict(dependencies._shared_adapters)
+    assert test_client.get("/metrics").status_code == 200
+    assert dependencies._shared_adapters == adapters
+
+def test_search_stream_endpoint(test_client, mock_embedding_provider):
+    import json
+    response = test_client.post("/api/v1/search/stream", json={"query": "test", "top_k": 5})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    events = [json.loads(line) for line in response.text.splitlines() if line]
+    assert [e["stage"] for e in events] == ["lexical", "final"]
+
+def test_search_cursor_header_and_bad_cursor(test_client, mock_embedding_provider):
+    response = test_client.post("/api/v1/search", json={"query": "test", "top_k": 1, "profile": True})
+    assert response.status_code == 200
+    assert response.json()["next_cursor"] == response.headers.get("X-Next-Cursor")
+
+    response = test_client.post("/api/v1/search", json={"query": "test", "top_k": 1, "cursor": "bogus"})
+    assert response.status_code == 400
+
+def test_similar_endpoints_unknown_ids(test_client):
+    from uuid import uuid4
+    assert test_client.get(f"/api/v1/chunks/{uuid4()}/similar").status_code == 404
+    assert test_client.get(f"/api/v1/documents/{uuid4()}/similar").status_code == 404
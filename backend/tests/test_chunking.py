@@ -1,7 +1,30 @@
+import re
+import sys
 import pytest
-from backend.app.util.chunking import chunk_text
+import tiktoken
+from backend.app.util import chunking
+from backend.app.util.chunking import chunk_text, chunk_stream
 from backend.app.util.hashing import compute_hash
 
+@pytest.fixture
+def byte_encoding(monkeypatch):
+    # One token per byte, built offline; splits multi-byte characters across tokens
+    encoding = tiktoken.Encoding(
+        name="bytes", pat_str=r"\S+|\s+", mergeable_ranks={bytes([i]): i for i in range(256)}, special_tokens={}
+    )
+    monkeypatch.setitem(chunking._encodings, chunking.ENCODING_NAME, encoding)
+    return encoding
+
+class WordTokenizer:
+    """Stands in for a Hugging Face fast tokenizer: one token per word, [CLS]/[SEP] added."""
+    model_max_length = 512
+
+    def __call__(self, text, add_special_tokens=True, return_offsets_mapping=False, **kwargs):
+        return {"offset_mapping": [m.span() for m in re.finditer(r"\S+", text)]}
+
+    def num_special_tokens_to_add(self):
+        return 2
+
 def test_chunking_basic():
     text = "Hello world " * 50
     # chunk size 10 tokens, overlap 2
@@ -24,8 +47,62 @@ def test_chunking_overlap():
         # This depends on tiktoken encoding, but generally words should overlap
         pass
 
+def test_chunk_offsets_are_exact_slices(byte_encoding):
+    text = "héllo wörld 😀 <|endoftext|> 中文字符 " * 20
+    chunks = chunk_text(text, 16, 5)
+
+    assert chunks[0].start_offset == 0
+    assert chunks[-1].end_offset == len(text)
+    for prev, chunk in zip(chunks, chunks[1:]):
+        # Overlapping windows move strictly forward
+        assert prev.start_offset < chunk.start_offset <= prev.end_offset
+    for chunk in chunks:
+        assert chunk.text == text[chunk.start_offset:chunk.end_offset]
+        assert len(chunk.text.encode("utf-8")) <= 16 + 3
+
+def test_chunk_stream_carries_windows_across_segments(byte_encoding):
+    text = "page one ends mid-sentence and pägé two continues it; " * 40
+    segments = [text[i:i + 37] for i in range(0, len(text), 37)]
+
+    chunks = list(chunk_stream(iter(segments), 64, 16))
+
+    assert [c.chunk_index for c in chunks] == list(range(len(chunks)))
+    assert chunks[0].start_offset == 0 and chunks[-1].end_offset == len(text)
+    for prev, chunk in zip(chunks, chunks[1:]):
+        assert prev.start_offset < chunk.start_offset < prev.end_offset
+    assert all(c.text == text[c.start_offset:c.end_offset] for c in chunks)
+
+def test_tokenizer_load_failure_is_cached(monkeypatch):
+    calls = []
+    def failing_get_encoding(name):
+        calls.append(name)
+        raise OSError("offline")
+    monkeypatch.setattr(chunking.tiktoken, "get_encoding", failing_get_encoding)
+    monkeypatch.setattr(chunking, "_encodings", {})
+
+    for _ in range(3):
+        chunks = chunk_text("x" * 100, 10, 2)
+    assert calls == [chunking.ENCODING_NAME]
+    assert [(c.start_offset, c.end_offset) for c in chunks[:2]] == [(0, 40), (32, 72)]
+
 def test_hashing_stability():
     t1 = "Hello World"
     t2 = "Hello World"
     assert compute_hash(t1) == compute_hash(t2)
     assert compute_hash(t1) != compute_hash("Hello Python")
+
+def test_chunks_counted_in_model_tokens_and_capped():
+    text = " ".join(f"w{i}" for i in range(23)) + " "
+    chunks = chunk_text(text, 100, 0, tokenizer=WordTokenizer(), max_tokens=5)
+
+    assert [len(c.text.split()) for c in chunks] == [5, 5, 5, 5, 3]
+    assert chunks[1].text == "w5 w6 w7 w8 w9 "
+    assert chunks[-1].end_offset == len(text)
+    streamed = list(chunk_stream(iter([text[:20], text[20:]]), 100, 0, tokenizer=WordTokenizer(), max_tokens=5))
+    assert [c.text for c in streamed] == [c.text for c in chunks]
+
+def test_missing_model_tokenizer_falls_back_to_cl100k(monkeypatch):
+    monkeypatch.setattr(chunking, "_model_tokenizers", {})
+    monkeypatch.setitem(sys.modules, "transformers", None)
+    assert chunking.get_model_tokenizer("some/model") is None
+    assert chunking._model_tokenizers == {"some/model": None}
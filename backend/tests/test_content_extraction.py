@@ -1,6 +1,10 @@
 import pytest
 from pathlib import Path
+from pypdf import PdfReader, PdfWriter
+from backend.app.adapters.content import pdf
 from backend.app.adapters.content.pdf import PDFExtractor
+from backend.app.adapters.content import page_cache
+from backend.app.adapters.content.page_cache import PageTextCache
 from backend.app.adapters.content.markdown import MarkdownExtractor
 from backend.app.adapters.content.html import HTMLExtractor
 from backend.app.config.schema import AppConfig, WebFetchConfig, MetadataBackend, LexicalBackend, VectorBackend, StorageConfig, IngestionConfig, BookmarksConfig, EmbeddingConfig
@@ -32,6 +36,65 @@ def test_pdf_extraction(fixtures_dir):
     assert result.mime_type == "application/pdf"
     assert result.extra["page_count"] == 1
 
+def test_pdf_pages_extracted_in_parallel_stream_in_order(fixtures_dir, mock_config):
+    mock_config.ingestion.pdf_workers = 2
+    mock_config.ingestion.pdf_parallel_min_pages = 2
+    mock_config.ingestion.pdf_pages_per_task = 2
+    report = str(fixtures_dir / "report.pdf")
+
+    content, pages = PDFExtractor(mock_config).extract_segments(report)
+    pages = list(pages)
+
+    assert content.extra["page_count"] == 5
+    assert [p.strip() for p in pages] == [p.extract_text() for p in PdfReader(report).pages]
+
+def test_pdf_page_cache_extracts_only_new_pages(fixtures_dir, mock_config, tmp_path, monkeypatch):
+    mock_config.ingestion.pdf_workers = 1
+    extracted = []
+    extract_text = pdf.PageObject.extract_text
+    monkeypatch.setattr(pdf.PageObject, "extract_text", lambda page, *a, **kw: extracted.append(page) or extract_text(page, *a, **kw))
+
+    # The same report before its last page was added, written out anew
+    writer = PdfWriter()
+    for page in PdfReader(fixtures_dir / "report.pdf").pages[:4]:
+        writer.add_page(page)
+    draft = tmp_path / "draft.pdf"
+    writer.write(draft)
+
+    extractor = PDFExtractor(mock_config)
+    assert len(list(extractor.extract_segments(str(draft))[1])) == 4
+    assert len(extracted) == 4
+
+    pages = list(extractor.extract_segments(str(fixtures_dir / "report.pdf"))[1])
+    assert len(extracted) == 5
+    assert "Page four" in pages[3] and "Page five" in pages[4]
+
+def test_pdf_page_cache_written_in_batches(fixtures_dir, mock_config, monkeypatch):
+    mock_config.ingestion.pdf_workers = 1
+    writes = []
+    put_many = PageTextCache.put_many
+    monkeypatch.setattr(PageTextCache, "put_many", lambda cache, items: writes.append(len(items)) or put_many(cache, items))
+
+    assert len(list(PDFExtractor(mock_config).extract_segments(str(fixtures_dir / "report.pdf"))[1])) == 5
+    assert writes == [5]
+
+def test_page_cache_tracks_size_and_evicts_oldest(tmp_path, monkeypatch):
+    cache = PageTextCache(tmp_path / "pages.db", max_bytes=100)
+    clock = [1000.0]
+    monkeypatch.setattr(page_cache.time, "time", lambda: clock[0])
+
+    for i in range(8):
+        clock[0] += 1
+        cache.put_many({f"p{i}": "x" * (10 + 10 * (i % 3))})
+    cache.put_many({"p7": "y" * 20}) # Rewritten at a new size
+
+    total, actual = cache._conn.execute(
+        "SELECT total_bytes, (SELECT SUM(nbytes) FROM pages) FROM pages_meta"
+    ).fetchone()
+    assert total == actual <= 100
+    remaining = cache.get_many([f"p{i}" for i in range(8)])
+    assert "p0" not in remaining and remaining["p7"] == "y" * 20
+
 def test_markdown_extraction(fixtures_dir):
     extractor = MarkdownExtractor()
     md_path = fixtures_dir / "sample.md"
@@ -0,0 +1,75 @@
+import numpy as np
+from backend.app.config.schema import AppConfig, StorageConfig, MetadataBackend, LexicalBackend, VectorBackend, IngestionConfig, BookmarksConfig, WebFetchConfig, EmbeddingConfig
+from backend.app.adapters.embedding import embedding_cache
+from backend.app.adapters.embedding.embedding_cache import EmbeddingCache
+from backend.app.adapters.embedding.litellm import LiteLLMEmbeddingProvider
+
+def test_batch_roundtrip_as_float16(tmp_path):
+    cache = EmbeddingCache(tmp_path / "embeddings.db", max_bytes=1024 * 1024)
+    cache.put_many({"a": [0.1, 0.2, 0.3, 0.4], "b": [1.0, -1.0, 0.5, 0.0]})
+
+    found = cache.get_many(["a", "missing", "b"])
+    assert set(found) == {"a", "b"}
+    assert found["a"].dtype == np.float32
+    np.testing.assert_allclose(found["a"], [0.1, 0.2, 0.3, 0.4], atol=1e-3)
+    assert cache.stats() == {"size": 2, "bytes": 16}
+
+    # Overwrites keep the byte total exact
+    cache.put_many({"a": [0.0] * 8})
+    assert cache.stats() == {"size": 2, "bytes": 24}
+
+def test_lru_eviction_under_byte_budget(tmp_path, monkeypatch):
+    # Ten 4-d float16 vectors (8 bytes each) fit
+    cache = EmbeddingCache(tmp_path / "embeddings.db", max_bytes=80)
+    clock = [1000.0]
+    monkeypatch.setattr(embedding_cache.time, "time", lambda: clock[0])
+
+    for i in range(10):
+        clock[0] += 100
+        cache.put_many({f"k{i}": [float(i)] * 4})
+    clock[0] += 100
+    cache.get_many(["k0"]) # Recently used again, must survive
+
+    clock[0] += 100
+    cache.put_many({"new": [1.0] * 4})
+
+    stats = cache.stats()
+    assert stats["bytes"] <= 80
+    remaining = cache.get_many([f"k{i}" for i in range(10)] + ["new"])
+    assert "k0" in remaining and "new" in remaining
+    assert "k1" not in remaining
+
+def test_shared_file_between_instances(tmp_path):
+    # Two handles on one file, as two worker processes would have
+    path = tmp_path / "embeddings.db"
+    writer = EmbeddingCache(path, max_bytes=1024)
+    reader = EmbeddingCache(path, max_bytes=1024)
+
+    writer.put_many({"x": [0.5] * 4})
+    assert "x" in reader.get_many(["x"])
+    assert reader.stats()["bytes"] == 8
+
+def test_provider_fetches_only_misses(tmp_path, monkeypatch):
+    config = AppConfig(
+        metadata_backend=MetadataBackend.SQLITE,
+        lexical_backend=LexicalBackend.FTS5,
+        vector_backend=VectorBackend.FAISS,
+        storage=StorageConfig(data_dir=tmp_path, sqlite_path=tmp_path / "metadata.db", faiss_dir=tmp_path / "faiss"),
+        ingestion=IngestionConfig(chunk_size_tokens=100, chunk_overlap_tokens=0, max_file_mb=10),
+        bookmarks=BookmarksConfig(),
+        web_fetch=WebFetchConfig(),
+        embedding=EmbeddingConfig(provider="test", model_name="test", dim=4)
+    )
+    provider = LiteLLMEmbeddingProvider(config)
+    fetched = []
+    def fake_fetch(texts):
+        fetched.append(list(texts))
+        return [[float(len(t))] * 4 for t in texts]
+    monkeypatch.setattr(provider, "_fetch_embeddings", fake_fetch)
+
+    provider.embed_texts(["a", "bb"])
+    vectors = provider.embed_texts(["bb", "ccc", "a"])
+
+    assert fetched == [["a", "bb"], ["ccc"]]
+    assert [list(v) for v in vectors] == [[2.0] * 4, [3.0] * 4, [1.0] * 4]
+    assert (tmp_path / "cache" / "embeddings.db").exists()
@@ -0,0 +1,149 @@
+import base64
+import json
+import httpx
+import numpy as np
+import pytest
+from backend.app.config.schema import AppConfig, StorageConfig, MetadataBackend, LexicalBackend, VectorBackend, IngestionConfig, BookmarksConfig, WebFetchConfig, EmbeddingConfig
+from backend.app.adapters.embedding import litellm
+from backend.app.adapters.embedding.litellm import LiteLLMEmbeddingProvider, AdaptiveBatchSize
+from backend.app.adapters.embedding.balancer import EndpointPool
+
+@pytest.fixture
+def provider(tmp_path, monkeypatch):
+    config = AppConfig(
+        metadata_backend=MetadataBackend.SQLITE,
+        lexical_backend=LexicalBackend.FTS5,
+        vector_backend=VectorBackend.FAISS,
+        storage=StorageConfig(data_dir=tmp_path, sqlite_path=tmp_path / "metadata.db", faiss_dir=tmp_path / "faiss"),
+        ingestion=IngestionConfig(chunk_size_tokens=100, chunk_overlap_tokens=0, max_file_mb=10),
+        bookmarks=BookmarksConfig(),
+        web_fetch=WebFetchConfig(),
+        embedding=EmbeddingConfig(provider="test", model_name="test", dim=2, cache_mb=0, batch_size=4, max_tokens_per_request=100)
+    )
+    monkeypatch.setattr(litellm.time, "sleep", lambda s: None)
+    provider = LiteLLMEmbeddingProvider(config)
+    # Fresh limit per test; the real one is shared by the whole process
+    provider.batch_size = AdaptiveBatchSize(4)
+    return provider
+
+def serve(provider, handler, endpoints=None):
+    provider.client = httpx.Client(transport=httpx.MockTransport(handler))
+    if endpoints:
+        provider.endpoints = EndpointPool(endpoints, provider.client, probe_interval_sec=3600)
+
+def embeddings_response(texts):
+    return httpx.Response(200, json={"data": [
+        {"object": "embedding", "embedding": [float(len(t)), 0.0], "index": i} for i, t in enumerate(texts)
+    ]})
+
+def test_batches_bounded_by_count_and_tokens(provider):
+    sizes = []
+    def handler(request):
+        texts = json.loads(request.content)["input"]
+        sizes.append(len(texts))
+        return embeddings_response(texts)
+    serve(provider, handler)
+
+    texts = [f"t{i}" for i in range(10)] + ["x" * 400, "y"]
+    vectors = provider.embed_texts(texts)
+
+    assert [v[0] for v in vectors] == [float(len(t)) for t in texts]
+    # 4 + 4 + 2 short texts, the text over the token budget alone, then "y"
+    assert sorted(sizes) == [1, 1, 2, 4, 4]
+
+def test_throttling_shrinks_batches_and_retries(provider):
+    sizes = []
+    def handler(request):
+        texts = json.loads(request.content)["input"]
+        sizes.append(len(texts))
+        if len(texts) > 2:
+            return httpx.Response(429, headers={"Retry-After": "0"})
+        return embeddings_response(texts)
+    serve(provider, handler)
+
+    texts = ["a", "bb", "ccc", "dddd"]
+    vectors = provider.embed_texts(texts)
+
+    assert [v[0] for v in vectors] == [1.0, 2.0, 3.0, 4.0]
+    assert sizes == [4, 2, 2]
+    assert provider.batch_size.current == 2
+
+def test_gives_up_after_max_retries(provider):
+    calls = []
+    def handler(request):
+        calls.append(1)
+        return httpx.Response(503)
+    serve(provider, handler)
+
+    with pytest.raises(RuntimeError):
+        provider.embed_texts(["a"])
+    assert len(calls) == provider.max_retries + 1
+
+def test_base64_float32_and_float16_decoding(provider):
+    requests_seen = []
+    def handler(request):
+        body = json.loads(request.content)
+        requests_seen.append(body)
+        dtype = "<f2" if body.get("dtype") == "float16" else "<f4"
+        vectors = np.array([[len(t), 0.5] for t in body["input"]], dtype=dtype)
+        return httpx.Response(200, json={
+            "data": [
+                {"object": "embedding", "embedding": base64.b64encode(v.tobytes()).decode(), "index": i}
+                for i, v in enumerate(vectors)
+            ],
+            "dtype": body.get("dtype", "float32"),
+        })
+    serve(provider, handler)
+
+    vectors = provider.embed_texts(["a", "bbb"])
+    assert requests_seen[-1]["encoding_format"] == "base64"
+    assert "dtype" not in requests_seen[-1]
+    assert all(v.dtype == np.float32 for v in vectors)
+    np.testing.assert_array_equal(np.array(vectors), [[1.0, 0.5], [3.0, 0.5]])
+
+    provider.transport_dtype = "float16"
+    vectors = provider.embed_texts(["cc"])
+    assert requests_seen[-1]["dtype"] == "float16"
+    assert vectors[0].dtype == np.float32
+    np.testing.assert_array_equal(vectors[0], [2.0, 0.5])
+
+def test_float_lists_still_accepted(provider):
+    # Servers that ignore encoding_format answer with plain lists
+    serve(provider, lambda request: embeddings_response(json.loads(request.content)["input"]))
+    assert [list(v) for v in provider.embed_texts(["abc"])] == [[3.0, 0.0]]
+
+def test_least_outstanding_endpoint_is_picked():
+    pool = EndpointPool(["http://a/v1", "http://b/v1/"], client=None, probe_interval_sec=3600)
+    with pool.lease() as first:
+        with pool.lease() as second:
+            assert {first.base_url, second.base_url} == {"http://a/v1", "http://b/v1"}
+        # b is free again while a is still busy
+        with pool.lease() as third:
+            assert third is second
+    assert {url: s["outstanding"] for url, s in pool.stats().items()} == {"http://a/v1": 0, "http://b/v1": 0}
+    assert pool.stats()["http://a/v1"]["requests"] == 1
+
+def test_failed_endpoint_is_ejected_and_readmitted_by_probe(provider):
+    down = {"a"}
+    hosts = []
+    def handler(request):
+        host = request.url.host
+        if request.url.path == "/readyz":
+            return httpx.Response(503 if host in down else 200)
+        hosts.append(host)
+        if host in down:
+            raise httpx.ConnectError("refused", request=request)
+        return embeddings_response(json.loads(request.content)["input"])
+    serve(provider, handler, endpoints=["http://a/v1", "http://b/v1"])
+
+    for text in ["x", "yy", "zzz"]:
+        assert provider.embed_texts([text])[0][0] == float(len(text))
+    # One failed attempt on a, everything after that on b
+    assert hosts == ["a", "b", "b", "b"]
+    assert provider.endpoints.stats()["http://a/v1"]["healthy"] == 0
+
+    provider.endpoints.probe()
+    assert provider.endpoints.stats()["http://a/v1"]["healthy"] == 0
+    down.clear()
+    provider.endpoints.probe()
+    assert provider.endpoints.stats()["http://a/v1"]["healthy"] == 1
@@ -0,0 +1,59 @@
+import threading
+import numpy as np
+import pytest
+from backend.app.config.schema import AppConfig, StorageConfig, MetadataBackend, LexicalBackend, VectorBackend, IngestionConfig, BookmarksConfig, WebFetchConfig, EmbeddingConfig
+from backend.app.adapters.embedding.local import LocalEmbeddingProvider
+from backend.app.dependencies import get_embedding_provider
+
+def make_config(tmp_path, **embedding):
+    return AppConfig(
+        metadata_backend=MetadataBackend.SQLITE,
+        lexical_backend=LexicalBackend.FTS5,
+        vector_backend=VectorBackend.FAISS,
+        storage=StorageConfig(data_dir=tmp_path, sqlite_path=tmp_path / "metadata.db", faiss_dir=tmp_path / "faiss"),
+        ingestion=IngestionConfig(chunk_size_tokens=100, chunk_overlap_tokens=0, max_file_mb=10),
+        bookmarks=BookmarksConfig(),
+        web_fetch=WebFetchConfig(),
+        embedding=EmbeddingConfig(provider="local", model_name="test", dim=2, **embedding)
+    )
+
+class RecordingEncoder:
+    def __init__(self):
+        self.batches = []
+
+    def __call__(self, texts):
+        self.batches.append(list(texts))
+        return np.array([[len(t), 1.0] for t in texts], dtype=np.float32)
+
+def test_provider_selected_by_config(tmp_path):
+    assert isinstance(get_embedding_provider(make_config(tmp_path)), LocalEmbeddingProvider)
+
+def test_concurrent_calls_share_length_sorted_batches(tmp_path):
+    encoder = RecordingEncoder()
+    provider = LocalEmbeddingProvider(make_config(tmp_path, batch_size=4, batch_wait_ms=50, cache_mb=0), encoder=encoder)
+
+    texts_per_caller = [["x" * (i * 3 + j + 1) for j in range(3)] for i in range(4)]
+    results = [None] * 4
+    def call(i):
+        results[i] = provider.embed_texts(texts_per_caller[i])
+    threads = [threading.Thread(target=call, args=(i,)) for i in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    # Every caller gets its own vectors back, in order
+    for texts, vectors in zip(texts_per_caller, results):
+        assert [v[0] for v in vectors] == [float(len(t)) for t in texts]
+    # Calls were pooled into full batches, each sorted by length
+    assert all(len(b) <= 4 for b in encoder.batches)
+    assert len(encoder.batches) < 4 * 3
+    for batch in encoder.batches:
+        assert [len(t) for t in batch] == sorted(len(t) for t in batch)
+
+def test_errors_reach_the_caller(tmp_path):
+    def failing(texts):
+        raise RuntimeError("model exploded")
+    provider = LocalEmbeddingProvider(make_config(tmp_path, cache_mb=0), encoder=failing)
+    with pytest.raises(RuntimeError, match="exploded"):
+        provider.embed_query("q")
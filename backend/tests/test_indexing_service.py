@@ -90,3 +90,171 @@ def test_end_to_end_indexing(test_pipeline, tmp_path):
     assert len(vec_results) > 0
     found_vec = any(res[0] in chunk_ids for res in vec_results)
     assert found_vec
+
+def _write_mirrored_docs(tmp_path):
+    body = " ".join(f"paragraph {i} explains how the indexing pipeline handles section {i}." for i in range(200))
+    for name, footer in [("a", "Copy A."), ("b", "Copy B, downloaded again.")]:
+        folder = tmp_path / name
+        folder.mkdir(parents=True)
+        (folder / "guide.md").write_text(f"# Guide\n\n{body}\n\n{footer}\n")
+    return tmp_path
+
+def test_near_duplicate_document_is_linked_not_indexed(test_pipeline, tmp_path):
+    service, metadata, lexical, vector = test_pipeline
+    source = metadata.upsert_source(models.Source(name="mirrors", path=str(_write_mirrored_docs(tmp_path / "src"))))
+
+    job = service.scan_source(source.id)
+    assert job.status == models.JobStatus.DONE
+
+    docs = metadata.list_documents_by_source(source.id)
+    indexed = [d for d in docs if d.status == "indexed"]
+    duplicates = [d for d in docs if d.status == "duplicate"]
+    assert len(indexed) == 1 and len(duplicates) == 1
+    assert duplicates[0].canonical_id == indexed[0].id
+    assert metadata.list_chunks(duplicates[0].id) == []
+    assert metadata.list_chunks(indexed[0].id)
+
+def test_near_duplicate_check_can_be_disabled_per_source(test_pipeline, tmp_path):
+    service, metadata, lexical, vector = test_pipeline
+    source = metadata.upsert_source(models.Source(
+        name="mirrors", path=str(_write_mirrored_docs(tmp_path / "src")), config={"near_duplicates": "off"}
+    ))
+
+    service.scan_source(source.id)
+
+    assert [d.status for d in metadata.list_documents_by_source(source.id)] == ["indexed", "indexed"]
+
+def test_duplicates_indexed_again_when_canonical_changes(test_pipeline, tmp_path):
+    service, metadata, lexical, vector = test_pipeline
+    source = metadata.upsert_source(models.Source(name="mirrors", path=str(_write_mirrored_docs(tmp_path / "src"))))
+    service.scan_source(source.id)
+    [canonical] = [d for d in metadata.list_documents_by_source(source.id) if d.status == "indexed"]
+    [duplicate] = metadata.list_duplicates(canonical.id)
+
+    # The canonical is rewritten: its copy now stands on its own
+    with open(canonical.uri.removeprefix("file://"), "w") as f:
+        f.write("# Guide\n\nRewritten from scratch, nothing like the mirrored copy.\n")
+    service.scan_source(source.id)
+
+    duplicate = metadata.get_document(duplicate.id)
+    assert duplicate.status == "indexed" and duplicate.canonical_id is None
+    assert metadata.list_chunks(duplicate.id)
+
+def test_duplicates_indexed_again_when_canonical_file_removed(test_pipeline, tmp_path):
+    service, metadata, lexical, vector = test_pipeline
+    source = metadata.upsert_source(models.Source(name="mirrors", path=str(_write_mirrored_docs(tmp_path / "src"))))
+    service.scan_source(source.id)
+    [canonical] = [d for d in metadata.list_documents_by_source(source.id) if d.status == "indexed"]
+    [duplicate] = metadata.list_duplicates(canonical.id)
+
+    os.remove(canonical.uri.removeprefix("file://"))
+    assert service.scan_source(source.id).status == models.JobStatus.DONE
+
+    assert metadata.get_document(canonical.id).status == "deleted"
+    assert lexical.search("paragraph", top_k=50) and all(
+        metadata.get_chunk(chunk_id).doc_id == duplicate.id for chunk_id, _ in lexical.search("paragraph", top_k=50)
+    )
+    assert metadata.get_document(duplicate.id).status == "indexed"
+    assert metadata.list_duplicates(canonical.id) == []
+
+def test_failed_duplicate_recheck_keeps_the_indexing_error(test_pipeline, tmp_path, monkeypatch):
+    service, metadata, lexical, vector = test_pipeline
+    source = metadata.upsert_source(models.Source(name="mirrors", path=str(_write_mirrored_docs(tmp_path / "src"))))
+    service.scan_source(source.id)
+    [canonical] = [d for d in metadata.list_documents_by_source(source.id) if d.status == "indexed"]
+
+    def broken_extract(uri):
+        raise RuntimeError("extraction broke")
+    def broken_lookup(doc_id):
+        raise RuntimeError("lookup broke")
+    monkeypatch.setattr(service.extractors["text/markdown"], "extract_segments", broken_extract)
+    monkeypatch.setattr(metadata, "list_duplicates", broken_lookup)
+
+    with pytest.raises(RuntimeError, match="extraction broke"):
+        service.index_document(canonical.id)
+    assert metadata.get_document(canonical.id).status == "error"
+
+def test_invalid_near_duplicates_override_is_rejected(test_pipeline, tmp_path):
+    service, metadata, lexical, vector = test_pipeline
+    source = metadata.upsert_source(models.Source(
+        name="mirrors", path=str(_write_mirrored_docs(tmp_path / "src")), config={"near_duplicates": "of"}
+    ))
+
+    assert service.scan_source(source.id).status == models.JobStatus.FAILED
+    assert "error" in {d.status for d in metadata.list_documents_by_source(source.id)}
+
+def test_large_document_is_indexed_while_streaming(test_pipeline, tmp_path, monkeypatch):
+    service, metadata, lexical, vector = test_pipeline
+    from backend.app.adapters.content import text as text_extractor
+    from backend.app.util.hashing import compute_hash
+    monkeypatch.setattr(text_extractor, "READ_CHARS", 1000)
+    service.config.ingestion.stream_threshold_mb = 0.002
+
+    body = " ".join(f"line {i} of the exported chat log, mentioning topic {i % 7}." for i in range(600))
+    folder = tmp_path / "export"
+    for name in ("a", "b"):
+        (folder / name).mkdir(parents=True)
+        (folder / name / "log.txt").write_text(body)
+    source = metadata.upsert_source(models.Source(name="export", path=str(folder)))
+
+    assert service.scan_source(source.id).status == models.JobStatus.DONE
+
+    docs = sorted(metadata.list_documents_by_source(source.id), key=lambda d: d.status)
+    assert [d.status for d in docs] == ["duplicate", "indexed"]
+    duplicate, indexed = docs
+    assert indexed.doc_hash == compute_hash(body)
+    chunks = metadata.list_chunks(indexed.id)
+    assert len(chunks) > 10
+    assert all(c.text == body[c.start_offset:c.end_offset] for c in chunks)
+    assert chunks[-1].end_offset == len(body)
+    # The copy was indexed as it streamed in, then dropped once recognized
+    assert duplicate.canonical_id == indexed.id
+    assert len(vector.get_doc_chunk_vectors([duplicate.id])[0]) == 0
+    assert len(vector.get_doc_chunk_vectors([indexed.id])[0]) == len(chunks)
+
+def test_chunks_fit_embedding_model_input(test_pipeline, tmp_path, monkeypatch):
+    service, metadata, lexical, vector = test_pipeline
+    from backend.app.util import chunking
+    import re
+
+    class WordTokenizer:
+        # Hugging Face fast tokenizer stand-in: one token per word plus [CLS]/[SEP]
+        model_max_length = 512
+
+        def __call__(self, text, **kwargs):
+            return {"offset_mapping": [m.span() for m in re.finditer(r"\S+", text)]}
+
+        def num_special_tokens_to_add(self):
+            return 2
+
+    monkeypatch.setitem(chunking._model_tokenizers, "test", WordTokenizer())
+    service.config.ingestion.chunk_tokenizer = "embedding"
+    service.config.embedding.max_seq_length = 12
+
+    folder = tmp_path / "notes"
+    folder.mkdir()
+    (folder / "note.txt").write_text(" ".join(f"word{i}" for i in range(45)))
+    source = metadata.upsert_source(models.Source(name="notes", path=str(folder)))
+    assert service.scan_source(source.id).status == models.JobStatus.DONE
+
+    doc = metadata.list_documents_by_source(source.id)[0]
+    # 100-token chunks would be truncated: capped at 12 less [CLS]/[SEP]
+    assert [len(c.text.split()) for c in metadata.list_chunks(doc.id)] == [10, 10, 10, 10, 5]
+
+def test_pdf_chunks_record_their_pages(test_pipeline, tmp_path):
+    service, metadata, lexical, vector = test_pipeline
+    import shutil
+    folder = tmp_path / "reports"
+    folder.mkdir()
+    shutil.copy(Path(__file__).parent / "fixtures" / "report.pdf", folder / "report.pdf")
+    service.config.ingestion.chunk_size_tokens = 20
+    source = metadata.upsert_source(models.Source(name="reports", path=str(folder)))
+    assert service.scan_source(source.id).status == models.JobStatus.DONE
+
+    chunks = metadata.list_chunks(metadata.list_documents_by_source(source.id)[0].id)
+    pages = [(c.metadata["page_start"], c.metadata["page_end"]) for c in chunks]
+    assert pages[0][0] == 1 and pages[-1][1] == 5
+    assert all(start <= end for start, end in pages)
+    assert any(start < end for start, end in pages)
+    page_five = next(c for c in chunks if "fiscal" in c.text)
+    assert page_five.metadata["page_end"] == 5
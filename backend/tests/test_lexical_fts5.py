@@ -79,3 +79,49 @@ def test_fts5_indexing_and_search(test_env):
     # doc2 should still be there
     results = lexical.search("Rust", top_k=10)
     assert len(results) == 1
+
+def test_fts5_suggest_terms(test_env):
+    metadata, lexical = test_env
+
+    source = models.Source(name="src", path="/tmp")
+    metadata.upsert_source(source)
+    doc = models.Document(source_id=source.id, uri="doc1", title="Guide")
+    metadata.upsert_document(doc)
+
+    texts = ["programming in python", "program design", "python programming tips", "progress report"]
+    chunks = [
+        models.Chunk(doc_id=doc.id, chunk_index=i, text=t, start_offset=0, end_offset=len(t), chunk_hash=str(i))
+        for i, t in enumerate(texts)
+    ]
+    lexical.upsert_chunks(chunks)
+
+    # Short prefixes come from the precomputed buckets, ranked by doc frequency
+    terms = lexical.suggest_terms("pro", limit=10)
+    assert terms[0] == ("programming", 2)
+    assert {t for t, _ in terms} == {"programming", "program", "progress"}
+
+    # Longer prefixes go through the sorted term list
+    assert lexical.suggest_terms("progr", limit=10)[0][0] == "programming"
+    assert lexical.suggest_terms("Pyth", limit=10) == [("python", 2)]
+    assert lexical.suggest_terms("p", limit=10) == []
+
+    # Writes invalidate the cached dictionary
+    lexical.delete_doc(doc.id)
+    assert lexical.suggest_terms("pro", limit=10) == []
+
+def test_fts5_suggest_counts_each_chunk_once(test_env):
+    metadata, lexical = test_env
+
+    source = models.Source(name="src", path="/tmp")
+    metadata.upsert_source(source)
+    # The title is repeated in every chunk of the document
+    doc = models.Document(source_id=source.id, uri="doc1", title="Python Guide")
+    metadata.upsert_document(doc)
+
+    texts = ["python basics", "more python", "pythonic style"]
+    lexical.upsert_chunks([
+        models.Chunk(doc_id=doc.id, chunk_index=i, text=t, start_offset=0, end_offset=len(t), chunk_hash=str(i))
+        for i, t in enumerate(texts)
+    ])
+
+    assert dict(lexical.suggest_terms("pyt", limit=10)) == {"python": 3, "pythonic": 1}
@@ -73,3 +73,64 @@ def test_sqlite_metadata_lifecycle(sqlite_store):
     
     fetched_job = sqlite_store.get_job(job.id)
     assert fetched_job.progress == 0.5
+
+def test_get_chunks_with_documents(sqlite_store):
+    source = sqlite_store.upsert_source(models.Source(name="src", path="/tmp"))
+    doc_a = sqlite_store.upsert_document(models.Document(source_id=source.id, uri="a", title="A"))
+    doc_b = sqlite_store.upsert_document(models.Document(source_id=source.id, uri="b", title="B"))
+
+    chunks = [
+        sqlite_store.upsert_chunk(models.Chunk(
+            doc_id=d.id, chunk_index=i, text=f"text {i}", start_offset=0, end_offset=6, chunk_hash=str(i)
+        ))
+        for i, d in enumerate([doc_a, doc_b, doc_a])
+    ]
+
+    # Input order is preserved and unknown ids are dropped
+    ids = [chunks[2].id, uuid4(), chunks[1].id, chunks[0].id]
+    hydrated = sqlite_store.get_chunks_with_documents(ids)
+    assert [c.id for c, _ in hydrated] == [chunks[2].id, chunks[1].id, chunks[0].id]
+    assert [d.uri for _, d in hydrated] == ["a", "b", "a"]
+    assert sqlite_store.get_chunks_with_documents([]) == []
+
+def test_get_chunks_with_documents_uses_document_cache(sqlite_store):
+    from backend.app.adapters.metadata.sqlite import _document_cache
+    source = sqlite_store.upsert_source(models.Source(name="src", path="/tmp"))
+    doc = sqlite_store.upsert_document(models.Document(source_id=source.id, uri="a", title="A"))
+    chunk = sqlite_store.upsert_chunk(models.Chunk(
+        doc_id=doc.id, chunk_index=0, text="text", start_offset=0, end_offset=4, chunk_hash="h"
+    ))
+
+    sqlite_store.get_document(doc.id)
+    hits = _document_cache.hits
+    [(_, hydrated)] = sqlite_store.get_chunks_with_documents([chunk.id])
+    assert _document_cache.hits == hits + 1
+    assert hydrated.title == "A"
+
+    # The cached instance is not handed out
+    hydrated.title = "Mutated"
+    assert sqlite_store.get_chunks_with_documents([chunk.id])[0][1].title == "A"
+
+def test_document_cache_invalidation(sqlite_store):
+    source = sqlite_store.upsert_source(models.Source(name="src", path="/tmp"))
+    doc = sqlite_store.upsert_document(models.Document(source_id=source.id, uri="a", title="Old"))
+
+    cached = sqlite_store.get_document(doc.id)
+    assert cached.title == "Old"
+
+    # Mutating a returned copy must not leak into the cache
+    cached.title = "Mutated"
+    assert sqlite_store.get_document(doc.id).title == "Old"
+
+    cached.title = "New"
+    sqlite_store.upsert_document(cached)
+    assert sqlite_store.get_document(doc.id).title == "New"
+
+    sqlite_store.mark_document_deleted(doc.id)
+    assert sqlite_store.get_document(doc.id).status == "deleted"
+
+def test_index_generation(sqlite_store):
+    assert sqlite_store.get_index_generation() == 0
+    assert sqlite_store.bump_index_generation() == 1
+    assert sqlite_store.bump_index_generation() == 2
+    assert sqlite_store.get_index_generation() == 2
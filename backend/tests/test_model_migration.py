@@ -0,0 +1,107 @@
+import threading
+import pytest
+import numpy as np
+from backend.app.config.schema import AppConfig, StorageConfig, MetadataBackend, LexicalBackend, VectorBackend, IngestionConfig, BookmarksConfig, WebFetchConfig, EmbeddingConfig
+from backend.app.adapters.metadata.sqlite import SQLiteMetadataStore
+from backend.app.adapters.lexical.fts5 import FTS5LexicalIndex
+from backend.app.adapters.vector.faiss import FAISSVectorStore
+from backend.app.domain.ports import EmbeddingProvider
+from backend.app.services.indexing import IndexingService
+from backend.app.services.migration import ModelMigrationService
+from backend.app.dependencies import ensure_model_migration
+from backend.app.domain import models
+
+class HashEmbeddingProvider(EmbeddingProvider):
+    """Deterministic vectors of the given dimension; stop_after sets stop_event after that many calls."""
+    def __init__(self, dim, stop_event=None, stop_after=None):
+        self.dim = dim
+        self.calls = []
+        self.stop_event = stop_event
+        self.stop_after = stop_after
+
+    def embed_texts(self, texts):
+        self.calls.append(list(texts))
+        if self.stop_event is not None and len(self.calls) >= self.stop_after:
+            self.stop_event.set()
+        return [np.random.RandomState(abs(hash(t)) % (2 ** 32)).rand(self.dim).tolist() for t in texts]
+
+def _config(tmp_path, model_name, dim):
+    return AppConfig(
+        metadata_backend=MetadataBackend.SQLITE,
+        lexical_backend=LexicalBackend.FTS5,
+        vector_backend=VectorBackend.FAISS,
+        storage=StorageConfig(data_dir=tmp_path, sqlite_path=tmp_path / "metadata.db", faiss_dir=tmp_path / "faiss_idx"),
+        ingestion=IngestionConfig(chunk_size_tokens=100, chunk_overlap_tokens=0, max_file_mb=10, near_duplicates="off"),
+        bookmarks=BookmarksConfig(),
+        web_fetch=WebFetchConfig(),
+        embedding=EmbeddingConfig(
+            provider="test", model_name=model_name, dim=dim, cache_mb=0,
+            migration_batch_size=1, migration_duty_cycle=1.0
+        )
+    )
+
+@pytest.fixture
+def indexed_corpus(tmp_path):
+    """Three documents indexed with model "old" (4-d); returns the config switched to "new" (3-d)."""
+    folder = tmp_path / "docs"
+    folder.mkdir()
+    for i, topic in enumerate(["apples and pears", "rivers and lakes", "trains and stations"]):
+        (folder / f"doc{i}.txt").write_text(f"A short note about {topic}.")
+
+    config = _config(tmp_path, "old", 4)
+    metadata = SQLiteMetadataStore(config)
+    service = IndexingService(config, metadata, FTS5LexicalIndex(config), FAISSVectorStore(config), HashEmbeddingProvider(4))
+    source = metadata.upsert_source(models.Source(name="docs", path=str(folder)))
+    assert service.scan_source(source.id).status == models.JobStatus.DONE
+    return _config(tmp_path, "new", 3), metadata
+
+def _migration(config, metadata, provider):
+    target = FAISSVectorStore(config, model_name="new")
+    return ModelMigrationService(config, metadata, FAISSVectorStore(config), target, provider)
+
+def test_migration_builds_new_index_and_cuts_over(indexed_corpus):
+    config, metadata = indexed_corpus
+    job = ensure_model_migration(config, metadata)
+    assert job.payload == {"model_name": "new"}
+    # Until the cutover the old model keeps serving
+    assert FAISSVectorStore(config).model() == ("old", 4)
+
+    generation = metadata.get_index_generation()
+    provider = HashEmbeddingProvider(3)
+    job = _migration(config, metadata, provider).run(job)
+
+    assert job.status == models.JobStatus.DONE
+    assert job.payload["migrated"] == 3
+    assert sum(len(call) for call in provider.calls) == 3
+    assert metadata.get_index_generation() > generation
+
+    served = FAISSVectorStore(config)
+    assert served.model() == ("new", 3)
+    assert served.stats()["postings"] == 3
+    assert len(served.query(provider.embed_query("A short note about rivers and lakes."), top_k=3)) == 3
+    assert len(served.query_docs(provider.embed_query("A short note about rivers and lakes."), top_k=3)) == 3
+    assert ensure_model_migration(config, metadata) is None
+
+def test_interrupted_migration_resumes_without_reembedding(indexed_corpus):
+    config, metadata = indexed_corpus
+    job = ensure_model_migration(config, metadata)
+
+    stop = threading.Event()
+    first = HashEmbeddingProvider(3, stop_event=stop, stop_after=1)
+    job = _migration(config, metadata, first).run(job, stop)
+    assert job.status == models.JobStatus.PENDING
+    assert job.payload["remaining"] == 2
+    assert FAISSVectorStore(config).model() == ("old", 4)
+
+    second = HashEmbeddingProvider(3)
+    job = _migration(config, metadata, second).run(job)
+    assert job.status == models.JobStatus.DONE
+    assert job.progress == 1.0
+    assert sum(len(call) for call in first.calls + second.calls) == 3
+    assert FAISSVectorStore(config).model() == ("new", 3)
+
+def test_vector_store_rejects_vectors_of_another_dimension(indexed_corpus):
+    config, metadata = indexed_corpus
+    chunk = metadata.get_chunks_with_documents(FAISSVectorStore(config, model_name="new").pending_chunks("old", 1)[0])[0][0]
+    with pytest.raises(ValueError):
+        FAISSVectorStore(config).upsert_embeddings([chunk], [[0.1, 0.2, 0.3]])
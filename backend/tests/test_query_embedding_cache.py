@@ -0,0 +1,45 @@
+import numpy as np
+from backend.app.adapters.embedding.query_cache import QueryEmbeddingCache
+
+class CountingEmbedder:
+    def __init__(self, dim=4):
+        self.dim = dim
+        self.calls = []
+
+    def __call__(self, text):
+        self.calls.append(text)
+        return [float(len(text))] * self.dim
+
+def test_memory_tier_hits_and_byte_bound():
+    embed = CountingEmbedder()
+    # Room for two 4-d float32 vectors (16 bytes each)
+    cache = QueryEmbeddingCache(max_bytes=32)
+
+    v1 = cache.get_or_embed("m", "alpha", embed)
+    assert isinstance(v1, np.ndarray) and v1.dtype == np.float32
+    assert cache.get_or_embed("m", "alpha", embed) is v1
+    assert embed.calls == ["alpha"]
+
+    # Same text under another model is a different entry
+    cache.get_or_embed("other", "alpha", embed)
+    assert embed.calls == ["alpha", "alpha"]
+
+    # A third vector evicts the least recently used one
+    cache.get_or_embed("m", "beta", embed)
+    assert cache.stats()["bytes"] <= 32
+    cache.get_or_embed("m", "alpha", embed)
+    assert embed.calls == ["alpha", "alpha", "beta", "alpha"]
+
+def test_persistent_tier_shared_between_instances(tmp_path):
+    path = tmp_path / "cache" / "query_embeddings.db"
+    embed = CountingEmbedder()
+
+    first = QueryEmbeddingCache(max_bytes=1024, persistent_path=path)
+    v1 = first.get_or_embed("m", "shared query", embed)
+
+    # A fresh process-level cache (e.g. another worker) finds it on disk
+    second = QueryEmbeddingCache(max_bytes=1024, persistent_path=path)
+    v2 = second.get_or_embed("m", "shared query", embed)
+
+    assert embed.calls == ["shared query"]
+    np.testing.assert_array_equal(v1, v2)
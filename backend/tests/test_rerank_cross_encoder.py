@@ -0,0 +1,68 @@
+import time
+import pytest
+from uuid import uuid4
+from backend.app.config.schema import AppConfig, StorageConfig, MetadataBackend, LexicalBackend, VectorBackend, IngestionConfig, BookmarksConfig, WebFetchConfig, EmbeddingConfig, RerankConfig
+from backend.app.adapters.rerank.cross_encoder import CrossEncoderReranker
+from backend.app.domain import models
+
+def make_config(tmp_path, **rerank):
+    return AppConfig(
+        metadata_backend=MetadataBackend.SQLITE,
+        lexical_backend=LexicalBackend.FTS5,
+        vector_backend=VectorBackend.FAISS,
+        storage=StorageConfig(data_dir=tmp_path, sqlite_path=tmp_path / "metadata.db", faiss_dir=tmp_path),
+        ingestion=IngestionConfig(chunk_size_tokens=100, chunk_overlap_tokens=0, max_file_mb=10),
+        bookmarks=BookmarksConfig(),
+        web_fetch=WebFetchConfig(),
+        embedding=EmbeddingConfig(provider="test", model_name="test", dim=4),
+        rerank=RerankConfig(enabled=True, **rerank)
+    )
+
+def make_chunks(texts):
+    doc_id = uuid4()
+    return [
+        models.Chunk(doc_id=doc_id, chunk_index=i, text=t, start_offset=0, end_offset=len(t), chunk_hash=str(uuid4()))
+        for i, t in enumerate(texts)
+    ]
+
+class KeywordScorer:
+    """Scores by occurrences of the query word; records batch sizes"""
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.batches = []
+
+    def __call__(self, query, passages):
+        time.sleep(self.delay)
+        self.batches.append(list(passages))
+        return [p.count(query) for p in passages]
+
+def test_rerank_orders_by_score_and_caches(tmp_path):
+    scorer = KeywordScorer()
+    reranker = CrossEncoderReranker(make_config(tmp_path, batch_size=2, time_budget_ms=None), scorer=scorer)
+    chunks = make_chunks(["x", "cat cat cat", "cat", "dog cat cat"])
+
+    ranked = reranker.rerank("cat", chunks)
+    assert [c.text for c, _ in ranked] == ["cat cat cat", "dog cat cat", "cat", "x"]
+    assert [s for _, s in ranked] == [3.0, 2.0, 1.0, 0.0]
+    # Batches are length-sorted
+    assert [len(b) for b in scorer.batches] == [2, 2]
+    assert scorer.batches[0] == ["x", "cat"]
+
+    # Second call is served from the (query, chunk_hash) cache
+    scorer.batches.clear()
+    assert reranker.rerank("cat", chunks) == ranked
+    assert scorer.batches == []
+
+def test_rerank_budget_keeps_rrf_order_for_unscored(tmp_path):
+    scorer = KeywordScorer(delay=0.05)
+    reranker = CrossEncoderReranker(make_config(tmp_path, batch_size=1, time_budget_ms=80, cache_size=0), scorer=scorer)
+    chunks = make_chunks(["a", "b cat", "c", "d cat", "e", "f cat"])
+
+    ranked = reranker.rerank("cat", chunks)
+
+    scored = [(c.text, s) for c, s in ranked if s is not None]
+    unscored = [c.text for c, s in ranked if s is None]
+    assert 0 < len(scored) < len(chunks)
+    # Unscored candidates come last, in their original (RRF) order
+    assert unscored == [c.text for c in chunks if c.text in unscored]
+    assert [c for c, _ in ranked[:len(scored)]] == sorted([c for c, _ in ranked[:len(scored)]], key=lambda c: -dict(scored)[c.text])
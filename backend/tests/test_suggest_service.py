@@ -0,0 +1,29 @@
+from backend.app.services.suggest import SuggestService
+
+class FakeLexicalIndex:
+    def __init__(self, terms):
+        self.terms = terms
+        self.calls = []
+
+    def suggest_terms(self, prefix, limit):
+        self.calls.append(prefix)
+        return [(t, f) for t, f in self.terms if t.startswith(prefix)][:limit]
+
+def test_suggest_completes_last_word():
+    lexical = FakeLexicalIndex([("learning", 7), ("lean", 2)])
+    service = SuggestService(lexical)
+
+    results = service.suggest("machine lea", limit=5)
+    assert [r.text for r in results] == ["machine learning", "machine lean"]
+    assert results[0].term == "learning"
+    assert results[0].doc_freq == 7
+    assert lexical.calls == ["lea"]
+
+def test_suggest_skips_finished_words():
+    lexical = FakeLexicalIndex([("learning", 7)])
+    service = SuggestService(lexical)
+
+    assert service.suggest("machine ", limit=5) == []
+    assert service.suggest("", limit=5) == []
+    assert service.suggest("learn?", limit=5) == []
+    assert lexical.calls == []
@@ -6,12 +6,10 @@ from backend.app.config.schema import AppConfig, StorageConfig, MetadataBackend,
 from backend.app.adapters.vector.faiss import FAISSVectorStore
 from backend.app.domain import models
 
-@pytest.fixture
-def faiss_store(tmp_path):
-    # Setup config
+def _config(tmp_path):
     db_path = tmp_path / "metadata.db"
     faiss_dir = tmp_path / "faiss_idx"
-    config = AppConfig(
+    return AppConfig(
         metadata_backend=MetadataBackend.SQLITE,
         lexical_backend=LexicalBackend.FTS5,
         vector_backend=VectorBackend.FAISS,
@@ -21,7 +19,10 @@ def faiss_store(tmp_path):
         web_fetch=WebFetchConfig(),
         embedding=EmbeddingConfig(provider="test", model_name="test", dim=4)
     )
-    return FAISSVectorStore(config)
+
+@pytest.fixture
+def faiss_store(tmp_path):
+    return FAISSVectorStore(_config(tmp_path))
 
 def test_faiss_lifecycle(faiss_store):
     # 1. Upsert
@@ -88,3 +89,138 @@ def test_soft_delete_and_reinsert(faiss_store):
     results = faiss_store.query(v1, top_k=1)
     assert len(results) == 1
     assert results[0][0] == chunk.id
+
+def test_get_vectors_by_chunk_id(faiss_store):
+    doc_id = uuid4()
+    chunks = [
+        models.Chunk(id=uuid4(), doc_id=doc_id, chunk_index=i, text=str(i), start_offset=0, end_offset=1, chunk_hash=str(i))
+        for i in range(3)
+    ]
+    faiss_store.upsert_embeddings(chunks, [[2.0, 0.0, 0.0, 0.0], [0.0, 3.0, 0.0, 0.0], [0.0, 0.0, 1.0, 1.0]])
+    # Re-upsert tombstones the first row; the latest vector must be returned
+    faiss_store.upsert_embeddings([chunks[0]], [[0.0, 0.0, 0.0, 5.0]])
+
+    missing = uuid4()
+    found, vectors = faiss_store.get_vectors([chunks[2].id, missing, chunks[0].id])
+
+    assert found == [chunks[2].id, chunks[0].id]
+    assert vectors.shape == (2, 4)
+    np.testing.assert_allclose(vectors[0], [0.0, 0.0, 0.7071068, 0.7071068], rtol=1e-5)
+    np.testing.assert_allclose(vectors[1], [0.0, 0.0, 0.0, 1.0])
+
+    faiss_store.delete_doc(doc_id)
+    found, vectors = faiss_store.get_vectors([c.id for c in chunks])
+    assert found == []
+    assert vectors.shape == (0, 4)
+
+def test_doc_index_two_stage_lookups(faiss_store):
+    doc_a, doc_b = uuid4(), uuid4()
+    chunks_a = [
+        models.Chunk(id=uuid4(), doc_id=doc_a, chunk_index=i, text="a", start_offset=0, end_offset=1, chunk_hash=f"a{i}")
+        for i in range(2)
+    ]
+    chunk_b = models.Chunk(id=uuid4(), doc_id=doc_b, chunk_index=0, text="b", start_offset=0, end_offset=1, chunk_hash="b")
+    faiss_store.upsert_embeddings(chunks_a, [[1.0, 0.0, 0.0, 0.0], [1.0, 0.2, 0.0, 0.0]])
+    faiss_store.upsert_embeddings([chunk_b], [[0.0, 1.0, 0.0, 0.0]])
+
+    # Docs indexed before the document index existed are backfilled from chunk vectors
+    docs = faiss_store.query_docs([1.0, 0.0, 0.0, 0.0], top_k=2)
+    assert [d for d, _ in docs] == [doc_a, doc_b]
+
+    faiss_store.upsert_doc_embedding(doc_b, [1.0, 0.0, 0.0, 0.0])
+    docs = faiss_store.query_docs([1.0, 0.0, 0.0, 0.0], top_k=1)
+    assert docs[0][1] > 0.99
+
+    found, vectors = faiss_store.get_doc_chunk_vectors([doc_a])
+    assert found == [c.id for c in chunks_a]
+    assert vectors.shape == (2, 4)
+
+    faiss_store.delete_doc(doc_a)
+    assert [d for d, _ in faiss_store.query_docs([1.0, 0.0, 0.0, 0.0], top_k=5)] == [doc_b]
+    assert faiss_store.get_doc_chunk_vectors([doc_a])[0] == []
+
+def test_identical_chunks_share_one_vector(faiss_store):
+    doc_a, doc_b = uuid4(), uuid4()
+    header_a = models.Chunk(id=uuid4(), doc_id=doc_a, chunk_index=0, text="license", start_offset=0, end_offset=7, chunk_hash="lic")
+    body_a = models.Chunk(id=uuid4(), doc_id=doc_a, chunk_index=1, text="a", start_offset=7, end_offset=8, chunk_hash="a")
+    faiss_store.upsert_embeddings([header_a, body_a], [[1.0, 0.0, 0.0, 0.0], [0.0, 1.0, 0.0, 0.0]])
+
+    header_b = models.Chunk(id=uuid4(), doc_id=doc_b, chunk_index=0, text="license", start_offset=0, end_offset=7, chunk_hash="lic")
+    body_b = models.Chunk(id=uuid4(), doc_id=doc_b, chunk_index=1, text="b", start_offset=7, end_offset=8, chunk_hash="b")
+    assert faiss_store.reuse_embeddings([header_b, body_b]) == [body_b]
+    faiss_store.upsert_embeddings([body_b], [[0.0, 0.0, 1.0, 0.0]])
+
+    assert faiss_store.index.ntotal == 3
+    assert faiss_store.stats()["postings"] == 4
+    # A shared vector is one hit, reported as its first chunk
+    hits = faiss_store.query([1.0, 0.0, 0.0, 0.0], top_k=2)
+    assert [cid for cid, _ in hits][0] == header_a.id
+    assert header_b.id not in {cid for cid, _ in hits}
+
+    # The shared vector outlives doc_a while doc_b still uses it
+    faiss_store.delete_doc(doc_a)
+    assert [cid for cid, _ in faiss_store.query([1.0, 0.0, 0.0, 0.0], top_k=1)] == [header_b.id]
+    found, _ = faiss_store.get_vectors([header_a.id, header_b.id])
+    assert found == [header_b.id]
+    assert faiss_store.stats()["tombstones"] == 1
+
+def test_excluded_chunk_does_not_hide_shared_vector(faiss_store):
+    doc_a, doc_b = uuid4(), uuid4()
+    header_a = models.Chunk(id=uuid4(), doc_id=doc_a, chunk_index=0, text="license", start_offset=0, end_offset=7, chunk_hash="lic")
+    faiss_store.upsert_embeddings([header_a], [[1.0, 0.0, 0.0, 0.0]])
+    header_b = models.Chunk(id=uuid4(), doc_id=doc_b, chunk_index=0, text="license", start_offset=0, end_offset=7, chunk_hash="lic")
+    assert faiss_store.reuse_embeddings([header_b]) == []
+
+    # The vector's oldest posting is excluded, so it is reported as the next one
+    hits = faiss_store.query([1.0, 0.0, 0.0, 0.0], top_k=1, exclude={header_a.id})
+    assert [cid for cid, _ in hits] == [header_b.id]
+    assert faiss_store.query([1.0, 0.0, 0.0, 0.0], top_k=1, exclude={header_a.id, header_b.id}) == []
+
+def test_query_returns_at_most_top_k_for_widely_shared_vectors(faiss_store):
+    boilerplate = [
+        models.Chunk(id=uuid4(), doc_id=uuid4(), chunk_index=0, text="footer", start_offset=0, end_offset=6, chunk_hash="footer")
+        for _ in range(200)
+    ]
+    faiss_store.upsert_embeddings(boilerplate[:1], [[1.0, 0.0, 0.0, 0.0]])
+    assert faiss_store.reuse_embeddings(boilerplate[1:]) == []
+    other = models.Chunk(id=uuid4(), doc_id=uuid4(), chunk_index=0, text="x", start_offset=0, end_offset=1, chunk_hash="x")
+    faiss_store.upsert_embeddings([other], [[0.9, 0.1, 0.0, 0.0]])
+
+    hits = faiss_store.query([1.0, 0.0, 0.0, 0.0], top_k=5)
+    assert len(hits) <= 5
+    assert [cid for cid, _ in hits] == [boilerplate[0].id, other.id]
+
+def test_reindexed_content_revives_tombstoned_vector(faiss_store):
+    doc_id = uuid4()
+    chunk = models.Chunk(id=uuid4(), doc_id=doc_id, chunk_index=0, text="a", start_offset=0, end_offset=1, chunk_hash="1")
+    faiss_store.upsert_embeddings([chunk], [[1.0, 0.0, 0.0, 0.0]])
+    faiss_store.delete_doc(doc_id)
+
+    # New chunk ids for the same content, as when a document is re-indexed
+    again = models.Chunk(id=uuid4(), doc_id=doc_id, chunk_index=0, text="a", start_offset=0, end_offset=1, chunk_hash="1")
+    assert faiss_store.reuse_embeddings([again]) == []
+    assert faiss_store.index.ntotal == 1
+    assert faiss_store.stats()["tombstones"] == 0
+    assert [cid for cid, _ in faiss_store.query([1.0, 0.0, 0.0, 0.0], top_k=1)] == [again.id]
+
+def test_opening_store_does_not_wait_for_writers(faiss_store, tmp_path):
+    import sqlite3
+    import time
+    writer = sqlite3.connect(faiss_store.db_path, isolation_level=None)
+    writer.execute("BEGIN IMMEDIATE")
+    try:
+        started = time.monotonic()
+        assert FAISSVectorStore(_config(tmp_path)).model() == ("test", 4)
+        assert time.monotonic() - started < 1.0
+    finally:
+        writer.execute("ROLLBACK")
+        writer.close()
+
+def test_stats_of_long_lived_store_follow_other_writers(faiss_store, tmp_path):
+    assert faiss_store.stats()["ntotal"] == 0
+    writer = FAISSVectorStore(_config(tmp_path))
+    chunk = models.Chunk(doc_id=uuid4(), chunk_index=0, text="x", start_offset=0, end_offset=1, chunk_hash="h")
+    writer.upsert_embeddings([chunk], [[1.0, 0.0, 0.0, 0.0]])
+    assert writer.index.ntotal == 1
+    assert faiss_store.stats()["ntotal"] == 1
+    assert faiss_store.stats()["postings"] == 1
@@ -0,0 +1,168 @@
+import asyncio
+import httpx
+import pytest
+from pathlib import Path
+from backend.app.config.schema import AppConfig, StorageConfig, MetadataBackend, LexicalBackend, VectorBackend, IngestionConfig, BookmarksConfig, WebFetchConfig, EmbeddingConfig
+from backend.app.adapters.content import fetch
+from backend.app.adapters.content.fetch import ResponseCache, WebFetcher
+from backend.app.adapters.metadata.sqlite import SQLiteMetadataStore
+from backend.app.adapters.lexical.fts5 import FTS5LexicalIndex
+from backend.app.adapters.vector.faiss import FAISSVectorStore
+from backend.app.domain.ports import EmbeddingProvider
+from backend.app.services.indexing import IndexingService
+from backend.app.domain import models
+
+class Site:
+    """Mock web server: pages by URL, with ETags, answering conditional GETs with 304."""
+    def __init__(self, pages):
+        self.pages = dict(pages)
+        self.requests = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(0.01)
+        self.in_flight -= 1
+        body = self.pages.get(str(request.url))
+        if body is None:
+            return httpx.Response(404)
+        etag = f'"{hash(body) & 0xffff:x}"'
+        if request.headers.get("If-None-Match") == etag:
+            return httpx.Response(304, headers={"ETag": etag})
+        return httpx.Response(200, headers={"ETag": etag, "Content-Type": "text/html; charset=utf-8"}, text=body)
+
+def _page(title, body):
+    return f"<html><head><title>{title}</title></head><body><p>{body}</p></body></html>"
+
+@pytest.fixture
+def config(tmp_path):
+    return AppConfig(
+        metadata_backend=MetadataBackend.SQLITE,
+        lexical_backend=LexicalBackend.FTS5,
+        vector_backend=VectorBackend.FAISS,
+        storage=StorageConfig(data_dir=tmp_path, sqlite_path=tmp_path / "metadata.db", faiss_dir=tmp_path / "faiss_idx"),
+        ingestion=IngestionConfig(chunk_size_tokens=100, chunk_overlap_tokens=0, max_file_mb=10, near_duplicates="off"),
+        bookmarks=BookmarksConfig(),
+        web_fetch=WebFetchConfig(enabled=True, per_host_connections=2, scan_batch_size=2),
+        embedding=EmbeddingConfig(provider="test", model_name="test", dim=4)
+    )
+
+def _fetcher(config, site, monkeypatch):
+    """Installs a fetcher on the mock site as the shared one for config."""
+    path = config.storage.data_dir / "web_cache.db"
+    fetcher = WebFetcher(config.web_fetch, ResponseCache(path, 1 << 20), transport=httpx.MockTransport(site))
+    monkeypatch.setitem(fetch._fetchers, str(path), fetcher)
+    return fetcher
+
+def test_conditional_requests_and_per_host_limit(config, monkeypatch):
+    site = Site({f"https://a.test/{i}": _page(i, f"page {i}") for i in range(6)})
+    fetcher = _fetcher(config, site, monkeypatch)
+
+    first = fetcher.fetch_many([(f"https://a.test/{i}", None, None) for i in range(6)] + [("https://a.test/missing", None, None)])
+    assert [r.status for r in first] == [200] * 6 + [404]
+    assert first[-1].error is not None
+    assert site.max_in_flight == 2
+
+    again = fetcher.fetch_many([(r.url, r.etag, r.last_modified) for r in first[:6]])
+    assert all(r.not_modified and r.content == b"" for r in again)
+
+def test_malformed_url_fails_only_its_own_result(config, monkeypatch):
+    site = Site({"https://a.test/ok": _page("Ok", "fine page")})
+    fetcher = _fetcher(config, site, monkeypatch)
+
+    results = fetcher.fetch_many([
+        ("https://[bad/", None, None), ("https://a.test/bad\x00", None, None), ("https://a.test/ok", None, None)
+    ])
+    assert [r.status for r in results] == [0, 0, 200]
+    assert results[0].error and results[1].error
+
+def test_get_serves_fresh_cache_and_revalidates_stale(config, monkeypatch):
+    site = Site({"https://a.test/doc": _page("Doc", "cached body")})
+    fetcher = _fetcher(config, site, monkeypatch)
+
+    assert "cached body" in fetcher.get("https://a.test/doc").text
+    assert "cached body" in fetcher.get("https://a.test/doc").text
+    assert len(site.requests) == 1
+
+    fetcher.config = config.web_fetch.model_copy(update={"cache_fresh_sec": 0})
+    assert "cached body" in fetcher.get("https://a.test/doc").text
+    assert len(site.requests) == 2
+    assert site.requests[-1].headers["If-None-Match"]
+
+def test_response_cache_tracks_size_and_evicts_oldest(tmp_path, monkeypatch):
+    cache = ResponseCache(tmp_path / "web_cache.db", max_bytes=100)
+    clock = [1000.0]
+    monkeypatch.setattr(fetch.time, "time", lambda: clock[0])
+
+    for i in range(8):
+        clock[0] += 1
+        cache.put(fetch.FetchResult(url=f"https://a.test/{i}", status=200, content=b"x" * (10 + 10 * (i % 3))))
+    cache.put(fetch.FetchResult(url="https://a.test/7", status=200, content=b"y" * 20))
+
+    total, actual = cache._conn.execute(
+        "SELECT total_bytes, (SELECT SUM(nbytes) FROM responses) FROM responses_meta"
+    ).fetchone()
+    assert total == actual <= 100
+    assert cache.get("https://a.test/0") is None
+    assert cache.get("https://a.test/7")[0].content == b"y" * 20
+
+class CountingEmbeddingProvider(EmbeddingProvider):
+    def __init__(self):
+        self.texts = 0
+
+    def embed_texts(self, texts):
+        self.texts += len(texts)
+        return [[0.1, 0.2, 0.3, 0.4] for _ in texts]
+
+def test_bookmark_rescan_only_indexes_changed_pages(config, monkeypatch):
+    bookmarks = Path(__file__).parent / "fixtures" / "bookmarks.json"
+    site = Site({
+        "https://www.google.com/": _page("Search", "a search engine front page"),
+        "https://example.com/": _page("Example", "an example domain for documents"),
+    })
+    _fetcher(config, site, monkeypatch)
+    metadata = SQLiteMetadataStore(config)
+    embedding = CountingEmbeddingProvider()
+    service = IndexingService(config, metadata, FTS5LexicalIndex(config), FAISSVectorStore(config), embedding)
+    source = metadata.upsert_source(models.Source(name="bookmarks", path=str(bookmarks)))
+
+    assert service.scan_source(source.id).status == models.JobStatus.DONE
+    docs = metadata.list_documents_by_source(source.id)
+    assert {d.status for d in docs} == {"indexed"}
+    assert all(d.etag for d in docs)
+    # Extraction read the pages fetched by the scan from the response cache
+    assert len(site.requests) == 2
+
+    site.pages["https://example.com/"] = _page("Example", "an example domain, now rewritten")
+    embedded = embedding.texts
+    assert service.scan_source(source.id).status == models.JobStatus.DONE
+    assert len(site.requests) == 4
+    conditional = [r for r in site.requests[2:] if "If-None-Match" in r.headers]
+    assert len(conditional) == 2
+    assert embedding.texts == embedded + 1
+    example = next(d for d in metadata.list_documents_by_source(source.id) if d.uri == "https://example.com/")
+    assert any("rewritten" in c.text for c in metadata.list_chunks(example.id))
+
+def test_failed_refetch_keeps_indexed_documents(config, monkeypatch):
+    bookmarks = Path(__file__).parent / "fixtures" / "bookmarks.json"
+    site = Site({
+        "https://www.google.com/": _page("Search", "a search engine front page"),
+        "https://example.com/": _page("Example", "an example domain for documents"),
+    })
+    _fetcher(config, site, monkeypatch)
+    metadata = SQLiteMetadataStore(config)
+    service = IndexingService(config, metadata, FTS5LexicalIndex(config), FAISSVectorStore(config), CountingEmbeddingProvider())
+    source = metadata.upsert_source(models.Source(name="bookmarks", path=str(bookmarks)))
+    assert service.scan_source(source.id).status == models.JobStatus.DONE
+    before = {d.uri: d for d in metadata.list_documents_by_source(source.id)}
+
+    # The site is down for one page during the rescan
+    del site.pages["https://example.com/"]
+    assert service.scan_source(source.id).status == models.JobStatus.DONE
+    example = next(d for d in metadata.list_documents_by_source(source.id) if d.uri == "https://example.com/")
+    assert example.status == "indexed"
+    assert example.etag == before["https://example.com/"].etag
+    assert metadata.list_chunks(example.id)
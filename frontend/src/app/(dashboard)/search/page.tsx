@@ -1,28 +1,78 @@
 "use client";
 
-import { useMutation } from "@tanstack/react-query";
-import { search, SearchResult } from "@/lib/api";
-import { useState } from "react";
+import { useMutation, useQuery } from "@tanstack/react-query";
+import { searchPage, searchStream, suggest, SearchResult } from "@/lib/api";
+import { useEffect, useRef, useState } from "react";
 import { Search as SearchIcon, Loader2, FileText, ExternalLink } from "lucide-react";
 
 export default function SearchPage() {
   const [query, setQuery] = useState("");
   const [results, setResults] = useState<SearchResult[]>([]);
+  const [debouncedQuery, setDebouncedQuery] = useState("");
+  const [showSuggestions, setShowSuggestions] = useState(false);
+  const [stage, setStage] = useState<"lexical" | "final" | null>(null);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
+  const [submittedQuery, setSubmittedQuery] = useState("");
+  const abortRef = useRef<AbortController | null>(null);
 
+  // Suggestions are served from the backend's in-memory term dictionary,
+  // so a short debounce is enough to keep keystrokes cheap.
+  useEffect(() => {
+    const handle = setTimeout(() => setDebouncedQuery(query), 80);
+    return () => clearTimeout(handle);
+  }, [query]);
+
+  const { data: suggestions = [] } = useQuery({
+    queryKey: ["suggest", debouncedQuery],
+    queryFn: () => suggest(debouncedQuery),
+    enabled: showSuggestions && debouncedQuery.trim().length >= 2,
+    staleTime: 60_000,
+  });
+
+  // Lexical hits are rendered as soon as they arrive and replaced by the fused ranking
   const searchMutation = useMutation({
-    mutationFn: (q: string) => search(q),
+    mutationFn: (q: string) => {
+      abortRef.current?.abort();
+      const controller = new AbortController();
+      abortRef.current = controller;
+      setStage(null);
+      setNextCursor(null);
+      setSubmittedQuery(q);
+      return searchStream(
+        q,
+        (response) => {
+          setResults(response.results);
+          setStage(response.stage);
+          setNextCursor(response.next_cursor ?? null);
+        },
+        10,
+        controller.signal,
+      );
+    },
+  });
+
+  const loadMoreMutation = useMutation({
+    mutationFn: (cursor: string) => searchPage(submittedQuery, cursor),
     onSuccess: (data) => {
-      setResults(data);
+      setResults((prev) => [...prev, ...data.results]);
+      setNextCursor(data.next_cursor ?? null);
     },
   });
 
   const handleSearch = (e: React.FormEvent) => {
     e.preventDefault();
     if (query.trim()) {
+      setShowSuggestions(false);
       searchMutation.mutate(query);
     }
   };
 
+  const handleSuggestion = (text: string) => {
+    setQuery(text);
+    setShowSuggestions(false);
+    searchMutation.mutate(text);
+  };
+
   return (
     <div className="max-w-3xl mx-auto space-y-8">
       <div className="text-center space-y-4">
@@ -34,7 +84,11 @@ export default function SearchPage() {
         <input
           type="text"
           value={query}
-          onChange={(e) => setQuery(e.target.value)}
+          onChange={(e) => {
+            setQuery(e.target.value);
+            setShowSuggestions(true);
+          }}
+          onBlur={() => setShowSuggestions(false)}
           placeholder="What are you looking for?"
           className="w-full px-6 py-4 text-lg border-2 border-gray-200 rounded-2xl shadow-sm focus:border-blue-500 focus:ring-4 focus:ring-blue-50 outline-none transition-all pl-14"
           autoFocus
@@ -47,15 +101,40 @@ export default function SearchPage() {
         >
           {searchMutation.isPending ? <Loader2 className="w-5 h-5 animate-spin" /> : <SearchIcon className="w-5 h-5" />}
         </button>
+        {showSuggestions && suggestions.length > 0 && (
+          <ul className="absolute z-10 left-0 right-0 mt-2 bg-white border border-gray-100 rounded-xl shadow-md overflow-hidden">
+            {suggestions.map((s) => (
+              <li key={s.text}>
+                <button
+                  type="button"
+                  // onMouseDown fires before the input's onBlur hides the list
+                  onMouseDown={(e) => {
+                    e.preventDefault();
+                    handleSuggestion(s.text);
+                  }}
+                  className="w-full text-left px-6 py-2 hover:bg-gray-50 flex justify-between items-center"
+                >
+                  <span className="text-gray-800">{s.text}</span>
+                  <span className="text-xs text-gray-400">{s.doc_freq}</span>
+                </button>
+              </li>
+            ))}
+          </ul>
+        )}
       </form>
 
       <div className="space-y-6">
+        {searchMutation.isPending && stage === "lexical" && (
+          <div className="flex items-center gap-2 text-sm text-gray-400">
+            <Loader2 className="w-4 h-4 animate-spin" /> Refining with semantic results…
+          </div>
+        )}
         {results.map((result) => (
           <div key={result.chunk_id} className="bg-white p-6 rounded-xl shadow-sm border border-gray-100 hover:shadow-md transition-shadow group">
             <div className="flex justify-between items-start mb-2">
               <div className="flex items-center gap-2 text-sm text-gray-500">
                 <FileText className="w-4 h-4" />
-                <span className="truncate max-w-md">{result.metadata.title || result.metadata.uri}</span>
+                <span className="truncate max-w-md">{result.doc_title || result.doc_uri}</span>
               </div>
               <span className="text-xs font-mono bg-blue-50 text-blue-700 px-2 py-1 rounded-full">
                 {Math.round(result.score * 100)}%
@@ -68,7 +147,7 @@ export default function SearchPage() {
 
             <div className="mt-4 pt-4 border-t border-gray-50 flex justify-end opacity-0 group-hover:opacity-100 transition-opacity">
               <a 
-                href={result.metadata.uri} 
+                href={result.doc_uri} 
                 target="_blank" 
                 rel="noreferrer"
                 className="text-sm text-blue-600 hover:text-blue-800 flex items-center gap-1"
@@ -79,6 +158,20 @@ export default function SearchPage() {
           </div>
         ))}
 
+        {stage === "final" && nextCursor && (
+          <div className="flex justify-center">
+            <button
+              type="button"
+              onClick={() => loadMoreMutation.mutate(nextCursor)}
+              disabled={loadMoreMutation.isPending}
+              className="px-4 py-2 text-sm text-blue-600 border border-blue-100 rounded-xl hover:bg-blue-50 disabled:opacity-50 flex items-center gap-2"
+            >
+              {loadMoreMutation.isPending && <Loader2 className="w-4 h-4 animate-spin" />}
+              Load more
+            </button>
+          </div>
+        )}
+
         {searchMutation.isSuccess && results.length === 0 && (
           <div className="text-center py-12 text-gray-500">
             No results found for "{query}"
@@ -43,7 +43,18 @@ export interface SearchResult {
   chunk_id: string;
   score: number;
   text: string;
-  metadata: Record<string, any>;
+  doc_title?: string;
+  doc_uri: string;
+  score_breakdown: Record<string, number>;
+}
+
+export interface SearchResponse {
+  results: SearchResult[];
+  stage: 'lexical' | 'final';
+  degraded: boolean;
+  cached: boolean;
+  timings_ms: Record<string, number>;
+  next_cursor?: string | null;
 }
 
 export const fetchSources = async (): Promise<Source[]> => {
@@ -76,3 +87,55 @@ export const search = async (query: string, top_k: number = 10): Promise<SearchR
   const { data } = await api.post<SearchResult[]>('/search', { query, top_k });
   return data;
 };
+
+// Next page of a previous search; `query` must be the one the cursor came from
+export const searchPage = async (query: string, cursor: string, top_k: number = 10): Promise<SearchResponse> => {
+  const { data } = await api.post<SearchResponse>('/search', { query, top_k, cursor, profile: true });
+  return data;
+};
+
+// Streams NDJSON responses: a lexical-only preview first, then the fused ranking.
+// axios can't read a response body incrementally in the browser, so this uses fetch.
+export const searchStream = async (
+  query: string,
+  onResponse: (response: SearchResponse) => void,
+  top_k: number = 10,
+  signal?: AbortSignal,
+): Promise<void> => {
+  const res = await fetch('/api/v1/search/stream', {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json' },
+    body: JSON.stringify({ query, top_k }),
+    signal,
+  });
+  if (!res.ok || !res.body) {
+    throw new Error(`Search failed with status ${res.status}`);
+  }
+
+  const reader = res.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = '';
+  for (;;) {
+    const { done, value } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+    let newline;
+    while ((newline = buffer.indexOf('\n')) >= 0) {
+      const line = buffer.slice(0, newline).trim();
+      buffer = buffer.slice(newline + 1);
+      if (line) onResponse(JSON.parse(line));
+    }
+  }
+  if (buffer.trim()) onResponse(JSON.parse(buffer));
+};
+
+export interface Suggestion {
+  text: string;
+  term: string;
+  doc_freq: number;
+}
+
+export const suggest = async (q: string, limit: number = 8): Promise<Suggestion[]> => {
+  const { data } = await api.get<Suggestion[]>('/suggest', { params: { q, limit } });
+  return data;
+};